@@ -42,4 +42,23 @@ api.interceptors.response.use(
   }
 );
 
+export interface Job {
+  id: number;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  progress: Record<string, number>;
+  error: string | null;
+}
+
+// Poll a background job until it has finished
+export async function waitForJob(jobId: number, interval = 1000): Promise<Job> {
+  for (;;) {
+    const { data } = await api.get<Job>(`/jobs/${jobId}/`);
+    if (data.status === "succeeded" || data.status === "failed") {
+      return data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+}
+
 export default api;
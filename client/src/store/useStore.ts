@@ -1,6 +1,6 @@
 import { create } from "zustand";
 import { Transaction, Expense } from "../types";
-import api from "../lib/api";
+import api, { waitForJob } from "../lib/api";
 
 export interface Account {
   id: number;
@@ -184,41 +184,29 @@ export const useStore = create<StoreState>((set, get) => ({
     if (get().hasLoaded) return;
 
     try {
-      // Fetch user data to get spend warning position
-      const userResponse = await api.get("/users/me/");
-      const userData = await userResponse.data;
-      set({ warningPosition: userData.spend_warning });
-
-      // Fetch budget allotment
-      const budgetResponse = await api.get("/spend/budget-allotment");
-      const budgetData = await budgetResponse.data;
-      set({ budgetAllotment: budgetData });
-
-      // Fetch fixed per month expenses
-      const fixedResponse = await api.get("/expenses/fixed-per-month");
-      const fixedData = await fixedResponse.data;
-      set({ fixedPerMonth: fixedData });
-
-      // Fetch spend over time
+      // Fetch the spend warning, budget allotment, fixed per month and this
+      // week's spend in one request
       const today = new Date();
       const startOfWeek = new Date(today);
       startOfWeek.setDate(today.getDate() - today.getDay());
-      const endOfWeek = new Date(today);
-      endOfWeek.setDate(today.getDate() + (6 - today.getDay()));
 
-      const spendResponse = await api.get(
-        `/spend/spend-over-time?start_date=${
-          startOfWeek.toISOString().split("T")[0]
-        }&end_date=${endOfWeek.toISOString().split("T")[0]}`
+      const summaryResponse = await api.get(
+        `/dashboard/summary?week_start=${startOfWeek.toISOString().split("T")[0]}`
       );
 
-      if (spendResponse.status === 401) {
+      if (summaryResponse.status === 401) {
         localStorage.removeItem("token");
         return;
       }
 
-      const spendData = await spendResponse.data;
-      set({ spendOverTime: spendData, hasLoaded: true });
+      const summary = await summaryResponse.data;
+      set({
+        warningPosition: summary.spend_warning,
+        budgetAllotment: summary.budget_allotment,
+        fixedPerMonth: summary.fixed_per_month,
+        spendOverTime: summary.spend_over_time,
+        hasLoaded: true,
+      });
     } catch (error) {
       console.error("Error fetching initial data:", error);
     }
@@ -270,6 +258,14 @@ export const useStore = create<StoreState>((set, get) => ({
       const token = localStorage.getItem("token");
       if (!token) return;
 
+      // Update linked balances from the bank first. The server reuses recent
+      // results, so this only reaches Plaid every few minutes.
+      try {
+        await api.post("/plaid/refresh-balances");
+      } catch (error) {
+        console.error("Error refreshing balances:", error);
+      }
+
       const response = await api.get("/accounts");
 
       if (response.status === 401) {
@@ -591,12 +587,13 @@ export const useStore = create<StoreState>((set, get) => ({
       const token = localStorage.getItem("token");
       if (!token) return;
 
-      await api.post("/plaid/exchange-public-token", {
+      const response = await api.post("/plaid/exchange-public-token", {
         public_token: publicToken,
         name: institutionName,
       });
 
-      // Refresh accounts after successful connection
+      // Refresh accounts once the import has created the account
+      await waitForJob(response.data.job_id);
       await get().fetchAccounts();
     } catch (error) {
       console.error("Error exchanging public token:", error);
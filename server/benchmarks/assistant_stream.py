@@ -0,0 +1,103 @@
+"""
+Time-to-first-token and total stream time of the assistant chat endpoint.
+
+Runs AssistantService.chat against a local fake LLM and compares it with the
+previous behaviour, which waited for the complete answer and replayed it word
+by word with a 20 ms delay.
+
+    python -m server.benchmarks.assistant_stream --runs 5
+"""
+
+import io
+import time
+import asyncio
+import warnings
+import contextlib
+import argparse
+from typing import AsyncGenerator, Callable, List, Tuple
+
+from server.benchmarks.common import configure_environment, summarize
+
+ANSWER = (
+    "Over the last month you spent most of your money on groceries and dining "
+    "out. Your weekly budget is on track, but cutting two restaurant visits "
+    "would let you put an extra fifty dollars towards your savings goal. "
+) * 3
+
+SCENARIOS = {
+    "direct": [f"Thought: Do I need to use a tool? No\nAI: {ANSWER}"],
+    "one tool": [
+        "Thought: Do I need to use a tool? Yes\nAction: get_information\n"
+        'Action Input: {"question": "help"}',
+        f"Thought: Do I need to use a tool? No\nAI: {ANSWER}",
+    ],
+}
+
+
+async def legacy_chat(service, user, message: str) -> AsyncGenerator[str, None]:
+    """The word-split replay used before answers were streamed from the LLM."""
+    async for chunk in service.get_agent(user).astream(message):
+        if chunk.get("output"):
+            for word in chunk.get("output").split():
+                yield word + " "
+                await asyncio.sleep(0.02)
+
+
+async def measure(stream: Callable[[], AsyncGenerator[str, None]]) -> Tuple[float, float]:
+    start = time.perf_counter()
+    first_token = None
+    async for frame in stream():
+        if first_token is None and not frame.startswith("<|"):
+            first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+
+async def run(runs: int, first_token_latency: float, token_latency: float) -> None:
+    from server.src.models import UserInDB
+    from server.src.services.assistant_service import AssistantService
+    from server.benchmarks.fakes import FakeStreamingChatModel
+
+    user = UserInDB(id=1, username="benchmark", hashed_password="")
+    for name, responses in SCENARIOS.items():
+        results = {}
+        for label in ("streamed", "legacy"):
+            ttft: List[float] = []
+            total: List[float] = []
+            for _ in range(runs):
+                llm = FakeStreamingChatModel(
+                    responses=responses,
+                    streaming=True,
+                    first_token_latency=first_token_latency,
+                    token_latency=token_latency,
+                )
+                service = AssistantService(llm=llm)
+                if label == "streamed":
+                    stream = lambda: service.chat(user, "How am I doing?")
+                else:
+                    stream = lambda: legacy_chat(service, user, "How am I doing?")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    first, whole = await measure(stream)
+                ttft.append(first)
+                total.append(whole)
+            results[label] = (ttft, total)
+
+        print(f"[{name}]")
+        for label, (ttft, total) in results.items():
+            print(f"  {label:<9} first token: {summarize(ttft)}")
+            print(f"  {label:<9} total:       {summarize(total)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    configure_environment()
+    warnings.simplefilter("ignore")
+    asyncio.run(run(args.runs, args.first_token_latency, args.token_latency))
+
+
+if __name__ == "__main__":
+    main()
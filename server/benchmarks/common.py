@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+import tempfile
+import statistics
+from typing import Dict, List, NamedTuple, Optional
+
+
+def configure_environment(db_path: Optional[str] = None) -> str:
+    """
+    Prepare the process for importing the server against a scratch database.
+
+    This must be called before anything from server.src is imported, as the
+    settings and the database singleton are resolved on first import/use.
+
+    Args:
+        db_path (Optional[str]): Path to the SQLite database to use. A fresh
+            temporary file is used when omitted.
+
+    Returns:
+        str: The path of the database the server will use.
+    """
+    for key, value in {
+        "GROQ_API_KEY": "benchmark",
+        "JWT_SECRET_KEY": "benchmark-secret-key-of-at-least-32-bytes",
+        "JWT_ALGORITHM": "HS256",
+        "SERPER_API_KEY": "benchmark",
+        "PLAID_CLIENT_ID": "benchmark",
+        "PLAID_CLIENT_SECRET": "benchmark",
+        "PLAID_ENVIRONMENT": "sandbox",
+    }.items():
+        os.environ.setdefault(key, value)
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="budget_ai_"), "budget_ai.db")
+
+    from server.src.databridge.base_databridge import BaseDatabridge
+
+    BaseDatabridge.get_instance(db_path)
+    return db_path
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples (List[float]): The measured values.
+        percent (float): The percentile to compute, from 0 to 100.
+
+    Returns:
+        float: The value at the requested percentile.
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> str:
+    """Format timing samples (in seconds) as a short millisecond summary."""
+    return (
+        f"mean {statistics.mean(samples) * 1000:8.1f} ms  "
+        f"p50 {percentile(samples, 50) * 1000:8.1f} ms  "
+        f"p95 {percentile(samples, 95) * 1000:8.1f} ms"
+    )
+
+
+class ASGIResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    chunk_times: List[float]  # Seconds from the request to each body chunk
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    body: bytes = b"",
+) -> ASGIResponse:
+    """
+    Send one request straight to an ASGI app, recording when each body chunk is sent.
+
+    Unlike httpx's ASGITransport this does not wait for the whole body, so it
+    shows the latency of streamed responses.
+
+    Args:
+        app: The ASGI application.
+        method (str): The HTTP method.
+        path (str): The path, optionally with a query string.
+        headers (Optional[Dict[str, str]]): Request headers.
+        body (bytes): Request body.
+
+    Returns:
+        ASGIResponse: The status, headers, body and chunk timings of the response.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    status = 0
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+    chunk_times: List[float] = []
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(
+                (k.decode().lower(), v.decode()) for k, v in message["headers"]
+            )
+        elif message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            chunk_times.append(time.perf_counter() - start)
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Starlette re-raises unhandled errors after sending the 500, leave
+        # them to the caller's status check like a server would
+        status = status or 500
+    return ASGIResponse(status, response_headers, b"".join(chunks), chunk_times)
@@ -0,0 +1,107 @@
+"""
+Bandwidth and latency of the API with and without response compression.
+
+Seeds a large synthetic account, requests the list endpoints with each
+Accept-Encoding, and estimates the total time on a given link speed. Also
+checks that the assistant's event stream is not buffered by compression.
+
+    python -m server.benchmarks.compression --rows 10000 --mbps 20
+"""
+
+import io
+import asyncio
+import warnings
+import argparse
+import contextlib
+import statistics
+
+from server.benchmarks.common import asgi_request, configure_environment
+from server.benchmarks.dataset import auth_headers, create_account, create_user
+
+ENCODINGS = {"none": "identity", "gzip": "gzip", "br": "gzip, deflate, br"}
+
+
+async def report_endpoints(app, paths, headers, runs: int, mbps: float) -> None:
+    print(
+        f"{'endpoint':<32}{'encoding':<10}{'bytes':>12}{'server ms':>11}"
+        f"{f'@{mbps:g} Mbit/s ms':>18}"
+    )
+    for path in paths:
+        for name, accept in ENCODINGS.items():
+            samples = []
+            for _ in range(runs):
+                response = await asgi_request(
+                    app, "GET", path, {**headers, "Accept-Encoding": accept}
+                )
+                samples.append(response.chunk_times[-1])
+            encoding = response.headers.get("content-encoding", "identity")
+            size = len(response.body)
+            server = statistics.median(samples) * 1000
+            transfer = size * 8 / (mbps * 1_000_000) * 1000
+            print(
+                f"{path:<32}{encoding:<10}{size:>12,}{server:>11.1f}"
+                f"{server + transfer:>18.1f}"
+            )
+
+
+async def report_stream(app, headers) -> None:
+    from server.src.routers.assistant import get_assistant_service
+    from server.src.services.assistant_service import AssistantService
+    from server.benchmarks.fakes import FakeStreamingChatModel
+
+    # LangChain sets its own warning filters when imported
+    warnings.simplefilter("ignore")
+    answer = "Thought: Do I need to use a tool? No\nAI: " + "You are on budget. " * 40
+    llm = FakeStreamingChatModel(responses=[answer], first_token_latency=0.2)
+    service = AssistantService(llm=llm)
+    app.dependency_overrides[get_assistant_service] = lambda: service
+
+    print(f"\n{'assistant stream':<32}{'encoding':<10}{'chunks':>12}{'first ms':>11}{'total ms':>18}")
+    for name, accept in ENCODINGS.items():
+        # The agent prints its reasoning to stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = await asgi_request(
+                app,
+                "POST",
+                "/api/assistant/chat/?message=How+am+I+doing",
+                {**headers, "Accept-Encoding": accept},
+            )
+        encoding = response.headers.get("content-encoding", "identity")
+        print(
+            f"{'/api/assistant/chat/':<32}{encoding:<10}{len(response.chunk_times):>12}"
+            f"{response.chunk_times[0] * 1000:>11.1f}{response.chunk_times[-1] * 1000:>18.1f}"
+        )
+    app.dependency_overrides.clear()
+
+
+async def run(rows: int, runs: int, mbps: float, db_path: str) -> None:
+    from server.src.main import app
+
+    user_id = create_user(db_path, "benchmark@example.com")
+    account_id = create_account(db_path, user_id, "Checking", rows, rows)
+    headers = auth_headers("benchmark@example.com")
+
+    paths = [
+        "/api/expenses/",
+        "/api/income/",
+        "/api/transactions/?limit=500",
+        f"/api/accounts/{account_id}/transactions/",
+    ]
+    print(f"{rows:,} expenses and {rows:,} income rows, median of {runs} runs\n")
+    await report_endpoints(app, paths, headers, runs, mbps)
+    await report_stream(app, headers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mbps", type=float, default=20, help="Link speed for the estimate")
+    args = parser.parse_args()
+
+    db_path = configure_environment()
+    asyncio.run(run(args.rows, args.runs, args.mbps, db_path))
+
+
+if __name__ == "__main__":
+    main()
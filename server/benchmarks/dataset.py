@@ -0,0 +1,284 @@
+"""
+Synthetic users, accounts and transactions for benchmarking the API.
+
+Rows are inserted directly with executemany so even large datasets are created
+in a few seconds. The random generator is seeded, so the same arguments always
+produce the same data.
+
+Generate a standalone database in the BaseDatabridge schema with:
+
+    python -m server.benchmarks.dataset --users 20 --accounts 3 --years 2 --out bench.db
+"""
+
+import os
+import random
+import sqlite3
+import argparse
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+EXPENSE_CATEGORIES = [
+    "Groceries", "Dining", "Rent", "Utilities", "Transport", "Entertainment",
+    "Health", "Shopping", "Travel", "Subscriptions",
+]
+INCOME_CATEGORIES = ["Salary", "Freelance", "Interest", "Refund"]
+RECURRENCES = [None, None, None, "monthly", "weekly"]
+
+
+def create_user(db_path: str, username: str, hashed_password: str = "!") -> int:
+    """
+    Create a user and return its id. The default password hash matches no password.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        username (str): Username (also used as email) of the new user.
+        hashed_password (str): Password hash to store.
+
+    Returns:
+        int: The id of the user.
+    """
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.execute(
+            "INSERT INTO users (username, full_name, email, hashed_password) VALUES (?, ?, ?, ?)",
+            (username, username.title(), username, hashed_password),
+        )
+        return cursor.lastrowid
+
+
+def create_account(
+    db_path: str,
+    user_id: int,
+    name: str,
+    expenses: int,
+    income: int,
+    days: int = 365,
+    seed: int = 0,
+) -> int:
+    """
+    Create an account with random expenses and income spread over recent days.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        user_id (int): Owner of the account.
+        name (str): Name of the account.
+        expenses (int): Number of expenses to create.
+        income (int): Number of income entries to create.
+        days (int): Number of days before today the transactions are spread over.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        int: The id of the account.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+
+    def random_date() -> str:
+        return (today - timedelta(days=rng.randrange(days))).isoformat()
+
+    with sqlite3.connect(db_path) as conn:
+        account_id = conn.execute(
+            "INSERT INTO accounts (name, type, balance, user_id) VALUES (?, ?, ?, ?)",
+            (name, "checking", round(rng.uniform(500, 20000), 2), user_id),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO expenses (title, amount, date, category, recurrence, account_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    f"Expense {i}",
+                    round(rng.uniform(1, 250), 2),
+                    random_date(),
+                    rng.choice(EXPENSE_CATEGORIES),
+                    rng.choice(RECURRENCES),
+                    account_id,
+                )
+                for i in range(expenses)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO income (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    f"Income {i}",
+                    round(rng.uniform(50, 5000), 2),
+                    random_date(),
+                    rng.choice(INCOME_CATEGORIES),
+                    account_id,
+                )
+                for i in range(income)
+            ),
+        )
+        return account_id
+
+
+def auth_headers(username: str) -> Dict[str, str]:
+    """Authorization headers with a valid access token for the user."""
+    from server.src.services.authentication_service import AuthenticationService
+
+    token = AuthenticationService().create_access_token(
+        {"sub": username}, timedelta(hours=1)
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+# Fixed monthly costs of a checking account: (title, category, low, high, recurrence)
+FIXED_EXPENSES = [
+    ("Rent", "Housing", 900, 2400, "monthly"),
+    ("Electricity", "Utilities", 40, 160, "monthly"),
+    ("Internet", "Utilities", 40, 90, "monthly"),
+    ("Phone", "Utilities", 25, 80, "monthly"),
+    ("Streaming", "Subscriptions", 8, 20, "monthly"),
+    ("Gym", "Health", 20, 60, "monthly"),
+    ("Car insurance", "Transport", 600, 1500, "annually"),
+]
+# Everyday spending: (title, category, low, high, probability per day)
+DAILY_EXPENSES = [
+    ("Coffee", "Dining", 3, 7, 0.5),
+    ("Lunch", "Dining", 8, 25, 0.3),
+    ("Groceries", "Groceries", 20, 160, 0.25),
+    ("Fuel", "Transport", 30, 80, 0.1),
+    ("Online order", "Shopping", 10, 200, 0.1),
+    ("Cinema", "Entertainment", 10, 40, 0.05),
+    ("Pharmacy", "Health", 5, 60, 0.05),
+]
+ACCOUNT_TYPES = ["checking", "credit", "savings"]
+GOALS = [
+    ("Emergency fund", "Three months of expenses", 5000, 15000),
+    ("Vacation", "Trip next summer", 1500, 6000),
+    ("New laptop", "Replace the old one", 1000, 3000),
+    ("House deposit", "Down payment", 20000, 80000),
+]
+
+
+def generate(
+    db_path: str,
+    users: int,
+    accounts_per_user: int,
+    years: float,
+    seed: int = 0,
+    hashed_password: str = "!",
+) -> List[Dict[str, Any]]:
+    """
+    Fill a database with users whose accounts hold several years of realistic history.
+
+    Every user gets a checking account with a bi-weekly "Work" paycheck, fixed
+    recurring bills and everyday spending, further credit and savings accounts,
+    and a few goals. The database must already have the BaseDatabridge schema.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        users (int): Number of users to create.
+        accounts_per_user (int): Number of accounts per user.
+        years (float): Years of transaction history per account.
+        seed (int): Seed for the random generator.
+        hashed_password (str): Password hash stored for every user.
+
+    Returns:
+        List[Dict[str, Any]]: Per user its id, username, account, goal and
+            everyday expense ids.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    days = int(years * 365)
+    created = []
+
+    with sqlite3.connect(db_path) as conn:
+        for number in range(users):
+            username = f"user{number}@example.com"
+            user_id = conn.execute(
+                "INSERT INTO users (username, full_name, email, hashed_password, spend_warning, savings_percent) VALUES (?, ?, ?, ?, ?, ?)",
+                (username, f"User {number}", username, hashed_password,
+                 rng.choice([10, 20, 30]), rng.choice([5, 10, 20])),
+            ).lastrowid
+
+            account_ids = []
+            for index in range(accounts_per_user):
+                account_type = ACCOUNT_TYPES[index % len(ACCOUNT_TYPES)]
+                account_id = conn.execute(
+                    "INSERT INTO accounts (name, type, balance, user_id) VALUES (?, ?, ?, ?)",
+                    (f"{account_type.title()} {index + 1}", account_type,
+                     round(rng.uniform(200, 25000), 2), user_id),
+                ).lastrowid
+                account_ids.append(account_id)
+
+                expenses, income = [], []
+                for offset in range(days, -1, -1):
+                    day = today - timedelta(days=offset)
+                    if account_type == "checking":
+                        if offset % 14 == 0:
+                            income.append(("Paycheck", rng.uniform(1800, 4200), day, "Work"))
+                        for title, category, low, high, recurrence in FIXED_EXPENSES:
+                            due = day.day == 1 if recurrence == "monthly" else day.timetuple().tm_yday == 15
+                            if due:
+                                expenses.append((title, rng.uniform(low, high), day, category, recurrence))
+                    if account_type == "savings":
+                        if day.day == 1:
+                            income.append(("Interest", rng.uniform(1, 60), day, "Interest"))
+                        continue
+                    for title, category, low, high, probability in DAILY_EXPENSES:
+                        if rng.random() < probability:
+                            expenses.append((title, rng.uniform(low, high), day, category, None))
+                    if rng.random() < 0.01:
+                        income.append(("Refund", rng.uniform(5, 150), day, "Refund"))
+
+                conn.executemany(
+                    "INSERT INTO expenses (title, amount, date, category, recurrence, account_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((t, round(a, 2), d.isoformat(), c, r, account_id) for t, a, d, c, r in expenses),
+                )
+                conn.executemany(
+                    "INSERT INTO income (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
+                    ((t, round(a, 2), d.isoformat(), c, account_id) for t, a, d, c in income),
+                )
+
+            goal_ids = []
+            for name, description, low, high in rng.sample(GOALS, rng.randint(1, 3)):
+                goal_ids.append(conn.execute(
+                    "INSERT INTO goals (name, description, amount, date, user_id, completed, progress) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (name, description, round(rng.uniform(low, high), -2),
+                     (today + timedelta(days=rng.randint(90, 1500))).isoformat(),
+                     user_id, 0, round(rng.uniform(0, 0.8), 2)),
+                ).lastrowid)
+
+            # Everyday expenses, which the write scenarios update and delete
+            expense_ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM expenses WHERE account_id IN ({', '.join('?' * len(account_ids))}) AND recurrence IS NULL ORDER BY id",
+                account_ids,
+            )]
+
+            created.append({
+                "id": user_id,
+                "username": username,
+                "accounts": account_ids,
+                "goals": goal_ids,
+                "expenses": expense_ids,
+            })
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Budget.AI database")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=2, help="Accounts per user")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        parser.error(f"{args.out} already exists")
+
+    from server.benchmarks.common import configure_environment
+
+    configure_environment(args.out)
+    users = generate(args.out, args.users, args.accounts, args.years, args.seed)
+
+    with sqlite3.connect(args.out) as conn:
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "accounts", "expenses", "income", "goals")
+        }
+    print(f"{args.out}: " + ", ".join(f"{count:,} {table}" for table, count in counts.items()))
+    print(f"Users are named user0@example.com to user{len(users) - 1}@example.com")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import re
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Local stand-in for ChatGroq that replays canned responses with latency.
+
+    Responses are handed out in order (wrapping around), and are streamed as
+    word-sized tokens so the timing resembles a hosted model. Like ChatGroq in
+    AssistantService, it streams even when called through generate.
+    """
+
+    responses: List[str]
+    streaming: bool = True
+    first_token_latency: float = 0.3
+    token_latency: float = 0.01
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _next_response(self) -> str:
+        response = self.responses[self.calls % len(self.responses)]
+        self.calls += 1
+        return response
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = AIMessage(content=self._next_response())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            return await agenerate_from_stream(
+                self._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+        return self._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for token in re.findall(r"\S+\s*", self._next_response()):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for token in re.findall(r"\S+\s*", self._next_response()):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class LocalHTTPServer:
+    """
+    Minimal HTTP stand-in for websites and the Serper search API.
+
+    Routes map a path to a (status, content type, body) tuple and are served
+    for both GET and POST on a background thread:
+
+        with LocalHTTPServer({"/page": (200, "text/html", b"<p>hi</p>")}) as server:
+            url = server.url("/page")
+    """
+
+    def __init__(self, routes: Dict[str, Tuple[int, str, bytes]], delay: float = 0):
+        self.routes = routes
+        self.delay = delay
+        self.requests: List[str] = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                server.requests.append(self.path)
+                if server.delay:
+                    time.sleep(server.delay)
+                status, content_type, body = server.routes.get(
+                    self.path, (404, "text/plain", b"Not found")
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeRateLimitError(Exception):
+    """Mimics groq.RateLimitError, including the wording of its message."""
+
+    status_code = 429
+
+
+class FakeQuotaChatModel(FakeStreamingChatModel):
+    """
+    FakeStreamingChatModel that enforces a request quota over a sliding window
+    and rejects requests beyond it with a Groq-style rate limit error.
+    """
+
+    requests_per_window: int = 10
+    window: float = 1.0
+    accepted: List[float] = []
+    rejected: int = 0
+
+    def _check_quota(self) -> None:
+        now = time.monotonic()
+        self.accepted = [t for t in self.accepted if now - t < self.window]
+        if len(self.accepted) >= self.requests_per_window:
+            self.rejected += 1
+            wait = self.window - (now - self.accepted[0]) if self.accepted else self.window
+            raise FakeRateLimitError(
+                "Error code: 429 - Rate limit reached for model `fake` on requests "
+                f"per minute (RPM): Limit {self.requests_per_window}, Used "
+                f"{len(self.accepted)}, Requested 1. Please try again in {wait:.3f}s."
+            )
+        self.accepted.append(now)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_quota()
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check_quota()
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+class FakePlaidModel(dict):
+    """A Plaid API model: a dictionary with to_dict, like the SDK's models."""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+class FakePlaidDatabridge:
+    """
+    Local stand-in for PlaidDatabridge, so Plaid jobs can run without the
+    sandbox. Every item has a fixed list of transactions, and calls take a
+    little time like the real API. Calls are recorded by method and token.
+    Webhook verification keys are looked up in webhook_keys by key id.
+    """
+
+    def __init__(self, transactions_per_item: int = 50, latency: float = 0.05):
+        self.transactions_per_item = transactions_per_item
+        self.latency = latency
+        self.calls: List[Tuple[str, str]] = []
+        self.webhook_keys: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, token: str) -> None:
+        with self._lock:
+            self.calls.append((method, token))
+        time.sleep(self.latency)
+
+    def exchange_public_token(self, public_token: str) -> Tuple[str, str]:
+        self._call("exchange_public_token", public_token)
+        return f"access-{public_token}", f"item-{public_token}"
+
+    def get_item_id(self, token: str) -> str:
+        self._call("get_item_id", token)
+        return token.replace("access-", "item-", 1)
+
+    def get_webhook_verification_key(self, key_id: str) -> Dict[str, Any]:
+        self._call("get_webhook_verification_key", key_id)
+        if key_id not in self.webhook_keys:
+            # Plaid answers 400 for key ids it doesn't know
+            import plaid
+
+            raise plaid.ApiException(status=400, reason="INVALID_WEBHOOK_VERIFICATION_KEY_ID")
+        return dict(self.webhook_keys[key_id])
+
+    def get_balance(self, token: str) -> List[FakePlaidModel]:
+        self._call("get_balance", token)
+        return [
+            FakePlaidModel(
+                account_id=f"{token}-0",
+                type="depository",
+                balances={"available": 1200.0, "current": 1250.0, "limit": None},
+            )
+        ]
+
+    def get_transactions(self, token: str, transaction_request) -> List[FakePlaidModel]:
+        self._call("get_transactions", token)
+        return [
+            FakePlaidModel(
+                transaction_id=f"{token}-{index}",
+                name=f"Transaction {index}",
+                amount=-1500.0 if index % 10 == 0 else 5.0 + index,
+                date=transaction_request.end_date,
+                category=["Food and Drink"] if index % 2 else None,
+            )
+            for index in range(self.transactions_per_item)
+        ]
@@ -0,0 +1,112 @@
+"""
+Serialization cost of the list endpoints at 10k rows.
+
+Seeds one account with --rows expenses and --rows income, then times each
+endpoint through the ASGI app, and separately times the previous response
+path (DataFrame records -> jsonable_encoder -> json) against the current one
+(cursor rows -> orjson) for the same query.
+
+    python -m server.benchmarks.json_endpoints --rows 10000
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from typing import Callable, List
+
+from server.benchmarks.common import configure_environment, summarize
+from server.benchmarks.dataset import auth_headers, create_account, create_user
+
+
+def timed(call: Callable[[], object], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_endpoint(client, path: str, headers: dict, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return samples
+
+
+async def run(rows: int, runs: int, db_path: str) -> None:
+    import httpx
+    from fastapi.encoders import jsonable_encoder
+    from server.src.main import app
+    from server.src.responses import ORJSONResponse
+    from server.src.databridge.base_databridge import BaseDatabridge
+
+    user_id = create_user(db_path, "benchmark@example.com")
+    account_id = create_account(db_path, user_id, "Checking", rows, rows)
+    headers = auth_headers("benchmark@example.com")
+    db = BaseDatabridge.get_instance()
+
+    # The queries each endpoint runs, concatenated like the endpoint does
+    queries = {
+        "/api/expenses/": [
+            (
+                "SELECT e.* FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE a.user_id = ?",
+                (user_id,),
+            )
+        ],
+        "/api/income/": [
+            (
+                "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id WHERE a.user_id = ?",
+                (user_id,),
+            )
+        ],
+        f"/api/accounts/{account_id}/transactions/": [
+            ("SELECT *, 'expense' as type FROM expenses WHERE account_id = ?", (account_id,)),
+            ("SELECT *, 'income' as type FROM income WHERE account_id = ?", (account_id,)),
+        ],
+    }
+
+    print(f"{rows:,} expenses and {rows:,} income rows, {runs} runs each\n")
+    print("query + serialization")
+    for path, statements in queries.items():
+
+        def legacy():
+            records = []
+            for sql, params in statements:
+                records += db.query(sql, params).to_dict(orient="records")
+            return json.dumps(jsonable_encoder(records)).encode()
+
+        def fast():
+            rows = []
+            for sql, params in statements:
+                rows += db.fetch_all(sql, params)
+            return ORJSONResponse(rows).body
+
+        print(f"  {path}")
+        print(f"    DataFrame + json  {summarize(timed(legacy, runs))}")
+        print(f"    rows + orjson     {summarize(timed(fast, runs))}")
+
+    print("\nendpoint round trip")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for path in queries:
+            samples = await time_endpoint(client, path, headers, runs)
+            print(f"  {path:<32}{summarize(samples)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = configure_environment()
+    asyncio.run(run(args.rows, args.runs, db_path))
+
+
+if __name__ == "__main__":
+    main()
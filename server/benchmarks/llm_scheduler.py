@@ -0,0 +1,88 @@
+"""
+Behaviour of the LLM scheduler under a burst of requests.
+
+A fake LLM enforces a request quota and answers requests beyond it with
+Groq-style rate limit errors. The same burst (one heavy user and several
+light users) is sent directly to the fake and through ScheduledChatModel,
+reporting failures and per-user completion times.
+
+    python -m server.benchmarks.llm_scheduler
+"""
+
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from server.benchmarks.common import summarize
+
+
+async def burst(make_llm, requests: Dict[int, int]) -> None:
+    results: Dict[int, List[float]] = defaultdict(list)
+    failures = 0
+    start = time.perf_counter()
+
+    async def call(user_id: int) -> None:
+        nonlocal failures
+        try:
+            await make_llm(user_id).ainvoke([HumanMessage(content="How am I doing?")])
+            results[user_id].append(time.perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    await asyncio.gather(
+        *(call(user_id) for user_id, count in requests.items() for _ in range(count))
+    )
+    print(f"  failed requests: {failures}")
+    for user_id, samples in sorted(results.items()):
+        print(f"  user {user_id} ({len(samples):>2} ok) done at: {summarize(samples)}")
+
+
+async def run(quota: int, window: float, heavy: int, light: int, users: int) -> None:
+    from server.benchmarks.fakes import FakeQuotaChatModel
+    from server.src.services.llm_scheduler import LLMScheduler, ScheduledChatModel
+
+    requests = {1: heavy, **{user_id: light for user_id in range(2, users + 2)}}
+    fake_options = dict(
+        responses=["AI: You are on track."],
+        first_token_latency=0.05,
+        token_latency=0,
+        requests_per_window=quota,
+        window=window,
+    )
+
+    print("[direct]")
+    fake = FakeQuotaChatModel(**fake_options)
+    await burst(lambda user_id: fake, requests)
+
+    print("[scheduled]")
+    fake = FakeQuotaChatModel(**fake_options)
+    scheduler = LLMScheduler(
+        max_concurrency=4,
+        requests_per_minute=quota * 60 / window,
+        tokens_per_minute=10**9,
+        max_retries=3,
+    )
+    await burst(
+        lambda user_id: ScheduledChatModel(llm=fake, scheduler=scheduler, user_id=user_id),
+        requests,
+    )
+    print(f"  rate limit errors from the fake: {fake.rejected}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quota", type=int, default=10, help="requests per window")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--heavy", type=int, default=20, help="requests from user 1")
+    parser.add_argument("--light", type=int, default=2, help="requests per other user")
+    parser.add_argument("--users", type=int, default=5, help="number of other users")
+    args = parser.parse_args()
+    asyncio.run(run(args.quota, args.window, args.heavy, args.light, args.users))
+
+
+if __name__ == "__main__":
+    main()
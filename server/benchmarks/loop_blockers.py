@@ -0,0 +1,89 @@
+"""
+Rank the calls that block the event loop, by route and call site.
+
+Runs the benchmark suite's requests with the LoopMonitor on, then reads the
+event loop metrics back from /metrics and lists the worst blockers:
+
+    python -m server.benchmarks.loop_blockers --threshold 20 --requests 50
+"""
+
+import io
+import re
+import asyncio
+import argparse
+import warnings
+import contextlib
+from collections import defaultdict
+from typing import Dict, Tuple
+
+from server.benchmarks.common import asgi_request
+
+SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def read_counters(text: str, name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+    """Parse the samples of a counter from the Prometheus text format."""
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE.match(line)
+        if match and match.group(1) == name:
+            samples[tuple(LABEL.findall(match.group(2)))] = float(match.group(3))
+    return samples
+
+
+async def run(args: argparse.Namespace) -> None:
+    from server.benchmarks.suite import SCENARIOS, generate_users, run_scenario
+
+    users = generate_users(args)
+    from server.src.main import app
+    from server.src.loop_monitor import LoopMonitor
+    from server.src.middleware import LoopMonitorMiddleware
+
+    warnings.simplefilter("ignore")
+
+    monitor = LoopMonitor(args.threshold, args.interval)
+    app.add_middleware(LoopMonitorMiddleware, monitor=monitor)
+    monitor.start()
+    for scenario in SCENARIOS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await run_scenario(
+                app, scenario, users, scenario.requests or args.requests, args.concurrency
+            )
+    await monitor.stop()
+
+    text = (await asgi_request(app, "GET", "/metrics")).body.decode()
+    blocks = read_counters(text, "event_loop_blocks_total")
+    blocked = read_counters(text, "event_loop_blocked_seconds_total")
+
+    by_route = defaultdict(list)
+    for labels, count in blocks.items():
+        labels = dict(labels)
+        by_route[labels["route"]].append((count, labels["location"]))
+
+    print(f"Blocks over {args.threshold:g} ms, worst routes first\n")
+    ranking = sorted(blocked.items(), key=lambda item: -item[1])
+    for labels, seconds in ranking:
+        route = dict(labels)["route"]
+        count = sum(count for count, _ in by_route[route])
+        print(f"{route:<45}{count:>6.0f} blocks {seconds * 1000:>10.0f} ms lag")
+        for count, location in sorted(by_route[route], reverse=True)[: args.top]:
+            print(f"    {count:>5.0f}  {location}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=20, help="Milliseconds")
+    parser.add_argument("--interval", type=float, default=10, help="Heartbeat milliseconds")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=3, help="Accounts per user")
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top", type=int, default=3, help="Call sites per route")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
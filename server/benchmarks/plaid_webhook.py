@@ -0,0 +1,236 @@
+"""
+Fake Plaid webhook sender, for trying the webhook receiver without Plaid.
+
+Sends TRANSACTIONS webhooks the way Plaid does, unsigned, so the server
+must run with PLAID_WEBHOOK_VERIFY=false. Against a running server:
+
+    python -m server.benchmarks.plaid_webhook --url http://localhost:8000/api/plaid/webhook/ --item-id ITEM
+
+Without --url, a scratch database is set up with linked items and a fake
+Plaid client, duplicate webhooks are sent for every item at once, and the
+syncs they caused are reported:
+
+    python -m server.benchmarks.plaid_webhook --items 5 --duplicates 20
+
+With --signed, verification stays on: the webhooks are signed with a locally
+generated ES256 key that the fake Plaid client hands out, and webhooks signed
+with an unknown key are sent along and must be rejected:
+
+    python -m server.benchmarks.plaid_webhook --signed
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+import warnings
+import contextlib
+from typing import Any, Dict, List, Optional
+
+import jwt
+import httpx
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from server.benchmarks.common import asgi_request, configure_environment
+
+
+def webhook_body(item_id: str, code: str = "DEFAULT_UPDATE", new_transactions: int = 1) -> bytes:
+    """
+    Build the body of a Plaid TRANSACTIONS webhook.
+
+    Args:
+        item_id (str): The item with new transactions.
+        code (str): The webhook code, such as DEFAULT_UPDATE or SYNC_UPDATES_AVAILABLE.
+        new_transactions (int): Number of new transactions reported.
+
+    Returns:
+        bytes: The JSON body.
+    """
+    return json.dumps(
+        {
+            "webhook_type": "TRANSACTIONS",
+            "webhook_code": code,
+            "item_id": item_id,
+            "new_transactions": new_transactions,
+            "error": None,
+            "environment": "sandbox",
+        }
+    ).encode()
+
+
+def sign_webhook(body: bytes, key: ec.EllipticCurvePrivateKey, key_id: str) -> str:
+    """
+    Sign a webhook body the way Plaid does, for the Plaid-Verification header.
+
+    Args:
+        body (bytes): The JSON body.
+        key (ec.EllipticCurvePrivateKey): The P-256 key to sign with.
+        key_id (str): The key id put in the JWT header.
+
+    Returns:
+        str: The ES256 JWT holding the SHA-256 of the body.
+    """
+    return jwt.encode(
+        {"iat": int(time.time()), "request_body_sha256": hashlib.sha256(body).hexdigest()},
+        key,
+        algorithm="ES256",
+        headers={"kid": key_id},
+    )
+
+
+def webhook_jwk(key: ec.EllipticCurvePrivateKey, key_id: str) -> Dict[str, Any]:
+    """The public key of a signing key as Plaid's key endpoint returns it."""
+    jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(key.public_key()))
+    jwk.update(kid=key_id, alg="ES256", use="sig", created_at=int(time.time()), expired_at=None)
+    return jwk
+
+
+async def send_webhooks(url: str, item_id: str, code: str, repeat: int) -> List[Dict[str, Any]]:
+    """Send the same webhook to a running server several times at once."""
+    body = webhook_body(item_id, code)
+    async with httpx.AsyncClient() as client:
+        responses = await asyncio.gather(
+            *(
+                client.post(url, content=body, headers={"content-type": "application/json"})
+                for _ in range(repeat)
+            )
+        )
+    return [{"status": response.status_code, "body": response.json()} for response in responses]
+
+
+def link_items(db_path: str, items: int) -> List[str]:
+    """Create a user with linked items, as imported before. Returns the item ids."""
+    from server.benchmarks.dataset import create_user
+    from server.src.databridge.base_databridge import BaseDatabridge
+
+    db = BaseDatabridge.get_instance()
+    user_id = create_user(db_path, "webhook")
+    item_ids = []
+    for index in range(items):
+        name = f"Bank {index}"
+        db.execute(
+            "INSERT INTO tokens (user_id, name, key, item_id) VALUES (?, ?, ?, ?)",
+            (user_id, name, f"access-{index}", f"item-{index}"),
+        )
+        db.execute(
+            "INSERT INTO accounts (name, type, balance, user_id) VALUES (?, ?, ?, ?)",
+            (name, "depository", 0, user_id),
+        )
+        item_ids.append(f"item-{index}")
+    return item_ids
+
+
+async def run_local(args: argparse.Namespace) -> None:
+    os.environ["PLAID_WEBHOOK_VERIFY"] = "true" if args.signed else "false"
+    # Only the webhooks should cause syncs
+    os.environ["PLAID_SYNC_INTERVAL"] = "0"
+    db_path = configure_environment()
+
+    from server.benchmarks.fakes import FakePlaidDatabridge
+    from server.src.main import app, lifespan
+    from server.src.routers import plaid as plaid_router
+    from server.src.services.job_queue import JobQueue
+
+    warnings.simplefilter("ignore")
+
+    fake = FakePlaidDatabridge(args.transactions, args.latency)
+    plaid_router.get_plaid_service().plaid = fake
+    item_ids = link_items(db_path, args.items)
+
+    signing_key: Optional[ec.EllipticCurvePrivateKey] = None
+    if args.signed:
+        signing_key = ec.generate_private_key(ec.SECP256R1())
+        fake.webhook_keys["benchmark"] = webhook_jwk(signing_key, "benchmark")
+
+    def headers(body: bytes, key_id: str = "benchmark") -> Dict[str, str]:
+        headers = {"content-type": "application/json"}
+        if signing_key is not None:
+            headers["plaid-verification"] = sign_webhook(body, signing_key, key_id)
+        return headers
+
+    async with lifespan(app):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            responses = await asyncio.gather(
+                *(
+                    asgi_request(
+                        app,
+                        "POST",
+                        "/api/plaid/webhook/",
+                        headers(webhook_body(item_id)),
+                        webhook_body(item_id),
+                    )
+                    for item_id in item_ids
+                    for _ in range(args.duplicates)
+                )
+            )
+            # Signed with a key Plaid never issued
+            forged = []
+            if args.signed:
+                forged = await asyncio.gather(
+                    *(
+                        asgi_request(
+                            app,
+                            "POST",
+                            "/api/plaid/webhook/",
+                            headers(webhook_body(item_id), f"forged-{item_id}"),
+                            webhook_body(item_id),
+                        )
+                        for item_id in item_ids
+                    )
+                )
+        acknowledged = time.perf_counter() - start
+        jobs = {
+            job
+            for response in responses
+            if response.status == 200
+            for job in json.loads(response.body)["jobs"]
+        }
+
+        queue = JobQueue.get_instance()
+        while queue.pending("plaid_sync_token"):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+    fetches = sum(1 for method, _ in fake.calls if method == "get_transactions")
+    statuses = sorted({response.status for response in responses})
+    print(f"Webhooks sent         {len(responses):>8}  (statuses {statuses})")
+    if args.signed:
+        print(f"Forged webhooks       {len(forged):>8}  (statuses {sorted({r.status for r in forged})})")
+        keys = sum(1 for method, _ in fake.calls if method == "get_webhook_verification_key")
+        print(f"Key fetches           {keys:>8}")
+    print(f"Acknowledged in       {acknowledged * 1000:>8.0f} ms")
+    print(f"Sync jobs queued      {len(jobs):>8}  for {len(item_ids)} items")
+    print(f"Plaid fetches         {fetches:>8}")
+    print(f"All synced in         {elapsed * 1000:>8.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Webhook URL of a running server")
+    parser.add_argument("--item-id", help="Item to notify about, with --url")
+    parser.add_argument("--code", default="DEFAULT_UPDATE")
+    parser.add_argument("--repeat", type=int, default=1, help="Copies to send, with --url")
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--duplicates", type=int, default=20, help="Webhooks per item")
+    parser.add_argument("--transactions", type=int, default=200, help="Per item")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per Plaid call")
+    parser.add_argument("--signed", action="store_true", help="Sign the webhooks, verification on")
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.item_id:
+            parser.error("--item-id is required with --url")
+        if args.signed:
+            parser.error("--signed needs the fake Plaid client, so can't be used with --url")
+        for response in asyncio.run(send_webhooks(args.url, args.item_id, args.code, args.repeat)):
+            print(response["status"], response["body"])
+    else:
+        asyncio.run(run_local(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Database statements per endpoint, checked against a budget.
+
+Sends every request of the benchmark suite once for each generated user with
+the query statistics headers turned on, and fails when an endpoint runs more
+statements than its budget, runs the same statement more often than allowed,
+or answers with a server error. A query per row (N+1) shows up as the repeats
+growing with the data:
+
+    python -m server.benchmarks.query_budget --users 5 --accounts 3
+
+Exits with status 1 when a budget is exceeded or a request fails, so it can
+gate CI runs.
+"""
+
+import io
+import os
+import sys
+import asyncio
+import argparse
+import warnings
+import contextlib
+from typing import Dict, List, NamedTuple, Optional
+
+from server.benchmarks.common import asgi_request
+
+
+class Budget(NamedTuple):
+    statements: int
+    # Most times any single statement may run in one request
+    repeats: int = 1
+
+
+class QueryCount(NamedTuple):
+    statements: int
+    rows: int
+    repeats: int
+    fingerprint: Optional[str]
+
+
+# Every request authenticates (one user lookup) and most check the user's
+# data version for the ETag. Budgets must not depend on the size of the data.
+BUDGETS: Dict[str, Budget] = {
+    "POST /token/": Budget(1),
+    "GET /users/me/": Budget(2),
+    # Writes check the spend alert, which works out the budget allotment again
+    # when something it depends on changed
+    "PUT /users/me/update-spend-warning/": Budget(9),
+    "GET /accounts/": Budget(3),
+    "GET /accounts/{id}/": Budget(3),
+    "GET /accounts/{id}/transactions/": Budget(5),
+    "GET /accounts/{id}/transactions/ page": Budget(4),
+    "GET /expenses/": Budget(3),
+    "GET /expenses/ page": Budget(3),
+    "GET /expenses/fixed-per-month/": Budget(3),
+    "POST /expenses/": Budget(6),
+    "PUT /expenses/{id}/": Budget(6),
+    "DELETE /expenses/{id}/": Budget(6),
+    "GET /income/": Budget(3),
+    "GET /transactions/": Budget(4),
+    "GET /transactions/search/": Budget(3),
+    "GET /spend/budget-allotment/": Budget(5),
+    "GET /spend/spend-over-time/": Budget(3),
+    "GET /goals/": Budget(3),
+    "PUT /goals/{id}/": Budget(9),
+    "GET /sync/": Budget(6),
+    "GET /assistant/history/": Budget(2),
+    # One query per part, the parts run concurrently
+    "GET /dashboard/summary/": Budget(9),
+}
+
+
+def parse_query_headers(headers: Dict[str, str]) -> QueryCount:
+    """
+    Read the statement counts from the headers of QueryStatsMiddleware.
+
+    Args:
+        headers (Dict[str, str]): Response headers with lowercase names.
+
+    Returns:
+        QueryCount: The statements, rows and most repeated statement of the request.
+    """
+    if "x-query-count" not in headers:
+        raise RuntimeError("Query statistics headers are off, set QUERY_STATS_HEADERS=true")
+    repeats, _, fingerprint = headers["x-query-max-repeats"].partition("; fingerprint=")
+    return QueryCount(
+        int(headers["x-query-count"]),
+        int(headers["x-query-rows"]),
+        int(repeats),
+        fingerprint or None,
+    )
+
+
+def over_budget(request: str, count: QueryCount, budget: Budget) -> Optional[str]:
+    """Describe how a request exceeded its budget, or return None if it did not."""
+    if count.statements > budget.statements:
+        return (
+            f"{request} ran {count.statements} statements, "
+            f"the budget is {budget.statements}"
+        )
+    if count.repeats > budget.repeats:
+        return (
+            f"{request} ran statement {count.fingerprint} {count.repeats} times, "
+            f"the budget is {budget.repeats}"
+        )
+    return None
+
+
+async def assert_query_budget(
+    app,
+    method: str,
+    path: str,
+    budget: Budget,
+    headers: Optional[Dict[str, str]] = None,
+    body: bytes = b"",
+) -> QueryCount:
+    """
+    Send a request and check the statements it ran against a budget.
+
+    Args:
+        app: The ASGI application, with QueryStatsMiddleware installed.
+        method (str): The HTTP method.
+        path (str): The path, optionally with a query string.
+        budget (Budget): The most statements and repeats the request may run.
+        headers (Optional[Dict[str, str]]): Request headers.
+        body (bytes): Request body.
+
+    Returns:
+        QueryCount: The statements the request ran.
+
+    Raises:
+        AssertionError: If the request failed or ran more statements than its budget.
+    """
+    response = await asgi_request(app, method, path, headers, body)
+    assert response.status < 500, f"{method} {path} answered {response.status}"
+    count = parse_query_headers(response.headers)
+    failure = over_budget(f"{method} {path}", count, budget)
+    assert failure is None, failure
+    return count
+
+
+async def run(args: argparse.Namespace) -> List[str]:
+    from server.benchmarks.suite import SCENARIOS, build_request, generate_users
+
+    users = generate_users(args)
+    from server.src.main import app
+
+    warnings.simplefilter("ignore")
+
+    failures = []
+    print(f"{'endpoint':<40}{'statements':>11}{'repeats':>9}{'rows':>9}{'budget':>9}")
+    for scenario in SCENARIOS:
+        budget = BUDGETS[scenario.name]
+        worst = None
+        errors = 0
+        for user in users:
+            path, headers, body = build_request(scenario, user)
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = await asgi_request(app, scenario.method, path, headers, body)
+            # Unhandled errors are answered outside the middleware, without
+            # counts, and fail the run like an exceeded budget
+            if response.status >= 500:
+                errors += 1
+                continue
+            count = parse_query_headers(response.headers)
+            if worst is None or count > worst:
+                worst = count
+        if errors:
+            failures.append(f"{scenario.name} failed {errors} of {len(users)} requests")
+        if worst is None:
+            print(f"{scenario.name:<40}{'every request failed':>38}")
+            continue
+        failure = over_budget(scenario.name, worst, budget)
+        if failure:
+            failures.append(failure)
+        flag = "  over" if failure else ""
+        print(
+            f"{scenario.name:<40}{worst.statements:>11}{worst.repeats:>9}{worst.rows:>9,}"
+            f"{f'{budget.statements}/{budget.repeats}':>9}{flag}"
+            + (f"  ({errors} requests failed)" if errors else "")
+        )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--accounts", type=int, default=3, help="Accounts per user")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Must be set before the settings are loaded
+    os.environ["QUERY_STATS_HEADERS"] = "true"
+    failures = asyncio.run(run(args))
+    if failures:
+        print("\nQuery budget failed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
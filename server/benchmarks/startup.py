@@ -0,0 +1,100 @@
+"""
+Import time of the API server, the main cost of a cold start or a worker respawn.
+
+Imports server.src.main in a fresh interpreter with `-X importtime` several
+times, reports the best run and the heaviest modules, and exits with status 1
+when the import takes longer than the budget.
+
+    python -m server.benchmarks.startup --budget 800
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Tuple
+
+from server.benchmarks.common import configure_environment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import a module in a new interpreter and collect the cumulative import times.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        Tuple[float, Dict[str, float]]: The total import time of the module and the
+            cumulative time of each top-level package it imported, in milliseconds.
+    """
+    # main.py mounts ./client/dist/assets, so run from a directory that has it
+    cwd = tempfile.mkdtemp(prefix="budget_ai_startup_")
+    os.makedirs(os.path.join(cwd, "client", "dist", "assets"))
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)) / 1000, match.group(4)
+        if name == module:
+            total = cumulative
+        elif name.startswith("server.src."):
+            packages[name] = max(packages.get(name, 0), cumulative)
+        elif "." not in name:
+            packages[name] = max(packages.get(name, 0), cumulative)
+    return total, packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="server.src.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--budget", type=float, default=None, help="Maximum import time in ms"
+    )
+    args = parser.parse_args()
+
+    # The child interpreter reads its settings from the environment
+    configure_environment()
+
+    best = None
+    for _ in range(args.runs):
+        total, packages = measure_import(args.module)
+        if best is None or total < best[0]:
+            best = (total, packages)
+    total, packages = best
+
+    print(f"import {args.module}: {total:.0f} ms (best of {args.runs})")
+    print(f"{'module':<50}{'cumulative ms':>14}")
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    for name, cumulative in heaviest[: args.top]:
+        print(f"{name:<50}{cumulative:>14.1f}")
+
+    if args.budget is not None:
+        if total > args.budget:
+            print(f"over budget: {total:.0f} ms > {args.budget:.0f} ms")
+            sys.exit(1)
+        print(f"within budget: {total:.0f} ms <= {args.budget:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Latency and throughput of every router against a generated database.
+
+Generates a database with server.benchmarks.dataset, then drives each endpoint
+in-process through the ASGI app and reports p50/p95/p99 latency and throughput
+per endpoint:
+
+    python -m server.benchmarks.suite --users 20 --accounts 3 --years 2
+
+Compare two git revisions (the second defaults to the working tree). Each
+revision is checked out in a temporary worktree and measured with this suite
+on the same generated data:
+
+    python -m server.benchmarks.suite --compare main HEAD
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import warnings
+import tempfile
+import contextlib
+import subprocess
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from server.benchmarks.common import asgi_request, configure_environment, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PASSWORD = "benchmark-password"
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # Builds the path and JSON body for a user
+    request: Callable[[Dict[str, Any]], tuple]
+    # Overrides --requests for expensive endpoints
+    requests: Optional[int] = None
+    authenticated: bool = True
+
+
+def expense(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": "Benchmark",
+        "amount": 12.5,
+        "date": "2024-01-01",
+        "category": "Dining",
+        "recurrence": None,
+        "account_id": user["accounts"][0],
+    }
+
+
+def goal() -> Dict[str, Any]:
+    return {
+        "name": "Benchmark",
+        "description": "Benchmark goal",
+        "amount": 1000,
+        "date": "2030-01-01",
+        "completed": False,
+        "progress": 0.5,
+    }
+
+
+SCENARIOS = [
+    Scenario("POST /token/", "POST", lambda u: ("/api/token/", None), requests=10, authenticated=False),
+    Scenario("GET /users/me/", "GET", lambda u: ("/api/users/me/", None)),
+    Scenario("PUT /users/me/update-spend-warning/", "PUT", lambda u: ("/api/users/me/update-spend-warning/?spend_warning=20", None)),
+    Scenario("GET /accounts/", "GET", lambda u: ("/api/accounts/", None)),
+    Scenario("GET /accounts/{id}/", "GET", lambda u: (f"/api/accounts/{u['accounts'][0]}/", None)),
+    Scenario("GET /accounts/{id}/transactions/", "GET", lambda u: (f"/api/accounts/{u['accounts'][0]}/transactions/", None)),
+    Scenario("GET /accounts/{id}/transactions/ page", "GET", lambda u: (f"/api/accounts/{u['accounts'][0]}/transactions/?limit=50", None)),
+    Scenario("GET /expenses/", "GET", lambda u: ("/api/expenses/", None)),
+    Scenario("GET /expenses/ page", "GET", lambda u: ("/api/expenses/?limit=50&start_date=2024-01-01", None)),
+    Scenario("GET /expenses/fixed-per-month/", "GET", lambda u: ("/api/expenses/fixed-per-month/", None)),
+    Scenario("POST /expenses/", "POST", lambda u: ("/api/expenses/", expense(u))),
+    Scenario("PUT /expenses/{id}/", "PUT", lambda u: (f"/api/expenses/{u['expenses'][0]}/", expense(u))),
+    # Every request deletes another expense, from the end of the user's list
+    Scenario("DELETE /expenses/{id}/", "DELETE", lambda u: (f"/api/expenses/{u['expenses'].pop()}/", None)),
+    Scenario("GET /income/", "GET", lambda u: ("/api/income/", None)),
+    Scenario("GET /transactions/", "GET", lambda u: ("/api/transactions/?limit=50", None)),
+    Scenario("GET /transactions/search/", "GET", lambda u: ("/api/transactions/search/?q=groc&limit=20", None)),
+    Scenario("GET /spend/budget-allotment/", "GET", lambda u: ("/api/spend/budget-allotment/", None)),
+    Scenario("GET /spend/spend-over-time/", "GET", lambda u: ("/api/spend/spend-over-time/?start_date=2024-01-01&end_date=2024-12-31", None)),
+    Scenario("GET /goals/", "GET", lambda u: ("/api/goals/", None)),
+    Scenario("PUT /goals/{id}/", "PUT", lambda u: (f"/api/goals/{u['goals'][0]}/", goal())),
+    Scenario("GET /sync/", "GET", lambda u: ("/api/sync/?limit=1000", None)),
+    Scenario("GET /assistant/history/", "GET", lambda u: ("/api/assistant/history/", None)),
+    Scenario("GET /dashboard/summary/", "GET", lambda u: ("/api/dashboard/summary/", None)),
+]
+
+
+def build_request(scenario: Scenario, user: Dict[str, Any]) -> Tuple[str, Dict[str, str], bytes]:
+    """Build the path, headers and body of a scenario's request for a user."""
+    path, body = scenario.request(user)
+    headers = dict(user["headers"]) if scenario.authenticated else {}
+    content = b""
+    if scenario.name == "POST /token/":
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        content = f"username={user['username']}&password={PASSWORD}".encode()
+    elif body is not None:
+        headers["Content-Type"] = "application/json"
+        content = json.dumps(body).encode()
+    return path, headers, content
+
+
+async def run_scenario(
+    app, scenario: Scenario, users: List[Dict[str, Any]], requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """Send the scenario's requests from several concurrent clients and summarize them."""
+    samples: List[float] = []
+    statuses: Dict[int, int] = {}
+    sizes: List[int] = []
+    counter = iter(range(requests))
+
+    async def send(index: int):
+        path, headers, content = build_request(scenario, users[index % len(users)])
+        return await asgi_request(app, scenario.method, path, headers, content)
+
+    # Load anything the endpoint initializes lazily before measuring
+    await send(0)
+
+    async def client():
+        for index in counter:
+            start = time.perf_counter()
+            response = await send(index)
+            samples.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            sizes.append(len(response.body))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(samples),
+        "status": max(statuses, key=statuses.get),
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "p50": percentile(samples, 50) * 1000,
+        "p95": percentile(samples, 95) * 1000,
+        "p99": percentile(samples, 99) * 1000,
+        "rps": len(samples) / elapsed,
+        "bytes": sum(sizes) // len(sizes),
+    }
+
+
+def generate_users(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Generate the dataset in a scratch database and log every user in."""
+    from server.benchmarks.dataset import auth_headers, generate
+
+    db_path = configure_environment()
+    from server.src.services.authentication_service import AuthenticationService
+
+    hashed_password = AuthenticationService().get_password_hash(PASSWORD)
+    users = generate(
+        db_path, args.users, args.accounts, args.years, args.seed, hashed_password
+    )
+    for user in users:
+        user["headers"] = auth_headers(user["username"])
+    return users
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    users = generate_users(args)
+
+    from server.src.main import app
+
+    # LangChain, passlib and PyJWT warn on import and use
+    warnings.simplefilter("ignore")
+
+    results = {}
+    for scenario in SCENARIOS:
+        if args.only and not any(name in scenario.name for name in args.only):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[scenario.name] = await run_scenario(
+                app,
+                scenario,
+                users,
+                scenario.requests or args.requests,
+                args.concurrency,
+            )
+    return results
+
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    print(
+        f"{'endpoint':<40}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'req/s':>9}{'bytes':>11}"
+    )
+    for name, result in results.items():
+        status = result["status"]
+        if result["errors"]:
+            status = f"{status}*"
+        print(
+            f"{name:<40}{status:>7}{result['p50']:>9.1f}{result['p95']:>9.1f}"
+            f"{result['p99']:>9.1f}{result['rps']:>9.1f}{result['bytes']:>11,}"
+        )
+    if any(result["errors"] for result in results.values()):
+        print("* some requests failed")
+
+
+def suite_arguments(args: argparse.Namespace) -> List[str]:
+    arguments = [
+        "--users", str(args.users),
+        "--accounts", str(args.accounts),
+        "--years", str(args.years),
+        "--seed", str(args.seed),
+        "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency),
+    ]
+    for name in args.only or []:
+        arguments += ["--only", name]
+    return arguments
+
+
+def measure_revision(revision: Optional[str], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the suite against a git revision, or the working tree when revision is None.
+
+    The revision is checked out in a temporary worktree, and this version of the
+    benchmarks package is copied into it so older revisions can be measured too.
+    """
+    workdir = tempfile.mkdtemp(prefix="budget_ai_suite_")
+    source = ROOT
+    try:
+        if revision is not None:
+            source = os.path.join(workdir, "tree")
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", source, revision],
+                cwd=ROOT, check=True, capture_output=True,
+            )
+            shutil.rmtree(os.path.join(source, "server", "benchmarks"), ignore_errors=True)
+            shutil.copytree(
+                os.path.join(ROOT, "server", "benchmarks"),
+                os.path.join(source, "server", "benchmarks"),
+                ignore=shutil.ignore_patterns("__pycache__"),
+            )
+
+        # The server mounts ./client/dist/assets relative to the working directory
+        cwd = os.path.join(workdir, "run")
+        os.makedirs(os.path.join(cwd, "client", "dist", "assets"))
+        output = os.path.join(workdir, "results.json")
+        subprocess.run(
+            [sys.executable, "-m", "server.benchmarks.suite", *suite_arguments(args),
+             "--json", output, "--quiet"],
+            cwd=cwd, env=dict(os.environ, PYTHONPATH=source), check=True,
+        )
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        if revision is not None:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", source],
+                cwd=ROOT, capture_output=True,
+            )
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_comparison(base: str, head: str, before: Dict, after: Dict) -> None:
+    print(f"p50 / p95 latency in ms and throughput, {base} -> {head}\n")
+    print(f"{'endpoint':<40}{'p50':>17}{'p95':>17}{'req/s':>17}{'change':>9}")
+    for name in list(dict.fromkeys([*before, *after])):
+        old, new = before.get(name), after.get(name)
+        # Timings are only comparable when both revisions answered the same way
+        if not old or not new or old["errors"] or new["errors"] or old["status"] != new["status"]:
+            state = lambda r: "missing" if not r else f"{r['status']} errors" if r["errors"] else f"{r['status']}"
+            print(f"{name:<40}{state(old):>17}{state(new):>17}")
+            continue
+        change = (new["p50"] - old["p50"]) / old["p50"] * 100
+        print(
+            f"{name:<40}{old['p50']:>8.1f}{new['p50']:>9.1f}{old['p95']:>8.1f}{new['p95']:>9.1f}"
+            f"{old['rps']:>8.1f}{new['rps']:>9.1f}{change:>+8.0f}%"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--accounts", type=int, default=3, help="Accounts per user")
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", action="append", help="Only endpoints containing this text")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", nargs="+", metavar="REVISION", help="BASE [HEAD]")
+    parser.add_argument("--quiet", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        if len(args.compare) > 2:
+            parser.error("--compare takes one or two revisions")
+        base, head = (args.compare + [None])[:2]
+        before = measure_revision(base, args)
+        after = measure_revision(head, args)
+        print_comparison(base, head or "working tree", before, after)
+        results = {"base": before, "head": after}
+    else:
+        results = asyncio.run(run_suite(args))
+        if not args.quiet:
+            print(
+                f"{args.users} users x {args.accounts} accounts x {args.years:g} years, "
+                f"{args.requests} requests per endpoint, {args.concurrency} concurrent clients\n"
+            )
+            print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
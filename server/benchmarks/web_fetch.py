@@ -0,0 +1,91 @@
+"""
+Size and latency of the assistant's web tools against a local stand-in server.
+
+Serves a large, script-heavy HTML page and a Serper-style JSON response from
+LocalHTTPServer, then reports how much text each tool hands to the LLM and
+how long cold and cached calls take.
+
+    python -m server.benchmarks.web_fetch
+"""
+
+import json
+import time
+import asyncio
+
+from server.benchmarks.common import configure_environment
+from server.benchmarks.fakes import LocalHTTPServer
+
+
+def build_page(paragraphs: int) -> bytes:
+    script = "<script>" + "var x = 1;" * 5000 + "</script>"
+    style = "<style>" + ".a{color:red}" * 5000 + "</style>"
+    body = "".join(
+        f"<div class='post'><h2>Budgeting tip {i}</h2><p>Track every expense "
+        f"and review your spending each week to stay within budget.</p></div>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Budgeting tips</title>{style}</head>"
+        f"<body>{script}{body}{script}</body></html>"
+    ).encode()
+
+
+SEARCH_RESULTS = json.dumps(
+    {
+        "searchParameters": {"q": "budgeting tips", "type": "search"},
+        "organic": [
+            {
+                "title": f"Budgeting tip {i}",
+                "link": f"https://example.com/{i}",
+                "snippet": "Track every expense and review your spending weekly.",
+                "sitelinks": [{"title": "More", "link": "https://example.com"}] * 5,
+                "position": i,
+            }
+            for i in range(10)
+        ],
+        "relatedSearches": [{"query": f"budget {i}"} for i in range(20)],
+    }
+).encode()
+
+
+async def run() -> None:
+    from server.src.settings import settings
+    from server.src.databridge.web_databridge import CHARS_PER_TOKEN, WebDatabridge
+
+    routes = {
+        "/small": (200, "text/html; charset=utf-8", build_page(50)),
+        "/large": (200, "text/html; charset=utf-8", build_page(40000)),
+        "/search": (200, "application/json", SEARCH_RESULTS),
+    }
+    with LocalHTTPServer(routes) as server:
+        settings.serper_url = server.url("/search")
+        web = WebDatabridge.get_instance()
+        calls = {
+            "open_website small": (lambda: web.afetch(server.url("/small")), "/small"),
+            "open_website large": (lambda: web.afetch(server.url("/large")), "/large"),
+            "search_web": (lambda: web.asearch("budgeting tips"), "/search"),
+        }
+        print(f"{'call':<20}{'raw bytes':>12}{'~tokens':>10}{'cold ms':>10}{'cached ms':>11}")
+        for name, (call, path) in calls.items():
+            start = time.perf_counter()
+            text = await call()
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            await call()
+            cached = time.perf_counter() - start
+            print(
+                f"{name:<20}{len(routes[path][2]):>12,}"
+                f"{len(text) // CHARS_PER_TOKEN:>10,}"
+                f"{cold * 1000:>10.1f}{cached * 1000:>11.3f}"
+            )
+        print(f"requests served: {len(server.requests)} (cached calls never reach the server)")
+        await web.aclose()
+
+
+def main() -> None:
+    configure_environment()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,23 @@
 import os
+import time
+import asyncio
 import sqlite3
 import pandas as pd
-from typing import Any, Tuple, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Tuple, List, Optional, Union
+
+from server.src.metrics import (
+    DB_ERRORS,
+    DB_STATEMENT_DURATION,
+    fingerprint,
+    normalize_sql,
+)
+from server.src.settings import settings
+from server.src.databridge.slow_query_log import SlowQueryLog
+from server.src.databridge.query_stats import current_query_stats
+
+# Longer statements are cut off in the statement label of the metrics
+STATEMENT_LABEL_LENGTH = 200
 
 
 class BaseDatabridge:
@@ -33,6 +49,9 @@ class BaseDatabridge:
             raise Exception("This class is a singleton. Use get_instance() instead.")
 
         self.db_path = db_path
+        self.slow_queries = SlowQueryLog(
+            settings.slow_query_threshold_ms, settings.slow_query_log
+        )
 
         # Check if database exists, if not create it with demo tables
         if not os.path.exists(db_path):
@@ -128,6 +147,427 @@ class BaseDatabridge:
             conn.commit()
             conn.close()
 
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """
+        Apply additive schema changes. Every statement is idempotent so this runs
+        on each startup and brings databases created by earlier versions up to date.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            # Let several server processes read while one writes
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+            # Create conversations table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+            """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (user_id, id)"
+            )
+
+            # Create data_versions table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                );
+            """
+            )
+
+            # Deleted accounts are hidden at once by deleted_at, and purged with
+            # their transactions by a background job
+            accounts_columns = {row[1] for row in cursor.execute("PRAGMA table_info(accounts)")}
+            if "deleted_at" not in accounts_columns:
+                cursor.execute("ALTER TABLE accounts ADD COLUMN deleted_at DATETIME")
+                # Created again below, to log deleted accounts as deleted
+                for event in ("insert", "update", "delete"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS accounts_{event}_changes")
+
+            # Create changes table, a log of the latest change to every row of the
+            # synced tables, used by clients to fetch only what changed
+            has_changes = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'changes'"
+            ).fetchone()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    entity TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    op TEXT NOT NULL,
+                    UNIQUE (entity, row_id)
+                );
+            """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_changes_user_seq ON changes (user_id, seq)"
+            )
+
+            # Keep the log up to date with triggers. INSERT OR REPLACE drops the
+            # previous entry of the row, so the log grows with rows, not writes.
+            owners = {
+                "accounts": "SELECT {row}.user_id, 'accounts', {row}.id, CASE WHEN {row}.deleted_at IS NULL THEN '{op}' ELSE 'delete' END",
+                "expenses": "SELECT user_id, 'expenses', {row}.id, '{op}' FROM accounts WHERE id = {row}.account_id",
+                "income": "SELECT user_id, 'income', {row}.id, '{op}' FROM accounts WHERE id = {row}.account_id",
+            }
+            for table, owner in owners.items():
+                for event, row, op in (
+                    ("INSERT", "NEW", "upsert"),
+                    ("UPDATE", "NEW", "upsert"),
+                    ("DELETE", "OLD", "delete"),
+                ):
+                    cursor.execute(
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_changes
+                        AFTER {event} ON {table}
+                        BEGIN
+                            INSERT OR REPLACE INTO changes (user_id, entity, row_id, op)
+                            {owner.format(row=row, op=op)};
+                        END;
+                    """
+                    )
+
+            # Rows created before the log existed are reported as one upsert each
+            if not has_changes:
+                cursor.execute(
+                    "INSERT INTO changes (user_id, entity, row_id, op) SELECT user_id, 'accounts', id, 'upsert' FROM accounts"
+                )
+                for table in ("expenses", "income"):
+                    cursor.execute(
+                        f"INSERT INTO changes (user_id, entity, row_id, op) SELECT a.user_id, '{table}', t.id, 'upsert' FROM {table} t JOIN accounts a ON a.id = t.account_id"
+                    )
+
+            # Create jobs table, the queue of background jobs. run_after and
+            # heartbeat_at are Unix times, compared by the workers.
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    error TEXT,
+                    run_after REAL NOT NULL DEFAULT 0,
+                    heartbeat_at REAL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    started_at DATETIME,
+                    finished_at DATETIME
+                );
+            """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_after)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs (user_id, status)"
+            )
+            # Jobs that are only queued once while waiting, such as scheduled syncs
+            jobs_columns = {row[1] for row in cursor.execute("PRAGMA table_info(jobs)")}
+            if "dedupe_key" not in jobs_columns:
+                cursor.execute("ALTER TABLE jobs ADD COLUMN dedupe_key TEXT")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_dedupe_key ON jobs (dedupe_key, status)"
+            )
+
+            # Create token_sync_state table, when each linked item was synced and
+            # is due to be synced again by the scheduler. Times are Unix times.
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS token_sync_state (
+                    token_id INTEGER PRIMARY KEY,
+                    next_sync_at REAL NOT NULL,
+                    last_synced_at REAL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT
+                );
+            """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_token_sync_state_next ON token_sync_state (next_sync_at)"
+            )
+
+            # Plaid webhooks refer to items by their item id. Tokens linked before
+            # it was stored get it on their next sync.
+            tokens_columns = {row[1] for row in cursor.execute("PRAGMA table_info(tokens)")}
+            if "item_id" not in tokens_columns:
+                cursor.execute("ALTER TABLE tokens ADD COLUMN item_id TEXT")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tokens_item_id ON tokens (item_id)"
+            )
+
+            # Create transactions_fts table, a full-text index over the titles of
+            # expenses and income. The rowid is the row's id times two, plus one
+            # for income, and owner holds "u<user id>" so a user's rows can be
+            # matched inside the index.
+            has_fts = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+            ).fetchone()
+            cursor.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5 (
+                    title,
+                    owner,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                );
+            """
+            )
+            for table, parity in (("expenses", 0), ("income", 1)):
+                index_row = f"""
+                    INSERT INTO transactions_fts (rowid, title, owner)
+                    SELECT NEW.id * 2 + {parity}, NEW.title, 'u' || user_id
+                    FROM accounts WHERE id = NEW.account_id;
+                """
+                unindex_row = f"DELETE FROM transactions_fts WHERE rowid = OLD.id * 2 + {parity};"
+                for event, body in (
+                    ("INSERT", index_row),
+                    ("UPDATE OF title, account_id", unindex_row + index_row),
+                    ("DELETE", unindex_row),
+                ):
+                    cursor.execute(
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.split()[0].lower()}_fts
+                        AFTER {event} ON {table}
+                        BEGIN
+                            {body}
+                        END;
+                    """
+                    )
+                if not has_fts:
+                    cursor.execute(
+                        f"""
+                        INSERT INTO transactions_fts (rowid, title, owner)
+                        SELECT t.id * 2 + {parity}, t.title, 'u' || a.user_id
+                        FROM {table} t JOIN accounts a ON a.id = t.account_id
+                    """
+                    )
+
+            # Lists of expenses and income are filtered by account and paged
+            # by date, and accounts are looked up by user
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_accounts_user ON accounts (user_id)"
+            )
+            for table in ("expenses", "income"):
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_account_date ON {table} (account_id, date)"
+                )
+
+            # Transactions imported from Plaid keep their Plaid transaction id,
+            # which a sync or a retried import checks to skip what it stored
+            for table in ("expenses", "income"):
+                columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+                if "plaid_transaction_id" not in columns:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN plaid_transaction_id TEXT")
+                cursor.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_plaid_transaction ON {table} (account_id, plaid_transaction_id)"
+                )
+
+            # Create weekly_spend table, the spend of every user per week from
+            # Sunday, kept up to date by triggers. Like the spend over time,
+            # recurring expenses and deleted accounts don't count.
+            has_weekly_spend = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_spend'"
+            ).fetchone()
+            # Triggers from before deleted accounts were left out are created
+            # again, and the totals they kept worked out again
+            stale_spend = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'expenses_insert_spend' AND sql NOT LIKE '%deleted_at%'"
+            ).fetchone()
+            if stale_spend:
+                for event in ("insert", "update", "delete"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS expenses_{event}_spend")
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS weekly_spend (
+                    user_id INTEGER NOT NULL,
+                    week_start TEXT NOT NULL,
+                    total REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, week_start)
+                ) WITHOUT ROWID;
+            """
+            )
+            add_spend = """
+                INSERT INTO weekly_spend (user_id, week_start, total)
+                SELECT user_id, date({row}.date, '-6 days', 'weekday 0'), {sign}{row}.amount
+                FROM accounts
+                WHERE id = {row}.account_id AND deleted_at IS NULL AND {row}.recurrence IS NULL
+                ON CONFLICT (user_id, week_start) DO UPDATE SET total = total + excluded.total;
+            """
+            for event, body in (
+                ("INSERT", add_spend.format(row="NEW", sign="")),
+                (
+                    "UPDATE OF amount, date, recurrence, account_id",
+                    add_spend.format(row="OLD", sign="-") + add_spend.format(row="NEW", sign=""),
+                ),
+                ("DELETE", add_spend.format(row="OLD", sign="-")),
+            ):
+                cursor.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS expenses_{event.split()[0].lower()}_spend
+                    AFTER {event} ON expenses
+                    BEGIN
+                        {body}
+                    END;
+                """
+                )
+            # A deleted account's spend is taken out of the weeks at once, so
+            # its expenses are not counted while they wait to be purged
+            cursor.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS accounts_update_spend
+                AFTER UPDATE OF deleted_at ON accounts
+                WHEN (OLD.deleted_at IS NULL) != (NEW.deleted_at IS NULL)
+                BEGIN
+                    INSERT INTO weekly_spend (user_id, week_start, total)
+                    SELECT NEW.user_id, date(date, '-6 days', 'weekday 0'),
+                        CASE WHEN NEW.deleted_at IS NULL THEN 1 ELSE -1 END * SUM(amount)
+                    FROM expenses WHERE account_id = NEW.id AND recurrence IS NULL
+                    GROUP BY 2
+                    ON CONFLICT (user_id, week_start) DO UPDATE SET total = total + excluded.total;
+                END;
+            """
+            )
+            if not has_weekly_spend or stale_spend:
+                cursor.execute("DELETE FROM weekly_spend")
+                cursor.execute(
+                    """
+                    INSERT INTO weekly_spend (user_id, week_start, total)
+                    SELECT a.user_id, date(e.date, '-6 days', 'weekday 0'), SUM(e.amount)
+                    FROM expenses e JOIN accounts a ON a.id = e.account_id
+                    WHERE e.recurrence IS NULL AND a.deleted_at IS NULL
+                    GROUP BY 1, 2
+                """
+                )
+
+            # Create spend_budgets table, the budget allotment of every user as
+            # last worked out. Writes to anything the allotment depends on drop
+            # the user's row, so it is only worked out again when needed.
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spend_budgets (
+                    user_id INTEGER PRIMARY KEY,
+                    allotment REAL NOT NULL,
+                    day TEXT NOT NULL
+                );
+            """
+            )
+            owner_of = {
+                "income": "(SELECT user_id FROM accounts WHERE id = {row}.account_id)",
+                "expenses": "(SELECT user_id FROM accounts WHERE id = {row}.account_id)",
+                "goals": "{row}.user_id",
+            }
+            for table, owner in owner_of.items():
+                for event, rows in (
+                    ("INSERT", ("NEW",)),
+                    ("UPDATE", ("OLD", "NEW")),
+                    ("DELETE", ("OLD",)),
+                ):
+                    # Only recurring expenses are part of the allotment
+                    when = ""
+                    if table == "expenses":
+                        when = "WHEN " + " OR ".join(f"{row}.recurrence IS NOT NULL" for row in rows)
+                    cursor.execute(
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_budget
+                        AFTER {event} ON {table} {when}
+                        BEGIN
+                            DELETE FROM spend_budgets WHERE user_id IN ({", ".join(owner.format(row=row) for row in rows)});
+                        END;
+                    """
+                    )
+            for table, columns in (("users", "savings_percent"), ("accounts", "deleted_at")):
+                cursor.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_update_budget
+                    AFTER UPDATE OF {columns} ON {table}
+                    BEGIN
+                        DELETE FROM spend_budgets WHERE user_id = {"NEW.id" if table == "users" else "NEW.user_id"};
+                    END;
+                """
+                )
+
+            # Create spend_alerts table, one alert per user and week when the
+            # week's spend crosses the user's spend warning
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spend_alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    week_start TEXT NOT NULL,
+                    spend REAL NOT NULL,
+                    allotment REAL NOT NULL,
+                    threshold REAL NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    read_at DATETIME,
+                    UNIQUE (user_id, week_start)
+                );
+            """
+            )
+
+            conn.commit()
+
+    @contextmanager
+    def _measure(
+        self,
+        operation: str,
+        procedure: str,
+        parameters: Optional[Tuple[Any, ...]],
+        connection: sqlite3.Connection,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Record how long a statement takes, and whether it fails, in the metrics
+        and the statistics of the current request, and log it if it is slow.
+
+        Args:
+            operation (str): The databridge method running the statement.
+            procedure (str): The SQL statement.
+            parameters (Optional[Tuple[Any, ...]]): The parameters of the statement.
+            connection (sqlite3.Connection): The connection running the statement.
+
+        Yields:
+            Dict[str, Any]: Details filled in by the caller, the number of rows
+                returned or changed under "rows".
+        """
+        statement: Dict[str, Any] = {"rows": None}
+        start = time.perf_counter()
+        try:
+            yield statement
+        except sqlite3.Error:
+            DB_ERRORS.inc(operation=operation, fingerprint=fingerprint(procedure))
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            DB_STATEMENT_DURATION.observe(
+                duration,
+                operation=operation,
+                fingerprint=fingerprint(procedure),
+                statement=normalize_sql(procedure)[:STATEMENT_LABEL_LENGTH],
+            )
+            stats = current_query_stats()
+            if stats is not None:
+                stats.record(fingerprint(procedure), statement["rows"], duration)
+        if self.slow_queries.is_slow(duration):
+            self.slow_queries.record(
+                operation, procedure, parameters, duration, statement["rows"], connection
+            )
+
     def query(
         self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
     ) -> pd.DataFrame:
@@ -142,16 +582,49 @@ class BaseDatabridge:
             pd.DataFrame: The result of the query as a pandas DataFrame.
         """
         try:
-            with sqlite3.connect(self.db_path) as connection:
+            with sqlite3.connect(self.db_path) as connection, self._measure(
+                "query", procedure, parameters, connection
+            ) as statement:
                 if parameters:
                     df = pd.read_sql_query(procedure, connection, params=parameters)
                 else:
                     df = pd.read_sql_query(procedure, connection)
+                statement["rows"] = len(df)
                 return df
         except sqlite3.Error as e:
             print(f"Error during query execution: {e}")
             return pd.DataFrame()
 
+    def fetch_all(
+        self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a SELECT query and return the rows as plain dictionaries.
+
+        Unlike query, rows are built straight from the cursor without a DataFrame,
+        so values keep their native Python types (None instead of NaN) and large
+        results can be serialized directly.
+
+        Args:
+            procedure (str): The SQL query to execute.
+            parameters (Optional[Tuple[Any, ...]]): Optional parameters for the query.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary per row, keyed by column name.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as connection, self._measure(
+                "fetch_all", procedure, parameters, connection
+            ) as statement:
+                cursor = connection.execute(procedure, parameters or ())
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                statement["rows"] = len(rows)
+                return rows
+        except sqlite3.Error as e:
+            print(f"Error during query execution: {e}")
+            return []
+
     def execute(
         self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
     ) -> None:
@@ -163,12 +636,144 @@ class BaseDatabridge:
             parameters (Optional[Tuple[Any, ...]]): Optional parameters for the command.
         """
         try:
-            with sqlite3.connect(self.db_path) as connection:
+            with sqlite3.connect(self.db_path) as connection, self._measure(
+                "execute", procedure, parameters, connection
+            ) as statement:
                 cursor = connection.cursor()
                 if parameters:
                     cursor.execute(procedure, parameters)
                 else:
                     cursor.execute(procedure)
+                statement["rows"] = cursor.rowcount
                 connection.commit()
         except sqlite3.Error as e:
             print(f"Error during execution: {e}")
+
+    def execute_many(
+        self, procedure: str, parameters: Iterable[Union[Tuple[Any, ...], Dict[str, Any]]]
+    ) -> int:
+        """
+        Execute a non-SELECT SQL procedure once for every set of parameters, in a
+        single transaction.
+
+        Args:
+            procedure (str): The SQL command to execute.
+            parameters (Iterable[Union[Tuple[Any, ...], Dict[str, Any]]]): One set
+                of positional or named parameters per execution.
+
+        Returns:
+            int: The number of rows changed, 0 if the command failed.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as connection, self._measure(
+                "execute_many", procedure, None, connection
+            ) as statement:
+                cursor = connection.executemany(procedure, parameters)
+                statement["rows"] = cursor.rowcount
+                connection.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error during execution: {e}")
+            return 0
+
+    @contextmanager
+    def transaction(self) -> Iterator["Transaction"]:
+        """
+        Run several statements on one connection as a single transaction.
+
+        The write lock is taken when the transaction begins, so statements run
+        against a consistent database. Everything is committed when the block
+        ends, or rolled back if it raises. Unlike execute, errors are raised,
+        so a failed statement rolls back the ones before it.
+
+        Yields:
+            Transaction: Runs statements within the transaction.
+        """
+        connection = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield Transaction(self, connection)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    async def aquery(
+        self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
+    ) -> pd.DataFrame:
+        """
+        Execute a SELECT query on a worker thread so the event loop is not blocked.
+
+        Args:
+            procedure (str): The SQL query to execute.
+            parameters (Optional[Tuple[Any, ...]]): Optional parameters for the query.
+
+        Returns:
+            pd.DataFrame: The result of the query as a pandas DataFrame.
+        """
+        return await asyncio.to_thread(self.query, procedure, parameters)
+
+    async def aexecute(
+        self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
+    ) -> None:
+        """
+        Execute a non-SELECT SQL procedure on a worker thread so the event loop is not blocked.
+
+        Args:
+            procedure (str): The SQL command to execute.
+            parameters (Optional[Tuple[Any, ...]]): Optional parameters for the command.
+        """
+        await asyncio.to_thread(self.execute, procedure, parameters)
+
+
+class Transaction:
+    """Statements run within BaseDatabridge.transaction, on its connection."""
+
+    def __init__(self, db: BaseDatabridge, connection: sqlite3.Connection):
+        self.db = db
+        self.connection = connection
+
+    def execute(
+        self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
+    ) -> int:
+        """
+        Execute a non-SELECT SQL procedure within the transaction.
+
+        Args:
+            procedure (str): The SQL command to execute.
+            parameters (Optional[Tuple[Any, ...]]): Optional parameters for the command.
+
+        Returns:
+            int: The number of rows changed.
+        """
+        with self.db._measure(
+            "execute", procedure, parameters, self.connection
+        ) as statement:
+            cursor = self.connection.execute(procedure, parameters or ())
+            statement["rows"] = cursor.rowcount
+            return cursor.rowcount
+
+    def fetch_all(
+        self, procedure: str, parameters: Optional[Tuple[Any, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a query within the transaction and return the rows as plain dictionaries.
+
+        Args:
+            procedure (str): The SQL query to execute.
+            parameters (Optional[Tuple[Any, ...]]): Optional parameters for the query.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary per row, keyed by column name.
+        """
+        with self.db._measure(
+            "fetch_all", procedure, parameters, self.connection
+        ) as statement:
+            cursor = self.connection.execute(procedure, parameters or ())
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            statement["rows"] = len(rows)
+            return rows
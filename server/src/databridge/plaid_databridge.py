@@ -1,7 +1,7 @@
 import plaid
 from datetime import datetime
 from plaid.api import plaid_api
-from typing import List
+from typing import Any, Dict, List, Tuple
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.products import Products
 from plaid.model.country_code import CountryCode
@@ -12,6 +12,10 @@ from plaid.model.item_public_token_exchange_request import (
     ItemPublicTokenExchangeRequest,
 )
 from plaid.model.accounts_balance_get_request import AccountsBalanceGetRequest
+from plaid.model.item_get_request import ItemGetRequest
+from plaid.model.webhook_verification_key_get_request import (
+    WebhookVerificationKeyGetRequest,
+)
 
 from server.src.settings import settings
 from server.src.models import PlaidTransactionRequest
@@ -43,6 +47,8 @@ class PlaidDatabridge:
         Returns:
             str: The link token to be used on the client side
         """
+        # Plaid notifies this URL when new transactions are available
+        webhook = {"webhook": settings.plaid_webhook_url} if settings.plaid_webhook_url else {}
         request = LinkTokenCreateRequest(
             user=LinkTokenCreateRequestUser(client_user_id=user_id),
             client_name="Budget.AI",
@@ -51,15 +57,45 @@ class PlaidDatabridge:
             ],  # List of Plaid products you want to use
             country_codes=[CountryCode("US")],  # List of supported country codes
             language="en",  # Language for the Link interface
+            **webhook,
         )
 
         response = self.client.link_token_create(request)
         return response["link_token"]
 
-    def exchange_public_token(self, public_token: str) -> str:
+    def exchange_public_token(self, public_token: str) -> Tuple[str, str]:
+        """
+        Exchange the public token returned by Plaid Link for an access token
+
+        Args:
+            public_token: The public token of the newly linked item
+
+        Returns:
+            Tuple[str, str]: The access token and the id of the item, which
+                webhooks about the item refer to
+        """
         request = ItemPublicTokenExchangeRequest(public_token=public_token)
         response = self.client.item_public_token_exchange(request)
-        return response["access_token"]
+        return response["access_token"], response["item_id"]
+
+    def get_item_id(self, token: str) -> str:
+        request = ItemGetRequest(access_token=token)
+        response = self.client.item_get(request)
+        return response["item"]["item_id"]
+
+    def get_webhook_verification_key(self, key_id: str) -> Dict[str, Any]:
+        """
+        Get the public key Plaid signed webhooks with
+
+        Args:
+            key_id: The kid from the header of the webhook's JWT
+
+        Returns:
+            Dict[str, Any]: The key as a JWK
+        """
+        request = WebhookVerificationKeyGetRequest(key_id=key_id)
+        response = self.client.webhook_verification_key_get(request)
+        return response["key"].to_dict()
 
     def get_balance(self, token: str):
         request = AccountsBalanceGetRequest(access_token=token)
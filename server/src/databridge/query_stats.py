@@ -0,0 +1,73 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+
+class QueryStats:
+    """
+    Counts the database statements run while serving a request.
+
+    Statements are also counted per fingerprint, so a statement that runs once
+    per row of an earlier result (an N+1 pattern) stands out by its repeats.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+        self.duration = 0.0
+        self.fingerprints: Counter = Counter()
+        # Statements of one request can run on several worker threads at once
+        self._lock = threading.Lock()
+
+    def record(self, fingerprint: str, rows: Optional[int], duration: float) -> None:
+        """
+        Count a statement.
+
+        Args:
+            fingerprint (str): Fingerprint of the statement.
+            rows (Optional[int]): Rows returned or changed, if known.
+            duration (float): How long the statement took, in seconds.
+        """
+        with self._lock:
+            self.statements += 1
+            self.rows += max(rows or 0, 0)
+            self.duration += duration
+            self.fingerprints[fingerprint] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """
+        Get the statement that ran most often.
+
+        Returns:
+            Tuple[Optional[str], int]: Its fingerprint and how often it ran,
+                (None, 0) when no statement ran.
+        """
+        with self._lock:
+            if not self.fingerprints:
+                return None, 0
+            return self.fingerprints.most_common(1)[0]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Get the statistics of the request being served, if they are tracked."""
+    return _current.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Count the statements run inside the block, including on worker threads
+    started from it with asyncio.to_thread or FastAPI's threadpool, which
+    copy the context.
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
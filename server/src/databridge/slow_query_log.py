@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from server.src.metrics import fingerprint, normalize_sql
+
+
+def parameter_shapes(parameters: Optional[Sequence[Any]]) -> List[str]:
+    """
+    Describe query parameters without their values, which may be personal data.
+
+    Args:
+        parameters (Optional[Sequence[Any]]): The parameters of the statement.
+
+    Returns:
+        List[str]: The type of each parameter, with the length of strings and bytes.
+    """
+    shapes = []
+    for value in parameters or ():
+        if isinstance(value, (str, bytes)):
+            shapes.append(f"{type(value).__name__}({len(value)})")
+        else:
+            shapes.append(type(value).__name__)
+    return shapes
+
+
+def explain(
+    connection: sqlite3.Connection,
+    procedure: str,
+    parameters: Optional[Sequence[Any]],
+) -> List[str]:
+    """
+    Get SQLite's plan for a statement as indented lines, one per step.
+
+    Args:
+        connection (sqlite3.Connection): The connection the statement ran on.
+        procedure (str): The SQL statement.
+        parameters (Optional[Sequence[Any]]): The parameters of the statement.
+
+    Returns:
+        List[str]: The plan, e.g. ["SCAN e", "SEARCH a USING INTEGER PRIMARY KEY (rowid=?)"].
+    """
+    try:
+        rows = connection.execute(
+            f"EXPLAIN QUERY PLAN {procedure}", parameters or ()
+        ).fetchall()
+    except sqlite3.Error as e:
+        return [f"Could not explain the statement: {e}"]
+
+    depth = {0: -1}
+    lines = []
+    for step, parent, _, detail in rows:
+        depth[step] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[step] + detail)
+    return lines
+
+
+def is_full_scan(plan: List[str]) -> bool:
+    """Whether a plan reads a whole table rather than searching an index."""
+    return any(
+        line.strip().startswith("SCAN ") and "USING" not in line for line in plan
+    )
+
+
+class SlowQueryLog:
+    """
+    Logs statements that take longer than a threshold as JSON lines.
+
+    Entries hold the normalized statement, the shape of its parameters, the
+    duration and the number of rows. The first entry of every statement
+    fingerprint also holds the statement's EXPLAIN QUERY PLAN, so a full table
+    scan shows up the first time the statement is slow.
+    """
+
+    def __init__(self, threshold_ms: Optional[float], path: Optional[str] = None):
+        """
+        Initialize the log.
+
+        Args:
+            threshold_ms (Optional[float]): Log statements slower than this, None to disable the log.
+            path (Optional[str]): File to append the entries to, printed when None.
+        """
+        self.threshold = None if threshold_ms is None else threshold_ms / 1000
+        self.path = path
+        self.explained = set()
+        self._lock = threading.Lock()
+
+    def is_slow(self, duration: float) -> bool:
+        return self.threshold is not None and duration >= self.threshold
+
+    def record(
+        self,
+        operation: str,
+        procedure: str,
+        parameters: Optional[Sequence[Any]],
+        duration: float,
+        rows: Optional[int],
+        connection: sqlite3.Connection,
+    ) -> None:
+        """
+        Log a slow statement.
+
+        Args:
+            operation (str): The databridge method that ran the statement.
+            procedure (str): The SQL statement.
+            parameters (Optional[Sequence[Any]]): The parameters of the statement.
+            duration (float): How long the statement took, in seconds.
+            rows (Optional[int]): Rows returned or changed, if known.
+            connection (sqlite3.Connection): The connection the statement ran on,
+                used to explain the statement.
+        """
+        key = fingerprint(procedure)
+        entry: Dict[str, Any] = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "operation": operation,
+            "fingerprint": key,
+            "duration_ms": round(duration * 1000, 2),
+            "rows": rows,
+            "statement": normalize_sql(procedure),
+            "parameters": parameter_shapes(parameters),
+        }
+
+        with self._lock:
+            first = key not in self.explained
+            self.explained.add(key)
+        if first:
+            plan = explain(connection, procedure, parameters)
+            entry["full_scan"] = is_full_scan(plan)
+            entry["plan"] = plan
+
+        line = json.dumps(entry)
+        if self.path is None:
+            print(f"Slow query: {line}")
+            return
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
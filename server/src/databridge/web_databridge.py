@@ -0,0 +1,317 @@
+import re
+import json
+import httpx
+from html.parser import HTMLParser
+from typing import List, Optional
+
+from server.src.cache import TTLCache
+from server.src.settings import settings
+
+# Rough number of characters per LLM token, used to size tool output
+CHARS_PER_TOKEN = 4
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the human readable text of an HTML document."""
+
+    SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "head"}
+    BLOCK_TAGS = {
+        "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+        "header", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "title", "main",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skipping = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.SKIPPED_TAGS:
+            self._skipping += 1
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skipping:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (
+            re.sub(r"[ \t\r\f\v]+", " ", line).strip()
+            for line in "".join(self.parts).split("\n")
+        )
+        body = "\n".join(line for line in lines if line)
+        title = self.title.strip()
+        return f"{title}\n\n{body}" if title else body
+
+
+def extract_text(html: str) -> str:
+    """
+    Extract the readable text from an HTML document, dropping markup, scripts and styles.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        str: The page title and text content.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to roughly fit within a token budget, cutting at a word boundary.
+
+    Args:
+        text (str): The text to shorten.
+        max_tokens (int): The approximate number of tokens allowed.
+
+    Returns:
+        str: The text, with a marker appended if it was shortened.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars] + " [truncated]"
+
+
+class WebDatabridge:
+    _instance = None
+
+    USER_AGENT = "Mozilla/5.0 (compatible; Budget.AI/1.0)"
+    TEXT_CONTENT_TYPES = ("text/", "application/json", "application/xml", "application/xhtml")
+
+    @classmethod
+    def get_instance(cls):
+        """
+        Get singleton instance of WebDatabridge.
+
+        Returns:
+            WebDatabridge: Singleton instance of WebDatabridge
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        """
+        Initialize the WebDatabridge class. HTTP clients are created on first use
+        and shared by every caller so connections are pooled and reused.
+        """
+        if WebDatabridge._instance is not None:
+            raise Exception("This class is a singleton. Use get_instance() instead.")
+
+        self.timeout = httpx.Timeout(
+            settings.web_request_timeout, connect=min(5.0, settings.web_request_timeout)
+        )
+        self.limits = httpx.Limits(
+            max_connections=settings.web_max_connections,
+            max_keepalive_connections=settings.web_max_connections // 2,
+        )
+        self.max_bytes = settings.web_max_response_bytes
+        self.max_tokens = settings.web_max_tokens
+        # Only successful responses are cached, so an outage is not remembered
+        self.cache = TTLCache(settings.web_cache_size, settings.web_cache_ttl)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+                headers={"User-Agent": self.USER_AGENT},
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+                headers={"User-Agent": self.USER_AGENT},
+            )
+        return self._async_client
+
+    def _search_request(self, query: str) -> dict:
+        return {
+            "url": settings.serper_url,
+            "headers": {
+                "X-API-KEY": settings.serper_api_key,
+                "Content-Type": "application/json",
+            },
+            "content": json.dumps({"q": query}),
+        }
+
+    def _format_search(self, response: httpx.Response) -> str:
+        """Reduce a Serper response to the fields the assistant needs."""
+        if response.status_code >= 400:
+            return f"The search failed with HTTP {response.status_code}."
+
+        # Raises ValueError for a body that isn't a JSON object, such as an error page
+        results = response.json()
+        if not isinstance(results, dict):
+            raise ValueError("The search response is not a JSON object")
+        lines = []
+        if answer := results.get("answerBox"):
+            lines.append(
+                f"Answer: {answer.get('answer') or answer.get('snippet', '')}".strip()
+            )
+        for result in results.get("organic", []):
+            lines.append(
+                f"- {result.get('title', '')} ({result.get('link', '')})\n"
+                f"  {result.get('snippet', '')}"
+            )
+        if not lines:
+            return "No results found."
+        return truncate_to_tokens("\n".join(lines), self.max_tokens)
+
+    def _format_page(self, response: httpx.Response, body: bytes, capped: bool) -> str:
+        """Turn a (possibly capped) response body into text for the assistant."""
+        if response.status_code >= 400:
+            return f"The website returned HTTP {response.status_code}."
+
+        content_type = response.headers.get("content-type", "text/html").lower()
+        if not content_type.startswith(self.TEXT_CONTENT_TYPES):
+            return f"The website returned unsupported content ({content_type})."
+
+        text = body.decode(response.encoding or "utf-8", errors="replace")
+        if "html" in content_type:
+            text = extract_text(text)
+        if capped:
+            text += " [truncated]"
+        return truncate_to_tokens(text, self.max_tokens)
+
+    def search(self, query: str) -> str:
+        """
+        Search the web through Serper.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            str: A compact list of the search results.
+        """
+        key = ("search", query)
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+        try:
+            response = self.client.post(**self._search_request(query))
+            result = self._format_search(response)
+        except (httpx.HTTPError, ValueError) as e:
+            return f"The search could not be completed ({type(e).__name__})."
+        if response.is_success:
+            self.cache.set(key, result)
+        return result
+
+    async def asearch(self, query: str) -> str:
+        """
+        Search the web through Serper without blocking the event loop.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            str: A compact list of the search results.
+        """
+        key = ("search", query)
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+        try:
+            response = await self.async_client.post(**self._search_request(query))
+            result = self._format_search(response)
+        except (httpx.HTTPError, ValueError) as e:
+            return f"The search could not be completed ({type(e).__name__})."
+        if response.is_success:
+            self.cache.set(key, result)
+        return result
+
+    def fetch(self, url: str) -> str:
+        """
+        Get the readable text of a website, reading at most max_bytes of the body.
+
+        Args:
+            url (str): The URL of the website.
+
+        Returns:
+            str: The text content of the page, truncated to the token budget.
+        """
+        key = ("fetch", url)
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+        try:
+            with self.client.stream("GET", url) as response:
+                body = bytearray()
+                for chunk in response.iter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                result = self._format_page(
+                    response, bytes(body[: self.max_bytes]), len(body) >= self.max_bytes
+                )
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            return f"The website could not be opened ({type(e).__name__})."
+        if response.is_success:
+            self.cache.set(key, result)
+        return result
+
+    async def afetch(self, url: str) -> str:
+        """
+        Get the readable text of a website without blocking the event loop,
+        reading at most max_bytes of the body.
+
+        Args:
+            url (str): The URL of the website.
+
+        Returns:
+            str: The text content of the page, truncated to the token budget.
+        """
+        key = ("fetch", url)
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+        try:
+            async with self.async_client.stream("GET", url) as response:
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                result = self._format_page(
+                    response, bytes(body[: self.max_bytes]), len(body) >= self.max_bytes
+                )
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            return f"The website could not be opened ({type(e).__name__})."
+        if response.is_success:
+            self.cache.set(key, result)
+        return result
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP clients."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
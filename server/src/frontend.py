@@ -0,0 +1,201 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+from typing import Collection, Dict, NamedTuple, Optional
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # Optional, only gzip variants are built without it
+    brotli = None
+
+# Vite names build output like index-BxY3k9aZ.js, so the content never changes
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# Larger files are left on disk and served by StaticFiles
+MAX_CACHED_BYTES = 10 * 1024 * 1024
+
+
+class StaticFile(NamedTuple):
+    media_type: str
+    etag: str
+    cache_control: str
+    variants: Dict[str, bytes]  # Body per content coding: identity, gzip, br
+
+
+def load_static_file(path: str, cache_control: str) -> StaticFile:
+    """
+    Read a file and build its compressed variants.
+
+    Variants already produced by the build (file.br, file.gz) are used as is.
+
+    Args:
+        path (str): Path of the file.
+        cache_control (str): Cache-Control header to serve the file with.
+
+    Returns:
+        StaticFile: The file contents and response metadata.
+    """
+    with open(path, "rb") as f:
+        body = f.read()
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+
+    variants = {"identity": body}
+    if media_type.startswith(COMPRESSIBLE_TYPES):
+        for encoding, suffix, compress in (
+            ("br", ".br", brotli and (lambda data: brotli.compress(data, quality=9))),
+            ("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9)),
+        ):
+            if os.path.exists(path + suffix):
+                with open(path + suffix, "rb") as f:
+                    variants[encoding] = f.read()
+            elif compress:
+                compressed = compress(body)
+                # Not worth a Content-Encoding for tiny files
+                if len(compressed) < len(body) * 0.9:
+                    variants[encoding] = compressed
+
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:16]}"'
+    return StaticFile(media_type, etag, cache_control, variants)
+
+
+def choose_encoding(accept_encoding: str, available: Collection[str]) -> str:
+    """
+    Pick the best content coding the client accepts, preferring brotli over gzip.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding request header.
+        available (Collection[str]): The content codings that can be served.
+
+    Returns:
+        str: The chosen content coding, "identity" if nothing else fits.
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+class Frontend:
+    """
+    Serves the built client (client/dist) from memory.
+
+    Files are read and compressed once by load() at startup. Hashed assets are
+    cached by the browser forever, and everything else, including index.html,
+    is revalidated with its ETag.
+    """
+
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        self.index: Optional[StaticFile] = None
+        self.files: Dict[str, StaticFile] = {}
+
+    def load(self) -> None:
+        """Read the build output into memory. A missing build is not an error."""
+        files = {}
+        for root, _, names in os.walk(self.dist_dir):
+            for name in names:
+                if name.endswith((".br", ".gz")):
+                    continue
+                path = os.path.join(root, name)
+                if os.path.getsize(path) > MAX_CACHED_BYTES:
+                    continue
+                relative = os.path.relpath(path, self.dist_dir).replace(os.sep, "/")
+                hashed = relative.startswith("assets/") and HASHED_NAME.search(name)
+                files[relative] = load_static_file(
+                    path, IMMUTABLE if hashed else REVALIDATE
+                )
+
+        self.index = files.pop("index.html", None)
+        self.files = files
+
+    def respond(self, file: StaticFile, request_headers: Headers) -> Response:
+        """
+        Build the response for a file, answering If-None-Match with a 304.
+
+        Args:
+            file (StaticFile): The file to serve.
+            request_headers (Headers): Headers of the request.
+
+        Returns:
+            Response: The file in the best encoding the client accepts.
+        """
+        headers = {"ETag": file.etag, "Cache-Control": file.cache_control}
+        if len(file.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request_headers.get("if-none-match", "")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if file.etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(
+            request_headers.get("accept-encoding", ""), file.variants
+        )
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            file.variants[encoding], media_type=file.media_type, headers=headers
+        )
+
+    def serve(self, path: str, request_headers: Headers) -> Response:
+        """
+        Serve a file from the root of the build, or index.html for client routes.
+
+        Args:
+            path (str): The requested path without the leading slash.
+            request_headers (Headers): Headers of the request.
+
+        Returns:
+            Response: The file, index.html, or a 404 if the client is not built.
+        """
+        file = self.files.get(path) if "/" not in path else None
+        file = file or self.index
+        if file is None:
+            return Response("The client has not been built", status_code=404)
+        return self.respond(file, request_headers)
+
+
+class FrontendAssets(StaticFiles):
+    """
+    StaticFiles for the build's assets directory that answers from Frontend's
+    memory, and falls back to the disk for files it did not load.
+    """
+
+    def __init__(self, frontend: Frontend, directory: str = "assets"):
+        super().__init__(
+            directory=os.path.join(frontend.dist_dir, directory), check_dir=False
+        )
+        self.frontend = frontend
+        self.prefix = directory
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        key = f"{self.prefix}/{path.replace(os.sep, '/')}"
+        file = self.frontend.files.get(key)
+        if file is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        return self.frontend.respond(file, Headers(scope=scope))
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import traceback
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from starlette.types import Scope
+
+from server.src.metrics import (
+    EVENT_LOOP_BLOCKED_SECONDS,
+    EVENT_LOOP_BLOCKS,
+    EVENT_LOOP_LAG,
+)
+from server.src.middleware import route_template
+
+# Frames under this directory are the application's own code
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def blocking_location(stack: traceback.StackSummary) -> str:
+    """
+    Get the call site to blame for a block: the innermost frame of the
+    application's own code, which called into the blocking library.
+
+    Args:
+        stack (traceback.StackSummary): The stack of the event loop thread, outermost first.
+
+    Returns:
+        str: The frame as "path:line function", relative to the project.
+    """
+    for frame in reversed(stack):
+        if frame.filename.startswith(PROJECT_ROOT) and "site-packages" not in frame.filename:
+            return f"{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno} {frame.name}"
+    return f"{stack[-1].filename}:{stack[-1].lineno} {stack[-1].name}"
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and finds the code that blocks the loop.
+
+    A heartbeat coroutine wakes up every interval and records how late it was.
+    A watchdog thread checks the heartbeat, and when it is late by more than
+    the threshold, the loop is stuck in a synchronous call: the watchdog
+    captures the stack of the loop thread and the route of the request being
+    served. Once the loop is free again the block is logged as a JSON line and
+    counted in the metrics by route and call site.
+    """
+
+    def __init__(self, threshold_ms: float, interval_ms: float = 100):
+        """
+        Initialize the monitor.
+
+        Args:
+            threshold_ms (float): Report blocks that delay the loop longer than this.
+            interval_ms (float): How often the heartbeat runs.
+        """
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.last_beat = 0.0
+        # Request scopes by the task serving them, and the tasks they started
+        self.requests: "weakref.WeakKeyDictionary[asyncio.Task, Scope]" = weakref.WeakKeyDictionary()
+        self._previous_factory = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._captured_beat = 0.0
+        self._pending: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop. Must be called on the loop."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self._previous_factory = self.loop.get_task_factory()
+        self.loop.set_task_factory(self._task_factory)
+        self.last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = self.loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        if self.loop is not None:
+            self.loop.set_task_factory(self._previous_factory)
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+
+    def track(self, scope: Scope) -> None:
+        """Attribute blocks in the current task, and tasks it starts, to a request."""
+        task = asyncio.current_task()
+        if task is not None:
+            self.requests[task] = scope
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        # Tasks started while serving a request, such as the one streaming a
+        # StreamingResponse, belong to the same request
+        parent = asyncio.current_task(loop)
+        if parent is not None and parent in self.requests:
+            self.requests[task] = self.requests[parent]
+        return task
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.monotonic()
+            self.last_beat = start
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - start - self.interval, 0)
+            EVENT_LOOP_LAG.observe(lag)
+
+            with self._lock:
+                block, self._pending = self._pending, None
+            # The watchdog can race a heartbeat that was only just due, so
+            # only report blocks the heartbeat confirms
+            if block is not None and lag > self.threshold:
+                self._report(block, lag)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            beat = self.last_beat
+            late = time.monotonic() - beat - self.interval
+            # Capture every block once, while it is still running
+            if late > self.threshold and beat != self._captured_beat:
+                self._captured_beat = beat
+                block = self._capture()
+                if block is not None:
+                    with self._lock:
+                        self._pending = block
+
+    def _capture(self) -> Optional[Dict[str, Any]]:
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+
+        route = "none"
+        task = asyncio.current_task(self.loop)
+        scope = self.requests.get(task) if task is not None else None
+        if scope is not None:
+            route = f"{scope['method']} {route_template(scope)}"
+
+        return {
+            "route": route,
+            "location": blocking_location(stack),
+            "stack": [
+                f"{frame.filename}:{frame.lineno} {frame.name}"
+                for frame in stack[-20:]
+            ],
+        }
+
+    def _report(self, block: Dict[str, Any], lag: float) -> None:
+        EVENT_LOOP_BLOCKS.inc(route=block["route"], location=block["location"])
+        EVENT_LOOP_BLOCKED_SECONDS.inc(lag, route=block["route"])
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "lag_ms": round(lag * 1000, 1),
+            **block,
+        }
+        print(f"Event loop blocked: {json.dumps(entry)}")
@@ -1,9 +1,22 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
 import os
 
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
+from server.src.middleware import (
+    CompressionMiddleware,
+    ETagMiddleware,
+    LoopMonitorMiddleware,
+    MetricsMiddleware,
+    QueryStatsMiddleware,
+)
+from server.src.loop_monitor import LoopMonitor
+from server.src import metrics
+from server.src.settings import settings
+from server.src.frontend import Frontend, FrontendAssets
+
 from server.src.routers.auth import router as auth_router
 from server.src.routers.expenses import router as expenses_router
 from server.src.routers.income import router as income_router
@@ -14,9 +27,46 @@ from server.src.routers.assistant import router as assistant_router
 from server.src.routers.plaid import router as plaid_router
 from server.src.routers.goals import router as goals_router
 from server.src.routers.users import router as users_router
+from server.src.routers.sync import router as sync_router
+from server.src.routers.jobs import router as jobs_router
+from server.src.routers.dashboard import router as dashboard_router
+from server.src.routers.alerts import router as alerts_router
+from server.src.services.job_queue import JobQueue
+from server.src.services.sync_scheduler import SyncScheduler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create or migrate the database before serving requests. Heavier
+    # subsystems (the assistant and the Plaid client) load on first use.
+    BaseDatabridge.get_instance()
+    frontend.load()
+    if loop_monitor is not None:
+        loop_monitor.start()
+    JobQueue.get_instance().start()
+    if settings.plaid_sync_interval:
+        SyncScheduler.get_instance().start()
+    yield
+
+    await SyncScheduler.get_instance().stop()
+    await JobQueue.get_instance().stop()
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+
+    from server.src.databridge.web_databridge import WebDatabridge
+
+    if WebDatabridge._instance is not None:
+        await WebDatabridge.get_instance().aclose()
 
-app = FastAPI()
-primary = APIRouter(prefix="/api")
+
+frontend = Frontend("./client/dist")
+loop_monitor = (
+    LoopMonitor(settings.loop_monitor_threshold_ms, settings.loop_monitor_interval_ms)
+    if settings.loop_monitor_threshold_ms is not None
+    else None
+)
+app = FastAPI(lifespan=lifespan)
+primary = APIRouter(prefix="/api", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,10 +74,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    level=settings.compression_level,
 )
+if settings.query_stats_headers:
+    app.add_middleware(QueryStatsMiddleware)
+if loop_monitor is not None:
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+# Outermost, so the measured time includes the other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Mount the static files
-app.mount("/assets", StaticFiles(directory="./client/dist/assets"), name="assets")
+app.mount("/assets", FrontendAssets(frontend), name="assets")
 
 # Add API prefix to all routers
 primary.include_router(auth_router)
@@ -40,10 +103,21 @@ primary.include_router(spend_router)
 primary.include_router(assistant_router)
 primary.include_router(goals_router)
 primary.include_router(users_router)
+primary.include_router(sync_router)
+primary.include_router(jobs_router)
+primary.include_router(dashboard_router)
+primary.include_router(alerts_router)
 app.include_router(primary)
 
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Scraped by Prometheus
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/{full_path:path}")
-async def serve_frontend(full_path: str):
+async def serve_frontend(full_path: str, request: Request):
     # Serve the index.html for any path that doesn't match an API route
     if not full_path.startswith("api/"):
-        return FileResponse("./client/dist/index.html")
+        return frontend.serve(full_path, request.headers)
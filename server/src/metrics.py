@@ -0,0 +1,314 @@
+import re
+import math
+import time
+import hashlib
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, the defaults of the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 7.5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric:
+    """Base class of the metric types, holding one value per set of label values."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up, such as the number of requests served."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """A value that goes up and down, such as the number of requests in flight."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labels:
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Counts observations, such as request durations, into cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: count per bucket (the last one is +Inf), and the sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    def time(self, **labels: str) -> "Timer":
+        """Time a block of code: with histogram.time(route="/"): ..."""
+        return Timer(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._format_labels(key)} {cumulative}"
+
+
+class Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """The metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w?])\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a SQL statement to its shape, so every execution of the same query
+    is grouped together regardless of literals and formatting.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The statement on one line, with literals and IN lists replaced by ?.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _VALUE_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip().rstrip(";")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """
+    Get a short, stable identifier of a SQL statement's shape.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The first 12 hex digits of the SHA-1 of the normalized statement.
+    """
+    return hashlib.sha1(normalize_sql(statement).encode()).hexdigest()[:12]
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to serve HTTP requests, by route template.",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+)
+DB_STATEMENT_DURATION = registry.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Time to run SQL statements, by statement fingerprint.",
+        ("operation", "fingerprint", "statement"),
+        DB_BUCKETS,
+    )
+)
+DB_ERRORS = registry.register(
+    Counter(
+        "db_errors_total",
+        "SQL statements that failed, by statement fingerprint.",
+        ("operation", "fingerprint"),
+    )
+)
+ASSISTANT_TIME_TO_FIRST_TOKEN = registry.register(
+    Histogram(
+        "assistant_time_to_first_token_seconds",
+        "Time from receiving a chat message to streaming the first answer token.",
+        buckets=LLM_BUCKETS,
+    )
+)
+ASSISTANT_TOOL_CALLS = registry.register(
+    Counter(
+        "assistant_tool_calls_total",
+        "Tool calls made by the assistant, by tool and outcome.",
+        ("tool", "status"),
+    )
+)
+ASSISTANT_TOOL_DURATION = registry.register(
+    Histogram(
+        "assistant_tool_duration_seconds",
+        "Time spent in assistant tool calls, by tool.",
+        ("tool",),
+    )
+)
+GROQ_ERRORS = registry.register(
+    Counter(
+        "groq_errors_total",
+        "Failed requests to the LLM provider, including retried ones, by kind.",
+        ("kind",),
+    )
+)
+EVENT_LOOP_LAG = registry.register(
+    Histogram(
+        "event_loop_lag_seconds",
+        "How late the event loop heartbeat woke up.",
+        buckets=LAG_BUCKETS,
+    )
+)
+EVENT_LOOP_BLOCKS = registry.register(
+    Counter(
+        "event_loop_blocks_total",
+        "Times a synchronous call blocked the event loop past the threshold, by route and call site.",
+        ("route", "location"),
+    )
+)
+EVENT_LOOP_BLOCKED_SECONDS = registry.register(
+    Counter(
+        "event_loop_blocked_seconds_total",
+        "Event loop lag caused by blocks past the threshold, by route.",
+        ("route",),
+    )
+)
+JOB_DURATION = registry.register(
+    Histogram(
+        "job_duration_seconds",
+        "Time to run background job attempts, by kind and outcome.",
+        ("kind", "status"),
+        LLM_BUCKETS,
+    )
+)
+JOB_FAILURES = registry.register(
+    Counter(
+        "job_failures_total",
+        "Failed background job attempts, including retried ones, by kind and error type.",
+        ("kind", "error"),
+    )
+)
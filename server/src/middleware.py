@@ -0,0 +1,242 @@
+import gzip
+import time
+import asyncio
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.src.frontend import choose_encoding
+from server.src.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+from server.src.databridge.query_stats import track_queries
+
+try:
+    import brotli
+except ImportError:  # Optional, responses are only gzipped without it
+    brotli = None
+
+
+class MetricsMiddleware:
+    """
+    Records the duration of every HTTP request by route template, so requests
+    to /api/accounts/1/ and /api/accounts/2/ are counted together, and the
+    number of requests in flight.
+
+    The duration runs until the last body chunk is sent, so streamed responses
+    like the assistant's are measured in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route_template(scope),
+                status=str(status),
+            )
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Get the path template of the route that handled a request.
+
+    Args:
+        scope (Scope): The ASGI scope, after routing filled it in.
+
+    Returns:
+        str: The route's path, e.g. /api/accounts/{account_id}/, the mount path
+            for mounted apps, or "unmatched" when no route matched.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounts like /assets don't set a route, but append their path to root_path
+    if "app_root_path" in scope:
+        mount = scope["root_path"][len(scope["app_root_path"]):]
+        return f"{mount}/{{path:path}}"
+    return "unmatched"
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the database statements run for each request and reports them in
+    debug headers, to spot endpoints that run a query per row:
+
+        X-Query-Count: 7
+        X-Query-Rows: 2137
+        X-Query-Max-Repeats: 2; fingerprint=8ac629e32971
+        Server-Timing: db;dur=5.21;desc="7 statements"
+
+    Headers are sent before the body, so statements run while a response
+    streams are not included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_stats(message: Message):
+                if message["type"] == "http.response.start":
+                    fingerprint, repeats = stats.most_repeated()
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.statements)
+                    headers["X-Query-Rows"] = str(stats.rows)
+                    headers["X-Query-Max-Repeats"] = (
+                        f"{repeats}; fingerprint={fingerprint}" if fingerprint else "0"
+                    )
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.duration * 1000:.2f};desc="{stats.statements} statements"',
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+
+class LoopMonitorMiddleware:
+    """Tells the LoopMonitor which request each task is serving."""
+
+    def __init__(self, app: ASGIApp, monitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            self.monitor.track(scope)
+        await self.app(scope, receive, send)
+
+
+class ETagMiddleware:
+    """
+    Adds the ETag computed by DataVersionService.conditional_get to successful
+    GET responses, including responses returned directly by an endpoint.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    headers = MutableHeaders(scope=message)
+                    headers.setdefault("ETag", etag)
+                    # Let the browser keep the response but revalidate it every time
+                    headers.setdefault("Cache-Control", "private, no-cache")
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete responses larger than a threshold with brotli or gzip.
+
+    Streaming responses, such as the assistant's text/event-stream, are passed
+    through untouched so every chunk still reaches the client immediately.
+    Responses that already have a Content-Encoding (the precompressed client
+    files) are left as they are.
+    """
+
+    # Bodies above this size are compressed on a worker thread instead of the event loop
+    THREAD_THRESHOLD = 64 * 1024
+    # Compresses about as fast as gzip level 6, but smaller
+    BROTLI_QUALITY = 4
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.encodings = ("br", "gzip") if brotli else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or content_type.startswith("text/event-stream")
+                    or message["status"] in (204, 304)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the size of the body is known
+                    start = message
+                return
+
+            if passthrough or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streamed or small, send as is
+                passthrough = True
+            else:
+                if len(body) > self.THREAD_THRESHOLD:
+                    body = await asyncio.to_thread(self.compress, body, encoding)
+                else:
+                    body = self.compress(body, encoding)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=self.level)
@@ -1,11 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import Annotated
+from typing import Annotated, Any, Dict
 
 from server.src.models import Account, UserInDB
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.account_purge_service import PURGE_JOB, AccountPurgeService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.job_queue import JobQueue
+from server.src.services.transaction_query import TransactionListQuery
 from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
 
-router = APIRouter(prefix="/accounts", tags=["accounts"])
+router = APIRouter(
+    prefix="/accounts",
+    tags=["accounts"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 
 
 @router.get("/")
@@ -15,8 +24,8 @@ async def get_accounts(
     ]
 ):
     db = BaseDatabridge.get_instance()
-    result = db.query("SELECT * FROM accounts WHERE user_id = ?", (current_user.id,))
-    return result.to_dict(orient="records")
+    result = db.fetch_all("SELECT * FROM accounts WHERE user_id = ? AND deleted_at IS NULL", (current_user.id,))
+    return ORJSONResponse(result)
 
 
 @router.get("/{id}/")
@@ -28,7 +37,7 @@ async def get_account(
 ):
     db = BaseDatabridge.get_instance()
     result = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?", (id, current_user.id)
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL", (id, current_user.id)
     )
     return result.to_dict(orient="records")
 
@@ -39,25 +48,36 @@ async def get_account_transactions(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
+    params: Annotated[TransactionListQuery, Depends()],
 ):
     db = BaseDatabridge.get_instance()
     account = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?", (id, current_user.id)
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL", (id, current_user.id)
     ).to_dict(orient="records")
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    expenses = db.query(
-        "SELECT *, 'expense' as type FROM expenses WHERE account_id = ?", (id,)
-    )
-    income = db.query(
-        "SELECT *, 'income' as type FROM income WHERE account_id = ?", (id,)
+    # Income has no recurrence, which is left empty so both tables line up
+    return params.response(
+        db,
+        [
+            (
+                "SELECT e.id, e.title, e.amount, e.date, e.category, e.recurrence, e.account_id, 'expense' as type FROM expenses e",
+                "e",
+                "e.account_id = ?",
+                (id,),
+                "expense",
+            ),
+            (
+                "SELECT i.id, i.title, i.amount, i.date, i.category, NULL as recurrence, i.account_id, 'income' as type FROM income i",
+                "i",
+                "i.account_id = ?",
+                (id,),
+                "income",
+            ),
+        ],
     )
 
-    # Convert both results to records and combine them
-    transactions = expenses.to_dict(orient="records") + income.to_dict(orient="records")
-    return transactions
-
 
 @router.post("/")
 async def create_account(
@@ -77,6 +97,7 @@ async def create_account(
             current_user.id,
         ),
     )
+    DataVersionService().bump(current_user.id)
     return {"message": "Account created successfully"}
 
 
@@ -90,7 +111,7 @@ async def update_account(
 ):
     db = BaseDatabridge.get_instance()
     existing = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?", (id, current_user.id)
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL", (id, current_user.id)
     ).to_dict(orient="records")
     if not existing:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -106,10 +127,16 @@ async def update_account(
             current_user.id,
         ),
     )
+    DataVersionService().bump(current_user.id)
     return {"message": "Account updated successfully"}
 
 
-@router.delete("/{id}/")
+@JobQueue.handler(PURGE_JOB)
+def run_purge(user_id: int, payload: Dict[str, Any], progress) -> None:
+    AccountPurgeService().purge(user_id, payload["account_id"], progress)
+
+
+@router.delete("/{id}/", status_code=202)
 async def delete_account(
     id: int,
     current_user: Annotated[
@@ -118,30 +145,23 @@ async def delete_account(
 ):
     db = BaseDatabridge.get_instance()
     existing = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?", (id, current_user.id)
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL", (id, current_user.id)
     ).to_dict(orient="records")
     if not existing:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    # Start a transaction to ensure all deletes happen atomically
-    db.execute("BEGIN TRANSACTION")
-    try:
-        # Delete all related expenses
-        db.execute("DELETE FROM expenses WHERE account_id = ?", (id,))
-        
-        # Delete all related income
-        db.execute("DELETE FROM income WHERE account_id = ?", (id,))
-        
-        # Delete the account itself
-        db.execute(
-            "DELETE FROM accounts WHERE id = ? AND user_id = ?", (id, current_user.id)
-        )
-        
-        # Commit the transaction
-        db.execute("COMMIT")
-    except Exception as e:
-        # If anything fails, rollback all changes
-        db.execute("ROLLBACK")
-        raise HTTPException(status_code=500, detail=str(e))
-
-    return {"message": "Account and all related transactions deleted successfully"}
+    # The account is hidden at once, and removed with all related
+    # transactions in the background
+    db.execute(
+        "UPDATE accounts SET deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND user_id = ?",
+        (id, current_user.id),
+    )
+    job_id = JobQueue.get_instance().enqueue(
+        current_user.id,
+        PURGE_JOB,
+        {"account_id": id},
+        dedupe_key=f"{PURGE_JOB}:{id}",
+    )
+
+    DataVersionService().bump(current_user.id)
+    return {"message": "Account deleted successfully", "job_id": job_id}
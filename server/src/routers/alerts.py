@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Optional
+
+from server.src.models import UserInDB
+from server.src.responses import ORJSONResponse
+from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.spend_alert_service import SpendAlertService
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+
+@router.get("/", dependencies=[Depends(DataVersionService.conditional_get)])
+async def get_alerts(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    alert_service: SpendAlertService = Depends(SpendAlertService),
+):
+    return ORJSONResponse(alert_service.get_alerts(current_user.id, limit))
+
+
+@router.get("/stream/")
+async def stream_alerts(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    last_event_id: Annotated[Optional[int], Header()] = None,
+    alert_service: SpendAlertService = Depends(SpendAlertService),
+):
+    """
+    Stream spend alerts as server-sent events, as they are raised
+    """
+    return StreamingResponse(
+        alert_service.stream(current_user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.put("/{alert_id}/read/")
+async def mark_alert_read(
+    alert_id: int,
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    alert_service: SpendAlertService = Depends(SpendAlertService),
+):
+    if not alert_service.mark_read(current_user.id, alert_id):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    DataVersionService().bump(current_user.id)
+    return {"message": "Alert marked as read"}
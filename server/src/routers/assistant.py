@@ -1,13 +1,21 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
+from functools import lru_cache
 from typing import Dict, List, Annotated
 
-from ..services.assistant_service import AssistantService
 from server.src.models import UserInDB
 from server.src.services.authentication_service import AuthenticationService
 
 router = APIRouter(prefix="/assistant", tags=["assistant"])
-assistant_service = AssistantService()
+
+
+@lru_cache()
+def get_assistant_service():
+    # LangChain and the Groq client are slow to import, so the assistant is
+    # only loaded once it is first used
+    from server.src.services.assistant_service import AssistantService
+
+    return AssistantService()
 
 
 @router.post("/chat/")
@@ -16,6 +24,7 @@ async def chat(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
+    assistant_service=Depends(get_assistant_service),
 ):
     """
     Chat endpoint that streams the response
@@ -29,22 +38,24 @@ async def chat(
 async def get_history(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
-    ]
+    ],
+    assistant_service=Depends(get_assistant_service),
 ) -> List[Dict[str, str]]:
     """
     Get chat history
     """
-    return assistant_service.get_chat_history(current_user)
+    return await assistant_service.get_chat_history(current_user)
 
 
 @router.post("/clear/")
 async def clear_history(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
-    ]
+    ],
+    assistant_service=Depends(get_assistant_service),
 ):
     """
     Clear chat history
     """
-    assistant_service.clear_history(current_user)
+    await assistant_service.clear_history(current_user)
     return {"status": "success"}
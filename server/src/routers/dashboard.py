@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Annotated, Optional
+
+from server.src.models import UserInDB
+from server.src.responses import ORJSONResponse
+from server.src.services.authentication_service import AuthenticationService
+from server.src.services.dashboard_service import DashboardService
+from server.src.services.data_version_service import DataVersionService
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
+
+
+@router.get("/summary/")
+async def get_summary(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    week_start: Optional[date] = None,
+    dashboard_service: DashboardService = Depends(DashboardService),
+):
+    # The ETag covers every part, all of them change with the user's data version
+    return ORJSONResponse(await dashboard_service.get_summary(current_user, week_start))
@@ -3,24 +3,40 @@ from typing import Annotated
 
 from server.src.models import Expense, UserInDB
 from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.spend_alert_service import SpendAlertService
+from server.src.services.transaction_query import TransactionListQuery
 from datetime import date
 
-router = APIRouter(prefix="/expenses", tags=["expenses"])
+router = APIRouter(
+    prefix="/expenses",
+    tags=["expenses"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 
 
 @router.get("/")
 async def get_expenses(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
-    ]
+    ],
+    params: Annotated[TransactionListQuery, Depends()],
 ):
     db = BaseDatabridge.get_instance()
-    result = db.query(
-        "SELECT e.* FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE a.user_id = ?",
-        (current_user.id,),
+    return params.response(
+        db,
+        [
+            (
+                "SELECT e.* FROM expenses e JOIN accounts a ON e.account_id = a.id",
+                "e",
+                "a.user_id = ? AND a.deleted_at IS NULL",
+                (current_user.id,),
+                None,
+            )
+        ],
     )
-    return result.to_dict(orient="records")
 
 
 @router.get("/fixed-per-month/")
@@ -31,7 +47,7 @@ async def get_fixed_per_month(
 ):
     db = BaseDatabridge.get_instance()
     result = db.query(
-        "SELECT SUM(amount) as total_fixed FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE a.user_id = ? AND e.recurrence IS NOT NULL",
+        "SELECT SUM(amount) as total_fixed FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE a.user_id = ? AND a.deleted_at IS NULL AND e.recurrence IS NOT NULL",
         (current_user.id,),
     )
     return result.to_dict(orient="records")[0]["total_fixed"]
@@ -46,7 +62,7 @@ async def get_expense(
 ):
     db = BaseDatabridge.get_instance()
     result = db.query(
-        "SELECT e.* FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ?",
+        "SELECT e.* FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
     if not result.to_dict(orient="records"):
@@ -65,7 +81,7 @@ async def create_expense(
 
     # Verify the account belongs to the user
     account = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?",
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
         (expense.account_id, current_user.id),
     ).to_dict(orient="records")
     if not account:
@@ -90,6 +106,9 @@ async def create_expense(
         (expense.amount, date.today(), expense.account_id, current_user.id),
     )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Expense created successfully"}
 
 
@@ -104,20 +123,20 @@ async def update_expense(
     db = BaseDatabridge.get_instance()
 
     # Get the original expense amount and verify ownership through account
-    original_expense = db.query(
-        "SELECT e.amount, e.account_id FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ?",
+    original_expense = db.fetch_all(
+        "SELECT e.amount, e.account_id FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
-    if not original_expense.to_dict(orient="records"):
+    if not original_expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    original_amount = original_expense.to_dict(orient="records")[0]["amount"]
-    original_account_id = original_expense.to_dict(orient="records")[0]["account_id"]
+    original_amount = original_expense[0]["amount"]
+    original_account_id = original_expense[0]["account_id"]
 
     # If changing accounts, verify the new account belongs to the user
     if original_account_id != expense.account_id:
         new_account = db.query(
-            "SELECT * FROM accounts WHERE id = ? AND user_id = ?",
+            "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
             (expense.account_id, current_user.id),
         ).to_dict(orient="records")
         if not new_account:
@@ -156,6 +175,9 @@ async def update_expense(
             (adjustment, date.today(), expense.account_id, current_user.id),
         )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Expense updated successfully"}
 
 
@@ -169,15 +191,15 @@ async def delete_expense(
     db = BaseDatabridge.get_instance()
 
     # Get the expense details before deletion and verify ownership through account
-    expense = db.query(
-        "SELECT e.amount, e.account_id FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ?",
+    expense = db.fetch_all(
+        "SELECT e.amount, e.account_id FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE e.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
-    if not expense.to_dict(orient="records"):
+    if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    amount = expense.to_dict(orient="records")[0]["amount"]
-    account_id = expense.to_dict(orient="records")[0]["account_id"]
+    amount = expense[0]["amount"]
+    account_id = expense[0]["account_id"]
 
     # Delete the expense
     db.execute("DELETE FROM expenses WHERE id = ?", (id,))
@@ -188,4 +210,7 @@ async def delete_expense(
         (amount, date.today(), account_id, current_user.id),
     )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Expense deleted successfully"}
@@ -4,23 +4,39 @@ from datetime import date
 
 from server.src.models import Income, UserInDB
 from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.spend_alert_service import SpendAlertService
+from server.src.services.transaction_query import TransactionListQuery
 
-router = APIRouter(prefix="/income", tags=["income"])
+router = APIRouter(
+    prefix="/income",
+    tags=["income"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 
 
 @router.get("/")
 async def get_income(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
-    ]
+    ],
+    params: Annotated[TransactionListQuery, Depends()],
 ):
     db = BaseDatabridge.get_instance()
-    result = db.query(
-        "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id WHERE a.user_id = ?",
-        (current_user.id,),
+    return params.response(
+        db,
+        [
+            (
+                "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id",
+                "i",
+                "a.user_id = ? AND a.deleted_at IS NULL",
+                (current_user.id,),
+                None,
+            )
+        ],
     )
-    return result.to_dict(orient="records")
 
 
 @router.get("/{id}/")
@@ -32,7 +48,7 @@ async def get_income(
 ):
     db = BaseDatabridge.get_instance()
     result = db.query(
-        "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ?",
+        "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
     if not result.to_dict(orient="records"):
@@ -51,7 +67,7 @@ async def create_income(
 
     # Verify the account belongs to the user
     account = db.query(
-        "SELECT * FROM accounts WHERE id = ? AND user_id = ?",
+        "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
         (income.account_id, current_user.id),
     ).to_dict(orient="records")
     if not account:
@@ -69,6 +85,9 @@ async def create_income(
         (income.amount, date.today(), income.account_id, current_user.id),
     )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Income created successfully"}
 
 
@@ -83,20 +102,20 @@ async def update_income(
     db = BaseDatabridge.get_instance()
 
     # Get the old income amount and verify ownership through account
-    old_income = db.query(
-        "SELECT i.amount, i.account_id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ?",
+    old_income = db.fetch_all(
+        "SELECT i.amount, i.account_id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
-    if not old_income.to_dict(orient="records"):
+    if not old_income:
         raise HTTPException(status_code=404, detail="Income not found")
 
-    old_amount = old_income.to_dict(orient="records")[0]["amount"]
-    old_account_id = old_income.to_dict(orient="records")[0]["account_id"]
+    old_amount = old_income[0]["amount"]
+    old_account_id = old_income[0]["account_id"]
 
     # If changing accounts, verify the new account belongs to the user
     if old_account_id != income.account_id:
         new_account = db.query(
-            "SELECT * FROM accounts WHERE id = ? AND user_id = ?",
+            "SELECT * FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
             (income.account_id, current_user.id),
         ).to_dict(orient="records")
         if not new_account:
@@ -133,6 +152,9 @@ async def update_income(
             (difference, date.today(), income.account_id, current_user.id),
         )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Income updated successfully"}
 
 
@@ -146,15 +168,15 @@ async def delete_income(
     db = BaseDatabridge.get_instance()
 
     # Get the income details before deletion and verify ownership through account
-    income = db.query(
-        "SELECT i.amount, i.account_id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ?",
+    income = db.fetch_all(
+        "SELECT i.amount, i.account_id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id = ? AND a.user_id = ? AND a.deleted_at IS NULL",
         (id, current_user.id),
     )
-    if not income.to_dict(orient="records"):
+    if not income:
         raise HTTPException(status_code=404, detail="Income not found")
 
-    amount = income.to_dict(orient="records")[0]["amount"]
-    account_id = income.to_dict(orient="records")[0]["account_id"]
+    amount = income[0]["amount"]
+    account_id = income[0]["account_id"]
 
     # Delete the income record
     db.execute("DELETE FROM income WHERE id = ?", (id,))
@@ -165,4 +187,7 @@ async def delete_income(
         (amount, date.today(), account_id, current_user.id),
     )
 
+    DataVersionService().bump(current_user.id)
+
+    SpendAlertService().check(current_user.id)
     return {"message": "Income deleted successfully"}
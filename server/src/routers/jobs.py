@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated
+
+from server.src.models import UserInDB
+from server.src.services.authentication_service import AuthenticationService
+from server.src.services.job_queue import JobQueue
+
+# Job status changes without the user's data changing, so unlike the data
+# routers these responses are not cached with the data version ETag
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}/")
+def get_job(
+    job_id: int,
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+):
+    job = JobQueue.get_instance().get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
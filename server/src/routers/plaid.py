@@ -1,13 +1,17 @@
 import json
-from fastapi import APIRouter, Depends
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from typing import Annotated
-from datetime import datetime
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List
 
-from server.src.databridge.plaid_databridge import PlaidDatabridge
 from server.src.databridge.base_databridge import BaseDatabridge
-from server.src.services.plaid_service import PlaidService
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.job_queue import JobQueue
+from server.src.services.spend_alert_service import SpendAlertService
+from server.src.services.sync_scheduler import SYNC_JOB, SyncScheduler
+from server.src.settings import settings
 from server.src.models import (
     UserInDB,
     PlaidTransactionRequest,
@@ -17,90 +21,77 @@ from server.src.models import (
 router = APIRouter(prefix="/plaid", tags=["plaid"])
 
 
+@lru_cache()
+def get_plaid_service():
+    # The Plaid SDK is slow to import, so the client is only created once a
+    # Plaid route is used
+    from server.src.services.plaid_service import PlaidService
+
+    return PlaidService()
+
+
 @router.get("/link-token/")
-async def get_link_token(user_id: str):
-    databridge = PlaidDatabridge()
-    link_token = databridge.create_link_token(user_id)
+async def get_link_token(user_id: str, plaid_service=Depends(get_plaid_service)):
+    link_token = plaid_service.plaid.create_link_token(user_id)
     return {"link_token": link_token}
 
 
-@router.post("/exchange-public-token/")
+@JobQueue.handler("plaid_import")
+def run_import(user_id: int, payload: Dict[str, Any], progress) -> None:
+    get_plaid_service().import_item(user_id, payload["token_id"], progress)
+    DataVersionService().bump(user_id)
+    SpendAlertService().check(user_id)
+    SyncScheduler.get_instance().record_success(payload["token_id"])
+
+
+@JobQueue.handler("plaid_sync")
+def run_sync(user_id: int, payload: Dict[str, Any], progress) -> None:
+    synced = get_plaid_service().sync_items(user_id, progress)
+    DataVersionService().bump(user_id)
+    SpendAlertService().check(user_id)
+    for token_id in synced:
+        SyncScheduler.get_instance().record_success(token_id)
+
+
+@JobQueue.handler(SYNC_JOB)
+def run_scheduled_sync(user_id: int, payload: Dict[str, Any], progress) -> None:
+    scheduler = SyncScheduler.get_instance()
+    try:
+        get_plaid_service().sync_items(user_id, progress, payload["token_id"])
+    except Exception as e:
+        scheduler.record_failure(payload["token_id"], e)
+        raise
+    DataVersionService().bump(user_id)
+    SpendAlertService().check(user_id)
+    scheduler.record_success(payload["token_id"])
+
+
+@router.post("/exchange-public-token/", status_code=202)
 async def exchange_public_token(
     token: PublicTokenExchangeRequest,
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
+    plaid_service=Depends(get_plaid_service),
 ):
-    databridge = PlaidDatabridge()
-    db = BaseDatabridge.get_instance()
-    access_token = databridge.exchange_public_token(token.public_token)
-    db.execute(
-        "INSERT INTO tokens (user_id, name, key) VALUES (?, ?, ?)",
-        (current_user.id, token.name, access_token),
+    # The Plaid SDK and the database block, so they run on worker threads
+    access_token, item_id = await asyncio.to_thread(
+        plaid_service.plaid.exchange_public_token, token.public_token
     )
-
-    # Get plaid account id
-    account_id = db.query(
-        "SELECT id FROM tokens WHERE name = ? AND user_id = ?",
-        (token.name, current_user.id),
-    ).to_dict(orient="records")[0]["id"]
-
-    # Get account and insert into accounts
-    account = PlaidService().get_balance(account_id, current_user)
-    db.execute(
-        "INSERT INTO accounts (name, type, balance, user_id) VALUES (?, ?, ?, ?)",
-        (
-            token.name,
-            account["type"],
-            account["balances"].get("limit", 0),
-            current_user.id,
-        ),
+    job_id = await asyncio.to_thread(
+        queue_item_import, current_user.id, token.name, access_token, item_id
     )
+    return {"message": "Public token has been exchanged", "job_id": job_id}
 
-    # Get account id
-    account_id = db.query(
-        "SELECT id FROM accounts WHERE name = ? AND user_id = ?",
-        (token.name, current_user.id),
-    ).to_dict(orient="records")[0]["id"]
-
-    # Get transactions
-    transactions = PlaidService().get_transactions(
-        PlaidTransactionRequest(
-            start_date="2000-01-01",
-            end_date=datetime.now().strftime("%Y-%m-%d")
-        ),
-        current_user,
-    )
-    for transaction in transactions[token.name]:
-        if transaction.get("category") and len(transaction.get("category")) > 0:
-            category = transaction.get("category")[0]
-        else:
-            category = "Other"
-
-        if transaction["amount"] < 0:
-            db.execute(
-                "INSERT INTO income (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
-                (
-                    transaction["name"],
-                    -float(transaction["amount"]),
-                    transaction["date"],
-                    category,
-                    account_id,
-                ),
-            )
-        else:
-            db.execute(
-                "INSERT INTO expenses (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
-                (
-                    transaction["name"],
-                    float(transaction["amount"]),
-                    transaction["date"],
-                    category,
-                    account_id,
-                ),
-            )
-
-    return {"message": "Public token has been exchanged and transactions stored"}
+
+def queue_item_import(user_id: int, name: str, access_token: str, item_id: str) -> int:
+    token_id = BaseDatabridge.get_instance().fetch_all(
+        "INSERT INTO tokens (user_id, name, key, item_id) VALUES (?, ?, ?, ?) RETURNING id",
+        (user_id, name, access_token, item_id),
+    )[0]["id"]
+
+    # The account and its transactions are imported in the background
+    return JobQueue.get_instance().enqueue(user_id, "plaid_import", {"token_id": token_id})
 
 
 @router.post("/transactions/")
@@ -109,9 +100,10 @@ async def get_transactions(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
+    plaid_service=Depends(get_plaid_service),
 ):
     return {
-        "transactions": PlaidService().get_transactions(
+        "transactions": plaid_service.get_transactions(
             transaction_request, current_user
         )
     }
@@ -123,85 +115,78 @@ async def get_balance(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
+    plaid_service=Depends(get_plaid_service),
+):
+    return {"account": plaid_service.get_balance(account_id, current_user)}
+
+
+@router.post("/refresh-balances/")
+async def refresh_balances(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    plaid_service=Depends(get_plaid_service),
 ):
-    return {"account": PlaidService().get_balance(account_id, current_user)}
+    return await plaid_service.refresh_balances(current_user.id)
+
 
-@router.post("/sync-transactions/")
+@router.post("/sync-transactions/", status_code=202)
 async def sync_transactions(
     current_user: Annotated[
         UserInDB, Depends(AuthenticationService.get_current_active_user)
     ],
 ):
-    db = BaseDatabridge.get_instance()
-
-    ids = db.query(
-        "SELECT id FROM accounts WHERE user_id = ?",
-        (current_user.id, ),
-    ).to_dict(orient="records")
-
-
-    for id in ids:
-        account_id = id["id"]
-        transactions = PlaidService().get_transactions(
-            PlaidTransactionRequest(
-                start_date="2000-01-01",
-                end_date=datetime.now().strftime("%Y-%m-%d")
-            ),
-            current_user,
+    job_id = JobQueue.get_instance().enqueue(current_user.id, "plaid_sync")
+    return {"job_id": job_id}
+
+
+# Transactions webhooks telling that an item has new or changed transactions
+SYNC_WEBHOOK_CODES = {
+    "INITIAL_UPDATE",
+    "HISTORICAL_UPDATE",
+    "DEFAULT_UPDATE",
+    "SYNC_UPDATES_AVAILABLE",
+}
+
+
+@router.post("/webhook/")
+async def receive_webhook(request: Request):
+    """
+    Receive webhooks from Plaid. When an item has new transactions, a sync of
+    just that item is queued. Notifications arriving while a sync of the item
+    is still waiting to run are coalesced into it.
+    """
+    body = await request.body()
+    if settings.plaid_webhook_verify:
+        verified = await asyncio.to_thread(
+            get_plaid_service().verify_webhook,
+            body,
+            request.headers.get("plaid-verification"),
         )
-        for institution, transaction_list in transactions.items():
-            if transaction_list[0].get("budget_ai_id") == account_id:
-                for transaction in transaction_list:
-                    if transaction.get("category") and len(transaction.get("category")) > 0:
-                        category = transaction.get("category")[0]
-                    else:
-                        category = "Other"
-
-                    if transaction["amount"] < 0:
-                        # Check if income transaction already exists
-                        existing = db.query(
-                            "SELECT id FROM income WHERE title = ? AND amount = ? AND date = ? AND category = ? AND account_id = ?",
-                            (
-                                transaction["name"],
-                                -float(transaction["amount"]),
-                                transaction["date"],
-                                category,
-                                account_id,
-                            ),
-                        )
-                        
-                        if existing.empty:
-                            db.execute(
-                                "INSERT INTO income (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
-                                (
-                                    transaction["name"],
-                                    -float(transaction["amount"]),
-                                    transaction["date"],
-                                    category,
-                                    account_id,
-                                ),
-                            )
-                    else:
-                        # Check if expense transaction already exists
-                        existing = db.query(
-                            "SELECT id FROM expenses WHERE title = ? AND amount = ? AND date = ? AND category = ? AND account_id = ?",
-                            (
-                                transaction["name"],
-                                float(transaction["amount"]),
-                                transaction["date"],
-                                category,
-                                account_id,
-                            ),
-                        )
-                        
-                        if existing.empty:
-                            db.execute(
-                                "INSERT INTO expenses (title, amount, date, category, account_id) VALUES (?, ?, ?, ?, ?)",
-                                (
-                                    transaction["name"],
-                                    float(transaction["amount"]),
-                                    transaction["date"],
-                                    category,
-                                    account_id,
-                                ),
-                            )
+        if not verified:
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        webhook = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook body")
+    if not isinstance(webhook, dict):
+        raise HTTPException(status_code=400, detail="Invalid webhook body")
+    if (
+        webhook.get("webhook_type") != "TRANSACTIONS"
+        or webhook.get("webhook_code") not in SYNC_WEBHOOK_CODES
+    ):
+        return {"jobs": []}
+
+    # Plaid retries webhooks that are not acknowledged, so unknown items
+    # are acknowledged too
+    jobs = await asyncio.to_thread(queue_item_syncs, webhook.get("item_id"))
+    return {"jobs": jobs}
+
+
+def queue_item_syncs(item_id: str) -> List[int]:
+    scheduler = SyncScheduler.get_instance()
+    return [
+        scheduler.queue_sync(token["user_id"], token["id"])
+        for token in get_plaid_service().find_items(item_id)
+    ]
@@ -5,8 +5,13 @@ from typing import Annotated
 from server.src.services.spend_service import SpendService
 from server.src.models import UserInDB
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
 
-router = APIRouter(prefix="/spend", tags=["spend"])
+router = APIRouter(
+    prefix="/spend",
+    tags=["spend"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 
 
 @router.get("/budget-allotment/")
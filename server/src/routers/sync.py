@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Annotated
+
+from server.src.models import UserInDB
+from server.src.responses import ORJSONResponse
+from server.src.services.sync_service import SyncService
+from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
+
+
+@router.get("/")
+async def get_changes(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    since: int = 0,
+    limit: Annotated[int, Query(ge=1, le=5000)] = 1000,
+    sync_service: SyncService = Depends(SyncService),
+):
+    return ORJSONResponse(sync_service.get_changes(current_user, since, limit))
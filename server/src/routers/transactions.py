@@ -1,12 +1,19 @@
-import pandas as pd
-from fastapi import APIRouter, Depends
-from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Annotated, Optional
 
 from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
 from server.src.models import UserInDB
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.search_service import SearchService
+from server.src.services.transaction_query import recent_transactions
 
-router = APIRouter(prefix="/transactions", tags=["transactions"])
+router = APIRouter(
+    prefix="/transactions",
+    tags=["transactions"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 
 
 @router.get("/")
@@ -17,26 +24,30 @@ async def get_all_transactions(
     limit: int = 50
 ):
     db = BaseDatabridge.get_instance()
-    income = db.query(
-        """
-        SELECT i.id, i.title, i.amount, i.date, i.category, 'income' as type 
-        FROM income i 
-        JOIN accounts a ON i.account_id = a.id 
-        WHERE a.user_id = ? 
-        ORDER BY date DESC LIMIT ?
-    """,
-        (current_user.id, (limit // 2)),
-    )
-    expenses = db.query(
-        """
-        SELECT e.id, e.title, e.amount, e.date, e.category, 'expense' as type 
-        FROM expenses e 
-        JOIN accounts a ON e.account_id = a.id 
-        WHERE a.user_id = ? 
-        ORDER BY date DESC LIMIT ?
-    """,
-        (current_user.id, limit - len(income)),
-    )
-    result = pd.concat([income, expenses], ignore_index=True)
-    result = result.sort_values("date", ascending=False)
-    return result.to_dict(orient="records")
+    result = recent_transactions(db, current_user.id, limit)
+    return ORJSONResponse(result)
+
+
+@router.get("/search/")
+async def search_transactions(
+    current_user: Annotated[
+        UserInDB, Depends(AuthenticationService.get_current_active_user)
+    ],
+    q: Annotated[str, Query(max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Optional[str] = None,
+    search_service: SearchService = Depends(SearchService),
+):
+    # The cursor is the number of matches already returned. Clients pass on
+    # the X-Next-Cursor header and should not rely on its format.
+    offset = 0
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = int(cursor)
+
+    matches = search_service.search(current_user, q, limit + 1, offset)
+    response = ORJSONResponse(matches[:limit])
+    if len(matches) > limit:
+        response.headers["X-Next-Cursor"] = str(offset + limit)
+    return response
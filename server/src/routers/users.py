@@ -3,9 +3,15 @@ from typing import Annotated
 
 from server.src.models import User
 from server.src.services.authentication_service import AuthenticationService
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.spend_alert_service import SpendAlertService
 from server.src.databridge.base_databridge import BaseDatabridge
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+    dependencies=[Depends(DataVersionService.conditional_get)],
+)
 auth_service = AuthenticationService()
 
 @router.get("/me/", response_model=User)
@@ -24,6 +30,8 @@ async def update_spend_warning(
     db.execute(
         f"UPDATE users SET spend_warning = {spend_warning} WHERE id = {current_user.id}"
     )
+    DataVersionService().bump(current_user.id)
+    SpendAlertService().check(current_user.id)
     return {"message": "Spend warning updated successfully"}
 
 
@@ -36,4 +44,6 @@ async def update_savings_percent(
     db.execute(
         f"UPDATE users SET savings_percent = {savings_percent} WHERE id = {current_user.id}"
     )
+    DataVersionService().bump(current_user.id)
+    SpendAlertService().check(current_user.id)
     return {"message": "Savings percent updated successfully"}
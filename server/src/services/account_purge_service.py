@@ -0,0 +1,63 @@
+import time
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.services.data_version_service import DataVersionService
+from server.src.settings import settings
+
+# Kind of the jobs purging deleted accounts
+PURGE_JOB = "account_purge"
+
+# Pause between chunks, so writers waiting for the lock get it first
+CHUNK_PAUSE = 0.05
+
+
+class AccountPurgeService:
+    """
+    Removes deleted accounts with their expenses and income.
+
+    Accounts are hidden as soon as they are deleted, so the purge has no
+    hurry. Rows are deleted a chunk per transaction, with a pause in between,
+    so the write lock is never held for long and other users' writes go on
+    while a large account is purged.
+    """
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+        self.chunk_size = settings.account_purge_chunk_size
+
+    def purge(self, user_id: int, account_id: int, progress) -> None:
+        """
+        Purge a deleted account. Runs as a background job, and picks up where a
+        failed attempt stopped when retried.
+
+        Args:
+            user_id (int): The user the account belonged to.
+            account_id (int): The deleted account.
+            progress (JobProgress): Receives the expenses and income deleted.
+        """
+        deleted = self.db.fetch_all(
+            "SELECT 1 FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NOT NULL",
+            (account_id, user_id),
+        )
+        if not deleted:
+            return
+
+        for table in ("expenses", "income"):
+            while True:
+                with self.db.transaction() as transaction:
+                    count = transaction.execute(
+                        f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE account_id = ? LIMIT ?)",
+                        (account_id, self.chunk_size),
+                    )
+                if count:
+                    progress.add(**{table: count})
+                if count < self.chunk_size:
+                    break
+                time.sleep(CHUNK_PAUSE)
+
+        # The account goes last, the triggers of its rows look up its user
+        with self.db.transaction() as transaction:
+            transaction.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+
+        # Clients that sync fetch the deletions of the purged rows
+        DataVersionService().bump(user_id)
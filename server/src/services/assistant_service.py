@@ -1,22 +1,33 @@
 import json
+import math
+import time
 import asyncio
-import requests
 import pandas as pd
+from contextlib import contextmanager
 from textwrap import dedent
 from datetime import date, timedelta
 from langchain_groq import ChatGroq
+from langchain_core.language_models import BaseChatModel
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.schema.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.tools import BaseTool
 from langchain.agents import initialize_agent, Tool
-from typing import AsyncGenerator, List, Dict, ClassVar
+from typing import AsyncGenerator, List, Dict, ClassVar, Optional
 from datetime import datetime
 from langchain.agents import AgentExecutor
 
 from ..models import UserInDB
 from ..databridge.base_databridge import BaseDatabridge
+from ..databridge.web_databridge import WebDatabridge
 from ..services.spend_service import SpendService
+from ..services.conversation_store import ConversationStore
+from ..services.llm_scheduler import LLMScheduler, ScheduledChatModel, retry_delay
 from ..settings import settings
+from ..metrics import (
+    ASSISTANT_TIME_TO_FIRST_TOKEN,
+    ASSISTANT_TOOL_CALLS,
+    ASSISTANT_TOOL_DURATION,
+)
 
 
 class TransactionsByDateRangeTool(BaseTool):
@@ -30,32 +41,26 @@ class TransactionsByDateRangeTool(BaseTool):
 
     db: ClassVar[BaseDatabridge] = BaseDatabridge.get_instance()
 
-    def _run(self, date_range: str, *args, **kwargs) -> str:
-        dates = json.loads(date_range)
-        start_date = dates["start_date"]
-        end_date = dates["end_date"]
-
-        expenses = self.db.query(
-            """
+    expenses_query: ClassVar[str] = """
             SELECT e.title, e.amount, e.date, e.category, e.recurrence, 'expense' as type 
             FROM expenses e
             JOIN accounts a ON e.account_id = a.id
             WHERE e.date BETWEEN ? AND ?
-            AND a.user_id = ?
-        """,
-            (start_date, end_date, self.user_id),
-        )
-
-        income = self.db.query(
-            """
+            AND a.user_id = ? AND a.deleted_at IS NULL
+        """
+    income_query: ClassVar[str] = """
             SELECT i.title, i.amount, i.date, i.category, 'income' as type 
             FROM income i
             JOIN accounts a ON i.account_id = a.id
             WHERE i.date BETWEEN ? AND ?
-            AND a.user_id = ?
-        """,
-            (start_date, end_date, self.user_id),
-        )
+            AND a.user_id = ? AND a.deleted_at IS NULL
+        """
+
+    def _parameters(self, date_range: str) -> tuple:
+        dates = json.loads(date_range)
+        return (dates["start_date"], dates["end_date"], self.user_id)
+
+    def _combine(self, expenses: pd.DataFrame, income: pd.DataFrame) -> str:
         income["recurrence"] = None
 
         transactions = expenses.to_dict(orient="records") + income.to_dict(
@@ -66,8 +71,21 @@ class TransactionsByDateRangeTool(BaseTool):
 
         return transactions
 
+    def _run(self, date_range: str, *args, **kwargs) -> str:
+        parameters = self._parameters(date_range)
+        return self._combine(
+            self.db.query(self.expenses_query, parameters),
+            self.db.query(self.income_query, parameters),
+        )
 
-db = BaseDatabridge.get_instance()
+    async def _arun(self, date_range: str, *args, **kwargs) -> str:
+        parameters = self._parameters(date_range)
+        return self._combine(
+            *await asyncio.gather(
+                self.db.aquery(self.expenses_query, parameters),
+                self.db.aquery(self.income_query, parameters),
+            )
+        )
 
 
 class TransactionsByCategoryTool(BaseTool):
@@ -76,37 +94,46 @@ class TransactionsByCategoryTool(BaseTool):
     user_id: int
     name: str = "get_transactions_by_category"
     description: str = (
-        f'Use this tool to get transactional data by category. Input should be a JSON string with category. Category is the name of the category you want to retrieve. The possible categories are: {", ".join(pd.concat([db.query("SELECT DISTINCT e.category FROM expenses e JOIN accounts a ON e.account_id = a.id"), db.query("SELECT DISTINCT i.category FROM income i JOIN accounts a ON i.account_id = a.id")])["category"].unique())}'
+        "Use this tool to get transactional data by category. Input should be a JSON string with category. Category is the name of the category you want to retrieve. The possible categories are: {categories}"
     )
 
     db: ClassVar[BaseDatabridge] = BaseDatabridge.get_instance()
 
-    def _run(self, category: str, *args, **kwargs) -> str:
-        category = json.loads(category)
-        category = category["category"]
-
-        expenses = self.db.query(
+    @classmethod
+    def for_user(cls, user_id: int) -> "TransactionsByCategoryTool":
+        """Create the tool with the user's categories listed in its description."""
+        categories = cls.db.query(
             """
+            SELECT DISTINCT e.category FROM expenses e JOIN accounts a ON e.account_id = a.id WHERE a.user_id = ? AND a.deleted_at IS NULL
+            UNION
+            SELECT DISTINCT i.category FROM income i JOIN accounts a ON i.account_id = a.id WHERE a.user_id = ? AND a.deleted_at IS NULL
+            """,
+            (user_id, user_id),
+        )
+        description = cls.model_fields["description"].default.format(
+            categories=", ".join(categories["category"]) if not categories.empty else ""
+        )
+        return cls(user_id=user_id, description=description)
+
+    expenses_query: ClassVar[str] = """
             SELECT e.*, 'expense' as type 
             FROM expenses e
             JOIN accounts a ON e.account_id = a.id
             WHERE e.category = ?
-            AND a.user_id = ?
-        """,
-            (category, self.user_id),
-        )
-
-        income = self.db.query(
-            """
+            AND a.user_id = ? AND a.deleted_at IS NULL
+        """
+    income_query: ClassVar[str] = """
             SELECT i.*, 'income' as type 
             FROM income i
             JOIN accounts a ON i.account_id = a.id
             WHERE i.category = ?
-            AND a.user_id = ?
-        """,
-            (category, self.user_id),
-        )
+            AND a.user_id = ? AND a.deleted_at IS NULL
+        """
+
+    def _parameters(self, category: str) -> tuple:
+        return (json.loads(category)["category"], self.user_id)
 
+    def _combine(self, expenses: pd.DataFrame, income: pd.DataFrame) -> str:
         transactions = expenses.to_dict(orient="records") + income.to_dict(
             orient="records"
         )
@@ -115,6 +142,22 @@ class TransactionsByCategoryTool(BaseTool):
 
         return transactions
 
+    def _run(self, category: str, *args, **kwargs) -> str:
+        parameters = self._parameters(category)
+        return self._combine(
+            self.db.query(self.expenses_query, parameters),
+            self.db.query(self.income_query, parameters),
+        )
+
+    async def _arun(self, category: str, *args, **kwargs) -> str:
+        parameters = self._parameters(category)
+        return self._combine(
+            *await asyncio.gather(
+                self.db.aquery(self.expenses_query, parameters),
+                self.db.aquery(self.income_query, parameters),
+            )
+        )
+
 
 class AccountsTool(BaseTool):
     """Tool for getting account data"""
@@ -127,14 +170,19 @@ class AccountsTool(BaseTool):
 
     db: ClassVar[BaseDatabridge] = BaseDatabridge.get_instance()
 
-    def _run(self, *args, **kwargs) -> str:
-        accounts = self.db.query(
-            "SELECT * FROM accounts WHERE user_id = ?", (self.user_id,)
-        )
+    query: ClassVar[str] = "SELECT * FROM accounts WHERE user_id = ? AND deleted_at IS NULL"
+
+    def _format(self, accounts: pd.DataFrame) -> str:
         if accounts.empty:
             return "This user has no accounts."
         return accounts.to_dict("records")
 
+    def _run(self, *args, **kwargs) -> str:
+        return self._format(self.db.query(self.query, (self.user_id,)))
+
+    async def _arun(self, *args, **kwargs) -> str:
+        return self._format(await self.db.aquery(self.query, (self.user_id,)))
+
 
 class TransactionsPerAccountTool(BaseTool):
     """Tool for getting transactional data per account"""
@@ -147,34 +195,53 @@ class TransactionsPerAccountTool(BaseTool):
 
     db: ClassVar[BaseDatabridge] = BaseDatabridge.get_instance()
 
+    account_query: ClassVar[str] = "SELECT id FROM accounts WHERE id = ? AND user_id = ? AND deleted_at IS NULL"
+    expenses_query: ClassVar[str] = (
+        "SELECT *, 'expense' as type FROM expenses WHERE account_id = ?"
+    )
+    income_query: ClassVar[str] = (
+        "SELECT *, 'income' as type FROM income WHERE account_id = ?"
+    )
+
+    def _combine(self, expenses: pd.DataFrame, income: pd.DataFrame) -> str:
+        # Convert both results to records and combine them
+        transactions = expenses.to_dict(orient="records") + income.to_dict(
+            orient="records"
+        )
+        if not transactions:
+            return "No transactions found for this account."
+
+        return transactions
+
     def _run(self, account_id: str, *args, **kwargs) -> str:
-        account = json.loads(account_id)
-        account_id = account["account_id"]
+        account_id = json.loads(account_id)["account_id"]
 
         # First verify the account belongs to the user
-        account_check = self.db.query(
-            "SELECT id FROM accounts WHERE id = ? AND user_id = ?",
-            (account_id, self.user_id),
-        )
+        account_check = self.db.query(self.account_query, (account_id, self.user_id))
         if account_check.empty:
             return "No accounts of this ID found for the user."
 
-        expenses = self.db.query(
-            "SELECT *, 'expense' as type FROM expenses WHERE account_id = ?",
-            (account_id,),
-        )
-        income = self.db.query(
-            "SELECT *, 'income' as type FROM income WHERE account_id = ?", (account_id,)
+        return self._combine(
+            self.db.query(self.expenses_query, (account_id,)),
+            self.db.query(self.income_query, (account_id,)),
         )
 
-        # Convert both results to records and combine them
-        transactions = expenses.to_dict(orient="records") + income.to_dict(
-            orient="records"
+    async def _arun(self, account_id: str, *args, **kwargs) -> str:
+        account_id = json.loads(account_id)["account_id"]
+
+        # First verify the account belongs to the user
+        account_check = await self.db.aquery(
+            self.account_query, (account_id, self.user_id)
         )
-        if not transactions:
-            return "No transactions found for this account."
+        if account_check.empty:
+            return "No accounts of this ID found for the user."
 
-        return transactions
+        return self._combine(
+            *await asyncio.gather(
+                self.db.aquery(self.expenses_query, (account_id,)),
+                self.db.aquery(self.income_query, (account_id,)),
+            )
+        )
 
 
 class SpendTool(BaseTool):
@@ -204,6 +271,10 @@ class SpendTool(BaseTool):
             ),
         }
 
+    async def _arun(self, *args, **kwargs) -> str:
+        # The spend calculations are pandas heavy, so run them off the event loop
+        return await asyncio.to_thread(self._run)
+
 
 class GoalsTool(BaseTool):
     """Tool for getting user's financial goals"""
@@ -216,14 +287,18 @@ class GoalsTool(BaseTool):
 
     db: ClassVar[BaseDatabridge] = BaseDatabridge.get_instance()
 
-    def _run(self, *args, **kwargs) -> str:
-        goals = self.db.query(
-            "SELECT * FROM goals WHERE user_id = ?", 
-            (self.user_id,)
-        )
+    query: ClassVar[str] = "SELECT * FROM goals WHERE user_id = ?"
+
+    def _format(self, goals: pd.DataFrame) -> str:
         if goals.empty:
             return "No goals found for this user."
         return goals.to_dict(orient="records")
+
+    def _run(self, *args, **kwargs) -> str:
+        return self._format(self.db.query(self.query, (self.user_id,)))
+
+    async def _arun(self, *args, **kwargs) -> str:
+        return self._format(await self.db.aquery(self.query, (self.user_id,)))
     
 
 class WebSearchTool(BaseTool):
@@ -231,20 +306,13 @@ class WebSearchTool(BaseTool):
     name: str = "search_web"
     description: str = "Use this tool to search the internet and get websites. Input should be a JSON string with the query. The return result will be a list of websites which meet the query, so keep the query general. After using this tool, you should use the open_website tool to get the contents of the website."
 
-    def _run(self, query: str, *args, **kwargs) -> str:
-        url = "https://google.serper.dev/search"
+    web: ClassVar[WebDatabridge] = WebDatabridge.get_instance()
 
-        query = json.loads(query)["query"]
-
-        payload = json.dumps({"q": query})
-        headers = {
-            "X-API-KEY": settings.serper_api_key,
-            "Content-Type": "application/json",
-        }
-
-        response = requests.request("POST", url, headers=headers, data=payload)
+    def _run(self, query: str, *args, **kwargs) -> str:
+        return self.web.search(json.loads(query)["query"])
 
-        return response.text
+    async def _arun(self, query: str, *args, **kwargs) -> str:
+        return await self.web.asearch(json.loads(query)["query"])
     
 
 class OpenWebsiteTool(BaseTool):
@@ -252,9 +320,13 @@ class OpenWebsiteTool(BaseTool):
     name: str = "open_website"
     description: str = "Use this tool to get the contents of a website based on the URL. Input should be a JSON string with the URL."
 
+    web: ClassVar[WebDatabridge] = WebDatabridge.get_instance()
+
     def _run(self, url: str, *args, **kwargs) -> str:
-        url = json.loads(url)["url"]
-        return requests.get(url).text
+        return self.web.fetch(json.loads(url)["url"])
+
+    async def _arun(self, url: str, *args, **kwargs) -> str:
+        return await self.web.afetch(json.loads(url)["url"])
     
 class InformationTool(BaseTool):
     """Tool for getting information about the Budget.AI application"""
@@ -278,17 +350,148 @@ class InformationTool(BaseTool):
         
         New transactions can be added on the Overview or the Transactions page."""
 
-class AssistantService:
+    async def _arun(self, *args, **kwargs) -> str:
+        return self._run(*args, **kwargs)
+
+
+class FinalAnswerStream:
+    """
+    Extracts the user-facing answer from the agent's streamed LLM tokens.
+
+    The conversational agent prefixes its final answer with "AI:" and uses the
+    same LLM call format for tool selection, so tokens are buffered until the
+    prefix shows up and everything after it is passed through as it arrives.
+    """
+
+    prefix = "AI:"
+
     def __init__(self):
-        self.llm = ChatGroq(
+        self.emitted = False
+        self.reset()
+
+    def reset(self) -> None:
+        """Prepare for a new LLM call."""
+        self.buffer = ""
+        self.pending = ""
+        self.answering = False
+
+    def feed(self, token: str) -> str:
+        """
+        Consume a streamed token.
+
+        Args:
+            token (str): The next token produced by the LLM.
+
+        Returns:
+            str: The text that can be sent to the user, possibly empty.
+        """
+        if not self.answering:
+            self.buffer += token
+            if self.prefix not in self.buffer:
+                return ""
+            self.answering = True
+            token = self.buffer.split(self.prefix, 1)[1]
+            self.buffer = ""
+
+        text = self.pending + token
+        if not self.emitted:
+            text = text.lstrip()
+
+        # Hold back a trailing delimiter character in case the next token
+        # completes a "<|" or "|>" sequence
+        if text.endswith(("<", "|")):
+            text, self.pending = text[:-1], text[-1]
+        else:
+            self.pending = ""
+
+        text = _strip_action_delimiters(text)
+        self.emitted = self.emitted or bool(text)
+        return text
+
+    def flush(self) -> str:
+        """
+        Release any held back text at the end of an LLM call.
+
+        Returns:
+            str: The remaining text for the user, possibly empty.
+        """
+        text, self.pending = self.pending, ""
+        return text
+
+
+def _strip_action_delimiters(text: str) -> str:
+    """Remove the delimiters the client uses to detect action status frames."""
+    return text.replace("|>", "").replace("<|", "")
+
+
+@contextmanager
+def _tool_metrics(name: str):
+    """Count and time a tool call in the metrics."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        ASSISTANT_TOOL_CALLS.inc(tool=name, status=status)
+        ASSISTANT_TOOL_DURATION.observe(time.perf_counter() - start, tool=name)
+
+
+def _agent_tool(tool: BaseTool) -> Tool:
+    """
+    Wrap one of the assistant's tools for the agent, recording its calls in the metrics.
+
+    Args:
+        tool (BaseTool): The tool to wrap.
+
+    Returns:
+        Tool: The tool as used by the agent.
+    """
+
+    def run(*args, **kwargs):
+        with _tool_metrics(tool.name):
+            return tool._run(*args, **kwargs)
+
+    async def arun(*args, **kwargs):
+        with _tool_metrics(tool.name):
+            return await tool._arun(*args, **kwargs)
+
+    return Tool(name=tool.name, description=tool.description, func=run, coroutine=arun)
+
+
+SYSTEM_MESSAGE = SystemMessage(
+    content=dedent(
+        f"""
+        You are a financial assistant helping the user with their personal budgeting and finances. You have access to tools to retrieve transaction and account data.
+        In general, unless otherwise specified or the use-case determines otherwise, you should check data from within the last month.
+        
+        ALWAYS make an attempt to use the tools to get the data you need. If you cannot use the tools, then inform the user that you cannot answer the question.
+        NEVER respond with an ID of data. If you have an ID, find the name the ID corresponds to.
+        ENSURE that tool inputs are formatted as JSON strings with the keys being the names of the parameters for the tools you are using.
+        """
+    )
+)
+
+
+class AssistantService:
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or ChatGroq(
             groq_api_key=settings.groq_api_key,
             model_name="llama-3.3-70b-versatile",
             streaming=True,
             temperature=0,
         )
+        self.scheduler = LLMScheduler(
+            max_concurrency=settings.groq_max_concurrency,
+            requests_per_minute=settings.groq_requests_per_minute,
+            tokens_per_minute=settings.groq_tokens_per_minute,
+            max_retries=settings.groq_max_retries,
+        )
 
-        # Initialize the agent
+        # Agents are cached per process, while their memory is loaded from the
+        # shared conversation store on every message
         self.agents: Dict[int, AgentExecutor] = {}
+        self.store = ConversationStore()
         self.actions = {
             "get_transactions_by_date_range": "Retrieving transaction data from {start_date} to {end_date}...",
             "get_transactions_by_category": "Retrieving transaction data for {category}...",
@@ -307,10 +510,10 @@ class AssistantService:
             # Add more preprocessors here as needed
         }
 
-    def _preprocess_account_data(self, input_data: dict) -> dict:
+    async def _preprocess_account_data(self, input_data: dict) -> dict:
         """Preprocesses account data by adding account name."""
         if "account_id" in input_data:
-            account = BaseDatabridge.get_instance().query(
+            account = await BaseDatabridge.get_instance().aquery(
                 "SELECT name FROM accounts WHERE id = ?", (input_data["account_id"],)
             )
             if not account.empty:
@@ -319,15 +522,15 @@ class AssistantService:
                 input_data["account_name"] = f"account {input_data['account_id']}"
         return input_data
 
-    async def chat(self, user: UserInDB, message: str) -> AsyncGenerator[str, None]:
+    def get_agent(self, user: UserInDB) -> AgentExecutor:
         """
-        Process a chat message and stream the response using the agent
+        Get the agent for a user, creating it on first use
         """
         if user.id not in self.agents:
             transactions_by_date_range_tool = TransactionsByDateRangeTool(
                 user_id=user.id
             )
-            transactions_by_category_tool = TransactionsByCategoryTool(user_id=user.id)
+            transactions_by_category_tool = TransactionsByCategoryTool.for_user(user.id)
             accounts_tool = AccountsTool(user_id=user.id)
             transactions_per_account_tool = TransactionsPerAccountTool(user_id=user.id)
             spend_tool = SpendTool(user_id=user.id)
@@ -337,51 +540,18 @@ class AssistantService:
             information_tool = InformationTool()
 
             tools = [
-                Tool(
-                    name=transactions_by_date_range_tool.name,
-                    description=transactions_by_date_range_tool.description,
-                    func=transactions_by_date_range_tool._run,
-                ),
-                Tool(
-                    name=transactions_by_category_tool.name,
-                    description=transactions_by_category_tool.description,
-                    func=transactions_by_category_tool._run,
-                ),
-                Tool(
-                    name=accounts_tool.name,
-                    description=accounts_tool.description,
-                    func=accounts_tool._run,
-                ),
-                Tool(
-                    name=transactions_per_account_tool.name,
-                    description=transactions_per_account_tool.description,
-                    func=transactions_per_account_tool._run,
-                ),
-                Tool(
-                    name=spend_tool.name,
-                    description=spend_tool.description,
-                    func=spend_tool._run,
-                ),
-                Tool(
-                    name=goals_tool.name,
-                    description=goals_tool.description,
-                    func=goals_tool._run,
-                ),
-                Tool(
-                    name=web_search_tool.name,
-                    description=web_search_tool.description,
-                    func=web_search_tool._run,
-                ),
-                Tool(
-                    name=open_website_tool.name,
-                    description=open_website_tool.description,
-                    func=open_website_tool._run,
-                ),
-                Tool(
-                    name=information_tool.name,
-                    description=information_tool.description,
-                    func=information_tool._run,
-                ),
+                _agent_tool(tool)
+                for tool in (
+                    transactions_by_date_range_tool,
+                    transactions_by_category_tool,
+                    accounts_tool,
+                    transactions_per_account_tool,
+                    spend_tool,
+                    goals_tool,
+                    web_search_tool,
+                    open_website_tool,
+                    information_tool,
+                )
             ]
 
             memory = ConversationBufferWindowMemory(
@@ -389,73 +559,110 @@ class AssistantService:
                 return_messages=True,
                 k=2,  # Remember last 2 interactions
             )
-            system_message = SystemMessage(
-                content=dedent(
-                    f"""
-                    You are a financial assistant helping the user with their personal budgeting and finances. You have access to tools to retrieve transaction and account data.
-                    In general, unless otherwise specified or the use-case determines otherwise, you should check data from within the last month.
-                    
-                    ALWAYS make an attempt to use the tools to get the data you need. If you cannot use the tools, then inform the user that you cannot answer the question.
-                    NEVER respond with an ID of data. If you have an ID, find the name the ID corresponds to.
-                    ENSURE that tool inputs are formatted as JSON strings with the keys being the names of the parameters for the tools you are using.
-                    """
-                )
-            )
-            memory.chat_memory.add_message(system_message)
+            memory.chat_memory.add_message(SYSTEM_MESSAGE)
 
             self.agents[user.id] = initialize_agent(
                 tools,
-                self.llm,
+                ScheduledChatModel(
+                    llm=self.llm, scheduler=self.scheduler, user_id=user.id
+                ),
                 agent="conversational-react-description",
                 verbose=True,
                 memory=memory,
             )
+        return self.agents[user.id]
+
+    async def chat(self, user: UserInDB, message: str) -> AsyncGenerator[str, None]:
+        """
+        Process a chat message and stream the response using the agent
+        """
+        start = time.perf_counter()
+        waiting = True
+        async for text in self._run_agent(user, message):
+            # Action status frames are not part of the answer
+            if waiting and not text.startswith("<|"):
+                ASSISTANT_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                waiting = False
+            yield text
+
+    async def _run_agent(
+        self, user: UserInDB, message: str
+    ) -> AsyncGenerator[str, None]:
+        """
+        Run the agent on a message, streaming answer tokens and action status frames
+        """
+        agent = self.get_agent(user)
+        await self._load_memory(user, agent)
+        answer = FinalAnswerStream()
+        output = None
         try:
-            async for chunk in self.agents[user.id].astream(message):
-                if chunk.get("actions"):
-                    action = chunk.get("actions")[0]
-                    input_data = json.loads(action.tool_input)
-
-                    # Apply any preprocessing for this tool
-                    if action.tool in self.preprocessors:
-                        input_data = self.preprocessors[action.tool](input_data)
-
-                    yield f"<|{self.actions[action.tool].format(**input_data)}|>"
-                elif chunk.get("output"):
-                    output = chunk.get("output")
-                    for word in output.split():
-                        yield (word + " ").replace("|>", "").replace("<|", "")
-                        await asyncio.sleep(0.02)
+            async for event in agent.astream_events(
+                {"input": message}, version="v2"
+            ):
+                kind = event["event"]
+                if kind == "on_chat_model_start":
+                    answer.reset()
+                elif kind == "on_chat_model_stream":
+                    if text := answer.feed(event["data"]["chunk"].content):
+                        yield text
+                elif kind == "on_chat_model_end":
+                    if text := answer.flush():
+                        yield text
+                elif kind == "on_chain_stream" and not event["parent_ids"]:
+                    chunk = event["data"]["chunk"]
+                    if chunk.get("actions"):
+                        action = chunk.get("actions")[0]
+                        input_data = json.loads(action.tool_input)
+
+                        # Apply any preprocessing for this tool
+                        if action.tool in self.preprocessors:
+                            input_data = await self.preprocessors[action.tool](
+                                input_data
+                            )
+
+                        yield f"<|{self.actions[action.tool].format(**input_data)}|>"
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    output = event["data"]["output"].get("output")
+                    if output and not answer.emitted:
+                        # The answer was not streamed token by token (e.g. the
+                        # agent stopped early), so send it in one piece
+                        yield _strip_action_delimiters(output)
+
+            if output:
+                await self.store.add_exchange(user.id, message, output)
 
         except Exception as e:
-            error_msg = str(e).lower()
-            if "rate limit" in error_msg:
-                # Extract wait time from error message
-                import re
-
-                wait_time = "a little bit"
-                if match := re.search(r"please try again in (.*?)\.", error_msg):
-                    wait_time = match.group(1)
-                yield f"Rate limit has been reached, please try again in {wait_time}s."
+            # Rate limits are retried by the scheduler, so this is only reached
+            # once the retries are used up
+            wait_time = retry_delay(e)
+            if wait_time is not None:
+                yield f"Rate limit has been reached, please try again in {math.ceil(wait_time)}s."
             else:
                 raise e
 
-    def get_chat_history(self, user: UserInDB) -> List[Dict[str, str]]:
+    async def _load_memory(self, user: UserInDB, agent: AgentExecutor) -> None:
+        """
+        Replace the agent's memory with the conversation from the shared store,
+        as earlier messages may have been handled by another server process
+        """
+        messages = [SYSTEM_MESSAGE]
+        for message in await self.store.get_messages(user.id):
+            if message["role"] == "user":
+                messages.append(HumanMessage(content=message["content"]))
+            else:
+                messages.append(AIMessage(content=message["content"]))
+        agent.memory.chat_memory.messages = messages
+
+    async def get_chat_history(self, user: UserInDB) -> List[Dict[str, str]]:
         """
         Get the conversation history
         """
-        history = []
-        if user.id in self.agents:
-            for message in self.agents[user.id].memory.chat_memory.messages:
-                if isinstance(message, HumanMessage):
-                    history.append({"role": "user", "content": message.content})
-                elif isinstance(message, AIMessage):
-                    history.append({"role": "assistant", "content": message.content})
-        return history
-
-    def clear_history(self, user: UserInDB) -> None:
+        return await self.store.get_messages(user.id)
+
+    async def clear_history(self, user: UserInDB) -> None:
         """
         Clear the conversation history
         """
+        await self.store.clear(user.id)
         if user.id in self.agents:
             self.agents[user.id].memory.clear()
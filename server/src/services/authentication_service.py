@@ -5,6 +5,7 @@ from typing import Annotated
 from jwt.exceptions import InvalidTokenError
 from fastapi import Depends, HTTPException, status
 from datetime import datetime, timedelta
+from functools import lru_cache
 
 from server.src.models import UserInDB, TokenData, NewUser
 from server.src.settings import settings
@@ -13,14 +14,27 @@ from server.src.databridge.base_databridge import BaseDatabridge
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token/")
 
 
+@lru_cache()
+def get_password_context() -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 class AuthenticationService:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.db = BaseDatabridge.get_instance()
         self.SECRET_KEY = settings.jwt_secret_key
         self.ALGORITHM = settings.jwt_algorithm
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+    # Routers create this service at import time, so the password hasher and
+    # the database are only resolved once they are needed
+    @property
+    def pwd_context(self) -> CryptContext:
+        return get_password_context()
+
+    @property
+    def db(self) -> BaseDatabridge:
+        return BaseDatabridge.get_instance()
+
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         return self.pwd_context.verify(plain_password, hashed_password)
 
@@ -0,0 +1,72 @@
+from typing import Dict, List
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.settings import settings
+
+
+class ConversationStore:
+    """
+    Assistant chat history kept in SQLite, so every server process sees the same
+    conversation for a user. Only the most recent messages are kept per user.
+    """
+
+    def __init__(self, max_messages: int = settings.conversation_history_limit):
+        self.db = BaseDatabridge.get_instance()
+        self.max_messages = max_messages
+
+    async def get_messages(self, user_id: int) -> List[Dict[str, str]]:
+        """
+        Get the stored conversation for a user, oldest message first.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            List[Dict[str, str]]: Messages with "role" ("user" or "assistant") and "content".
+        """
+        messages = await self.db.aquery(
+            """
+            SELECT role, content FROM (
+                SELECT id, role, content FROM conversations
+                WHERE user_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            ) ORDER BY id
+            """,
+            (user_id, self.max_messages),
+        )
+        return messages.to_dict(orient="records")
+
+    async def add_exchange(self, user_id: int, message: str, response: str) -> None:
+        """
+        Store a user message and the assistant's response, dropping the oldest
+        messages beyond the limit.
+
+        Args:
+            user_id (int): The ID of the user.
+            message (str): The message the user sent.
+            response (str): The assistant's answer.
+        """
+        await self.db.aexecute(
+            "INSERT INTO conversations (user_id, role, content) VALUES (?, 'user', ?), (?, 'assistant', ?)",
+            (user_id, message, user_id, response),
+        )
+        await self.db.aexecute(
+            """
+            DELETE FROM conversations
+            WHERE user_id = ?
+            AND id NOT IN (
+                SELECT id FROM conversations WHERE user_id = ? ORDER BY id DESC LIMIT ?
+            )
+            """,
+            (user_id, user_id, self.max_messages),
+        )
+
+    async def clear(self, user_id: int) -> None:
+        """
+        Delete the stored conversation for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        await self.db.aexecute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
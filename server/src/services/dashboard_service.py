@@ -0,0 +1,84 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from server.src.models import UserInDB
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.services.spend_service import SpendService, budget_allotment, week_of
+from server.src.services.transaction_query import recent_transactions
+
+# Transactions shown on the overview page
+RECENT_TRANSACTIONS = 50
+
+
+class DashboardService:
+    """
+    Builds everything the overview page shows in one go.
+
+    The parts are read concurrently, each query on its own worker thread, and
+    the results several parts need are read once: the recurring expenses give
+    both the fixed expenses per month and the allotment, and the goals are
+    listed and counted towards the allotment.
+    """
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+
+    def _fetch(self, procedure: str, parameters: Tuple[Any, ...]):
+        return asyncio.to_thread(self.db.fetch_all, procedure, parameters)
+
+    async def get_summary(
+        self, user: UserInDB, week_start: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the overview of a user's finances.
+
+        Args:
+            user (UserInDB): The user.
+            week_start (Optional[date]): First day of the week to total the
+                spend of, the current week from Sunday if not given.
+
+        Returns:
+            Dict[str, Any]: The accounts, recent transactions, goals, budget
+                allotment, spend of the week, fixed expenses per month and the
+                user's spend warning.
+        """
+        today = date.today()
+        if week_start is None:
+            week_start, week_end = week_of(today)
+        else:
+            week_end = week_start + timedelta(days=6)
+
+        accounts, transactions, goals, paycheck, fixed_expenses, spend = await asyncio.gather(
+            self._fetch(
+                "SELECT * FROM accounts WHERE user_id = ? AND deleted_at IS NULL", (user.id,)
+            ),
+            asyncio.to_thread(recent_transactions, self.db, user.id, RECENT_TRANSACTIONS),
+            self._fetch("SELECT * FROM goals WHERE user_id = ?", (user.id,)),
+            self._fetch(SpendService.PAYCHECK_QUERY, (user.id,)),
+            self._fetch(SpendService.FIXED_EXPENSES_QUERY, (user.id,)),
+            self._fetch(
+                SpendService.SPEND_QUERY,
+                (week_start.isoformat(), week_end.isoformat(), user.id),
+            ),
+        )
+
+        return {
+            "accounts": accounts,
+            "transactions": transactions,
+            "goals": goals,
+            "budget_allotment": budget_allotment(
+                paycheck[0]["amount"] if paycheck else None,
+                fixed_expenses,
+                goals,
+                user.savings_percent,
+                today,
+            ),
+            "spend_over_time": (spend[0]["total_spend"] if spend else None) or 0,
+            "fixed_per_month": (
+                sum(expense["amount"] for expense in fixed_expenses)
+                if fixed_expenses
+                else None
+            ),
+            "spend_warning": user.spend_warning,
+        }
@@ -0,0 +1,65 @@
+from datetime import date
+from typing import Annotated
+from fastapi import Depends, HTTPException, Request
+
+from server.src.models import UserInDB
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.services.authentication_service import AuthenticationService
+
+
+class DataVersionService:
+    """
+    Keeps a version number per user that increases on every change to their data.
+
+    GET endpoints derive their ETag from it, so a client that already has the
+    current data gets a 304 without the endpoint running any of its queries.
+    """
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+
+    def get_version(self, user_id: int) -> int:
+        rows = self.db.fetch_all(
+            "SELECT version FROM data_versions WHERE user_id = ?", (user_id,)
+        )
+        return rows[0]["version"] if rows else 0
+
+    def bump(self, user_id: int) -> None:
+        """Mark the user's data as changed. Call after every successful write."""
+        self.db.execute(
+            """
+            INSERT INTO data_versions (user_id, version) VALUES (?, 1)
+            ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+            """,
+            (user_id,),
+        )
+
+    def etag(self, user_id: int) -> str:
+        # Responses such as the spend summaries also depend on the current day.
+        # The ETag is weak so it stays valid when the body is compressed.
+        return f'W/"{user_id}-{self.get_version(user_id)}-{date.today().isoformat()}"'
+
+    @staticmethod
+    async def conditional_get(
+        request: Request,
+        current_user: Annotated[
+            UserInDB, Depends(AuthenticationService.get_current_active_user)
+        ],
+    ):
+        """
+        Router dependency answering If-None-Match on GET requests.
+
+        Raises a 304 when the client's ETag is current. Otherwise the ETag is left
+        on the request state for ETagMiddleware to add to the response.
+        """
+        if request.method != "GET":
+            return
+
+        etag = DataVersionService().etag(current_user.id)
+        request.state.etag = etag
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or etag.removeprefix("W/") in tags:
+                raise HTTPException(status_code=304, headers={"ETag": etag})
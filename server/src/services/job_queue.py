@@ -0,0 +1,332 @@
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.metrics import JOB_DURATION, JOB_FAILURES
+from server.src.settings import settings
+
+# How often a running job's heartbeat is refreshed, and how old it may get
+# before the job is assumed lost with a crashed worker and queued again
+HEARTBEAT_INTERVAL = 10.0
+STALE_AFTER = 60.0
+# How often finished jobs past their retention are deleted, and how many rows
+# are deleted per statement so other writes only wait for one chunk
+PRUNE_INTERVAL = 60.0
+PRUNE_CHUNK_SIZE = 500
+
+JobHandler = Callable[[int, Dict[str, Any], "JobProgress"], None]
+
+
+class JobProgress:
+    """
+    Counters reported by a running job, such as the rows fetched and inserted.
+    Every update is saved so the status endpoint shows it while the job runs,
+    and a retried job starts counting again from zero.
+    """
+
+    def __init__(self, db: BaseDatabridge, job_id: int):
+        self.db = db
+        self.job_id = job_id
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        """
+        Add to the counters of the job.
+
+        Args:
+            **counts (int): Amount to add per counter, e.g. fetched=100.
+        """
+        with self._lock:
+            for name, count in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+            progress = json.dumps(self.counters)
+        self.db.execute(
+            "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+            (progress, time.time(), self.job_id),
+        )
+
+
+class JobQueue:
+    """
+    In-process queue of background jobs, stored in the jobs table.
+
+    Jobs are claimed by a pool of worker tasks and run on worker threads, so
+    slow calls to external services don't hold up requests. A user's jobs run
+    one at a time in the order they were queued, and a failed job is retried
+    with exponential backoff before the user's later jobs run. Jobs left
+    running by a crashed process are queued again once their heartbeat goes
+    stale. Finished jobs are deleted once they are older than JOB_RETENTION.
+    """
+
+    _instance = None
+    handlers: Dict[str, JobHandler] = {}
+
+    @classmethod
+    def get_instance(cls):
+        """
+        Get singleton instance of JobQueue.
+
+        Returns:
+            JobQueue: Singleton instance of JobQueue
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def handler(cls, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """
+        Register the function that runs jobs of a kind. It is called on a worker
+        thread with the user id, the payload and a JobProgress, and raises to
+        fail the attempt.
+
+        Args:
+            kind (str): The kind of job the function runs.
+        """
+
+        def register(function: JobHandler) -> JobHandler:
+            cls.handlers[kind] = function
+            return function
+
+        return register
+
+    def __init__(self):
+        """Initialize the JobQueue class. Workers run once start is called."""
+        if JobQueue._instance is not None:
+            raise Exception("This class is a singleton. Use get_instance() instead.")
+
+        self.db = BaseDatabridge.get_instance()
+        self.workers = settings.job_workers
+        self.max_attempts = settings.job_max_attempts
+        self.poll_interval = settings.job_poll_interval
+        self.retry_delay = settings.job_retry_delay
+        self.retention = settings.job_retention
+        self._pruned_at = 0.0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(
+        self,
+        user_id: int,
+        kind: str,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> int:
+        """
+        Queue a job.
+
+        Args:
+            user_id (int): The user the job runs for.
+            kind (str): The kind of job, registered with handler.
+            payload (Optional[Dict[str, Any]]): JSON serializable arguments of the job.
+            dedupe_key (Optional[str]): When a job with this key is still waiting
+                to run, no new job is queued and the waiting job's id is returned.
+            max_attempts (Optional[int]): How often the job is tried, JOB_MAX_ATTEMPTS
+                by default.
+
+        Returns:
+            int: The id of the job.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for jobs of kind {kind}")
+        rows = self.db.fetch_all(
+            """
+            INSERT INTO jobs (user_id, kind, payload, max_attempts, run_after, dedupe_key)
+            SELECT ?, ?, ?, ?, ?, ?
+            WHERE ? IS NULL OR NOT EXISTS (
+                SELECT 1 FROM jobs WHERE dedupe_key = ? AND status = 'queued'
+            )
+            RETURNING id
+            """,
+            (
+                user_id,
+                kind,
+                json.dumps(payload or {}),
+                max_attempts or self.max_attempts,
+                time.time(),
+                dedupe_key,
+                dedupe_key,
+                dedupe_key,
+            ),
+        )
+        if not rows and dedupe_key is not None:
+            rows = self.db.fetch_all(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status = 'queued' ORDER BY id LIMIT 1",
+                (dedupe_key,),
+            )
+            if rows:
+                return rows[0]["id"]
+        if not rows:
+            raise RuntimeError(f"Could not queue {kind} job")
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._wake.set)
+        return rows[0]["id"]
+
+    def pending(self, kind: str) -> int:
+        """
+        Count the jobs of a kind that are queued or running.
+
+        Args:
+            kind (str): The kind of job.
+
+        Returns:
+            int: The number of unfinished jobs.
+        """
+        rows = self.db.fetch_all(
+            "SELECT COUNT(*) AS pending FROM jobs WHERE kind = ? AND status IN ('queued', 'running')",
+            (kind,),
+        )
+        return rows[0]["pending"] if rows else 0
+
+    def get(self, job_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a job of a user.
+
+        Args:
+            job_id (int): The id of the job.
+            user_id (int): The user the job must belong to.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job with its progress, or None if the
+                user has no such job.
+        """
+        rows = self.db.fetch_all(
+            """
+            SELECT id, kind, status, attempts, max_attempts, progress, error,
+                   created_at, started_at, finished_at
+            FROM jobs WHERE id = ? AND user_id = ?
+            """,
+            (job_id, user_id),
+        )
+        if not rows:
+            return None
+        job = rows[0]
+        job["progress"] = json.loads(job["progress"])
+        return job
+
+    def start(self) -> None:
+        """Start the workers. Must be called on the event loop."""
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [
+            self.loop.create_task(self._work()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Stop the workers. Jobs they were running are not waited for, and are
+        queued again when their heartbeat goes stale.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.loop = None
+
+    async def _work(self) -> None:
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        self.db.execute(
+            "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND heartbeat_at < ?",
+            (now - STALE_AFTER,),
+        )
+        if self.retention and now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            self._prune()
+        # Claim the oldest unfinished job of a user, unless one of their jobs is
+        # running, in a single statement so two workers can't claim the same job
+        rows = self.db.fetch_all(
+            """
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, progress = '{}',
+                heartbeat_at = ?, started_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs AS job
+                WHERE status = 'queued' AND run_after <= ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM jobs AS earlier
+                    WHERE earlier.user_id = job.user_id
+                    AND (earlier.status = 'running' OR (earlier.status = 'queued' AND earlier.id < job.id))
+                )
+                ORDER BY id LIMIT 1
+            )
+            RETURNING id, user_id, kind, payload, attempts, max_attempts
+            """,
+            (now, now),
+        )
+        return rows[0] if rows else None
+
+    def _prune(self) -> None:
+        while True:
+            rows = self.db.fetch_all(
+                """
+                DELETE FROM jobs WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE status IN ('succeeded', 'failed') AND finished_at < datetime('now', ?)
+                    LIMIT ?
+                )
+                RETURNING id
+                """,
+                (f"-{self.retention} seconds", PRUNE_CHUNK_SIZE),
+            )
+            if len(rows) < PRUNE_CHUNK_SIZE:
+                return
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        handler = self.handlers.get(job["kind"])
+        progress = JobProgress(self.db, job["id"])
+        task = asyncio.ensure_future(
+            asyncio.to_thread(
+                handler, job["user_id"], json.loads(job["payload"]), progress
+            )
+        )
+        while not task.done():
+            await asyncio.wait({task}, timeout=HEARTBEAT_INTERVAL)
+            if not task.done():
+                await self.db.aexecute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ?",
+                    (time.time(), job["id"]),
+                )
+
+        error = task.exception()
+        if error is None:
+            status = "succeeded"
+            await self.db.aexecute(
+                "UPDATE jobs SET status = 'succeeded', error = NULL, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (job["id"],),
+            )
+        elif job["attempts"] < job["max_attempts"]:
+            status = "retried"
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+            await self.db.aexecute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_after = ? WHERE id = ?",
+                (str(error), time.time() + delay, job["id"]),
+            )
+        else:
+            status = "failed"
+            await self.db.aexecute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (str(error), job["id"]),
+            )
+        if error is not None:
+            # The message is kept in the job's error column
+            JOB_FAILURES.inc(kind=job["kind"], error=type(error).__name__)
+        JOB_DURATION.observe(time.perf_counter() - start, kind=job["kind"], status=status)
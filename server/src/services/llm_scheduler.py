@@ -0,0 +1,294 @@
+import re
+import time
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from ..metrics import GROQ_ERRORS
+
+# Rough number of characters per token and the completion size assumed when
+# estimating how much of the token quota a request will use
+CHARS_PER_TOKEN = 4
+COMPLETION_TOKEN_ESTIMATE = 300
+
+# Wait used when a rate limit error does not say how long to back off
+DEFAULT_RETRY_DELAY = 2.0
+
+
+def retry_delay(error: Exception) -> Optional[float]:
+    """
+    Get how long to wait before retrying a rate limited request.
+
+    Args:
+        error (Exception): The error raised by the LLM client.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the error is not a rate limit.
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    message = str(error).lower()
+    if status_code != 429 and "rate limit" not in message:
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+
+    # Groq reports the wait as e.g. "Please try again in 1m2.5s" or "in 320ms"
+    if match := re.search(r"try again in ((?:[\d.]+(?:ms|h|m|s))+)", message):
+        units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(
+            float(amount) * units[unit]
+            for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", match.group(1))
+        )
+    return DEFAULT_RETRY_DELAY
+
+
+def error_kind(error: Exception, delay: Optional[float]) -> str:
+    """Label an LLM error for the metrics: rate_limit, or the exception's class name."""
+    return "rate_limit" if delay is not None else type(error).__name__
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Estimate the quota tokens used by a request for the given prompt."""
+    characters = sum(len(str(message.content)) for message in messages)
+    return characters // CHARS_PER_TOKEN + COMPLETION_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Tracks a quota that refills continuously up to a fixed capacity."""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.per_second
+        )
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the given amount can be taken from the bucket."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0
+        return (amount - self.level) / self.per_second
+
+    def consume(self, amount: float) -> None:
+        """Take the given amount from the bucket."""
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """
+    Client-side admission control for requests to the LLM provider.
+
+    Requests wait in a queue per user and are admitted round robin across
+    users, so a burst from one user cannot starve the others. A request is
+    admitted once there is a free concurrency slot and the estimated request
+    and token quota allows it. Rate limit errors pause admission for the delay
+    the provider asked for.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int = 3,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency (int): Maximum number of requests in flight at once.
+            requests_per_minute (float): Request quota of the provider.
+            tokens_per_minute (float): Token quota of the provider.
+            max_retries (int): How often a rate limited request is retried.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.active = 0
+        self.paused_until = 0.0
+        self.queues: Dict[int, Deque[Tuple[asyncio.Future, int]]] = {}
+        self.order: Deque[int] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, user_id: int, tokens: int) -> None:
+        """
+        Wait until a request for the user is admitted.
+
+        Args:
+            user_id (int): The user the request is made for.
+            tokens (int): The estimated number of quota tokens the request uses.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if user_id not in self.queues:
+            self.queues[user_id] = deque()
+            self.order.append(user_id)
+        self.queues[user_id].append((future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Give the slot back if it was granted just before cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Mark an admitted request as finished."""
+        self.active -= 1
+        self._dispatch()
+
+    def penalize(self, delay: float) -> None:
+        """
+        Stop admitting requests for a while after the provider rate limited us.
+
+        Args:
+            delay (float): Seconds to wait before admitting the next request.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests waiting to be admitted."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _dispatch(self) -> None:
+        while self.order and self.active < self.max_concurrency:
+            user_id = self.order[0]
+            queue = self.queues[user_id]
+
+            # Drop requests that were cancelled while waiting
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if not queue:
+                self.order.popleft()
+                del self.queues[user_id]
+                continue
+
+            future, tokens = queue[0]
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait > 0:
+                self._dispatch_later(wait)
+                return
+
+            queue.popleft()
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.active += 1
+            future.set_result(None)
+
+            # Move the user to the back of the line
+            self.order.popleft()
+            if queue:
+                self.order.append(user_id)
+            else:
+                del self.queues[user_id]
+
+    def _dispatch_later(self, delay: float) -> None:
+        if self._timer is not None:
+            return
+
+        def wake():
+            self._timer = None
+            self._dispatch()
+
+        self._timer = asyncio.get_running_loop().call_later(delay, wake)
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Wraps a chat model so every call for a user goes through an LLMScheduler,
+    and rate limited calls are retried after the delay the provider asked for.
+    """
+
+    llm: BaseChatModel
+    scheduler: Any
+    user_id: int
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.llm._llm_type}"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = estimate_tokens(messages)
+        for attempt in range(self.scheduler.max_retries + 1):
+            await self.scheduler.acquire(self.user_id, tokens)
+            try:
+                return await self.llm._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except Exception as e:
+                delay = retry_delay(e)
+                GROQ_ERRORS.inc(kind=error_kind(e, delay))
+                if delay is None or attempt == self.scheduler.max_retries:
+                    raise
+                self.scheduler.penalize(delay)
+            finally:
+                self.scheduler.release()
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = estimate_tokens(messages)
+        for attempt in range(self.scheduler.max_retries + 1):
+            await self.scheduler.acquire(self.user_id, tokens)
+            started = False
+            try:
+                async for chunk in self.llm._astream(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Tokens already sent to the user can't be taken back
+                delay = retry_delay(e)
+                GROQ_ERRORS.inc(kind=error_kind(e, delay))
+                if delay is None or started or attempt == self.scheduler.max_retries:
+                    raise
+                self.scheduler.penalize(delay)
+            finally:
+                self.scheduler.release()
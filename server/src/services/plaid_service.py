@@ -1,12 +1,156 @@
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import jwt
+import plaid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.src.cache import TTLCache
 from server.src.databridge.plaid_databridge import PlaidDatabridge
 from server.src.databridge.base_databridge import BaseDatabridge
 from server.src.models import PlaidTransactionRequest, UserInDB
+from server.src.services.data_version_service import DataVersionService
+from server.src.settings import settings
+
+# Plaid can still add or change transactions this many days after their date,
+# so incremental syncs fetch from this long before the previous sync
+SYNC_OVERLAP_DAYS = 30
+
+# Webhooks signed longer ago than this are rejected, so they can't be replayed
+WEBHOOK_MAX_AGE = 5 * 60
+
+# Users whose refreshed balances are kept
+BALANCE_CACHE_SIZE = 1024
+
+# Webhook verification keys kept, and for how long, so rotated keys are
+# fetched again. Key ids Plaid doesn't know are remembered for a shorter while.
+WEBHOOK_KEY_CACHE_SIZE = 64
+WEBHOOK_KEY_TTL = 24 * 60 * 60
+UNKNOWN_WEBHOOK_KEY_TTL = 10 * 60
+
+# Most webhook keys fetched from Plaid per minute, so webhooks with made up
+# key ids can't make the server call Plaid at will
+WEBHOOK_KEY_FETCHES_PER_MINUTE = 10
+
+# Insert a transaction unless the account already has it by its Plaid
+# transaction id, so a sync or a retried import only adds what is new
+INSERT_MISSING = """
+    INSERT INTO {table} (title, amount, date, category, account_id, plaid_transaction_id)
+    VALUES (:title, :amount, :date, :category, :account_id, :transaction_id)
+    ON CONFLICT (account_id, plaid_transaction_id) DO NOTHING
+"""
+
+# Rows imported before the transaction id was kept are matched by their
+# content instead, one row per transaction, and given its id
+CLAIM_IMPORTED = """
+    UPDATE {table} SET plaid_transaction_id = :transaction_id
+    WHERE id = (
+        SELECT id FROM {table}
+        WHERE account_id = :account_id AND plaid_transaction_id IS NULL
+        AND title = :title AND amount = :amount AND date = :date AND category = :category
+        LIMIT 1
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {table}
+        WHERE account_id = :account_id AND plaid_transaction_id = :transaction_id
+    )
+"""
+
+
+def transaction_rows(
+    transactions: List[Dict[str, Any]], account_id: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split Plaid transactions into income and expense rows of an account.
+
+    Args:
+        transactions (List[Dict[str, Any]]): Transactions returned by Plaid.
+        account_id (int): The account the rows belong to.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: The income rows,
+            for negative amounts, and the expense rows.
+    """
+    income, expenses = [], []
+    for transaction in transactions:
+        if transaction.get("category") and len(transaction.get("category")) > 0:
+            category = transaction.get("category")[0]
+        else:
+            category = "Other"
+
+        row = {
+            "title": transaction["name"],
+            "amount": abs(float(transaction["amount"])),
+            "date": transaction["date"],
+            "category": category,
+            "account_id": account_id,
+            "transaction_id": transaction["transaction_id"],
+        }
+        if transaction["amount"] < 0:
+            income.append(row)
+        else:
+            expenses.append(row)
+    return income, expenses
+
+
+def item_balance(accounts: List[Dict[str, Any]], account_type: str) -> float:
+    """
+    Get the balance of the account that stands for a Plaid item: the total
+    current balance of the item's accounts of the account's type.
+
+    Args:
+        accounts (List[Dict[str, Any]]): The item's accounts returned by Plaid.
+        account_type (str): The type of the account, such as depository or credit.
+
+    Returns:
+        float: The balance.
+    """
+    total = 0.0
+    for account in accounts:
+        if str(account["type"]) != account_type:
+            continue
+        balances = account["balances"]
+        current = balances.get("current")
+        total += current if current is not None else balances.get("available") or 0
+    return total
+
+
+def plaid_error_code(error: Exception) -> str:
+    """
+    Get the error code of a failed Plaid call, such as ITEM_LOGIN_REQUIRED, without
+    the rest of the message, which can echo request details.
+
+    Args:
+        error (Exception): The exception raised by the Plaid SDK.
+
+    Returns:
+        str: The Plaid error code, or a generic code for other failures.
+    """
+    if isinstance(error, plaid.ApiException):
+        try:
+            code = json.loads(error.body or "{}").get("error_code")
+        except (ValueError, AttributeError):
+            code = None
+        if isinstance(code, str) and code:
+            return code
+    return "BALANCE_REFRESH_FAILED"
 
 
 class PlaidService:
     def __init__(self):
         self.plaid = PlaidDatabridge()
         self.db = BaseDatabridge.get_instance()
+        self.webhook_keys = TTLCache(WEBHOOK_KEY_CACHE_SIZE, WEBHOOK_KEY_TTL)
+        self.unknown_webhook_keys = TTLCache(WEBHOOK_KEY_CACHE_SIZE, UNKNOWN_WEBHOOK_KEY_TTL)
+        self._key_fetches: deque = deque()
+        self._key_fetches_lock = threading.Lock()
+        self.balances = TTLCache(BALANCE_CACHE_SIZE, settings.plaid_balance_cache_ttl)
+        self._refreshing: Dict[int, asyncio.Task] = {}
 
     def get_transactions(
         self, transaction_request: PlaidTransactionRequest, current_user: UserInDB
@@ -31,3 +175,261 @@ class PlaidService:
             (current_user.id, account_id),
         ).to_dict(orient="records")[0]
         return self.plaid.get_balance(tokens["key"])[0].to_dict()
+
+    def import_item(self, user_id: int, token_id: int, progress) -> None:
+        """
+        Create the account of a newly linked item and import its transactions.
+        Runs as a background job, and can be retried after a failure.
+
+        Args:
+            user_id (int): The user that linked the item.
+            token_id (int): The stored access token of the item.
+            progress (JobProgress): Receives the transactions fetched and inserted.
+        """
+        token = self.db.fetch_all(
+            "SELECT name, key FROM tokens WHERE id = ? AND user_id = ?",
+            (token_id, user_id),
+        )[0]
+
+        # A retry finds the account created by the failed attempt
+        accounts = self.db.fetch_all(
+            "SELECT id FROM accounts WHERE name = ? AND user_id = ? AND deleted_at IS NULL",
+            (token["name"], user_id),
+        )
+        if not accounts:
+            balances = [account.to_dict() for account in self.plaid.get_balance(token["key"])]
+            account_type = str(balances[0]["type"])
+            self.db.execute(
+                "INSERT INTO accounts (name, type, balance, user_id) VALUES (?, ?, ?, ?)",
+                (
+                    token["name"],
+                    account_type,
+                    item_balance(balances, account_type),
+                    user_id,
+                ),
+            )
+            accounts = self.db.fetch_all(
+                "SELECT id FROM accounts WHERE name = ? AND user_id = ? AND deleted_at IS NULL",
+                (token["name"], user_id),
+            )
+
+        self._store_transactions(token["key"], accounts[0]["id"], progress)
+
+    def sync_items(
+        self, user_id: int, progress, token_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        Add the transactions that are new since the last import or sync to the
+        accounts of the items of a user. Runs as a background job. Items synced
+        before only fetch the transactions of the days since, with some overlap.
+
+        Args:
+            user_id (int): The user to sync.
+            progress (JobProgress): Receives the transactions fetched and inserted.
+            token_id (Optional[int]): Only sync the item of this token.
+
+        Returns:
+            List[int]: The tokens of the items that were synced.
+        """
+        # Accounts are created with the name of their item's token
+        items = self.db.fetch_all(
+            """
+            SELECT t.id AS token_id, t.key, t.item_id, a.id AS account_id, s.last_synced_at
+            FROM tokens t
+            JOIN accounts a ON a.name = t.name AND a.user_id = t.user_id AND a.deleted_at IS NULL
+            LEFT JOIN token_sync_state s ON s.token_id = t.id
+            WHERE t.user_id = ? AND (? IS NULL OR t.id = ?)
+            """,
+            (user_id, token_id, token_id),
+        )
+        for item in items:
+            if item["item_id"] is None:
+                self.db.execute(
+                    "UPDATE tokens SET item_id = ? WHERE id = ?",
+                    (self.plaid.get_item_id(item["key"]), item["token_id"]),
+                )
+
+            start_date = "2000-01-01"
+            if item["last_synced_at"] is not None:
+                start = datetime.fromtimestamp(item["last_synced_at"]) - timedelta(
+                    days=SYNC_OVERLAP_DAYS
+                )
+                start_date = start.strftime("%Y-%m-%d")
+            self._store_transactions(
+                item["key"], item["account_id"], progress, start_date
+            )
+        return [item["token_id"] for item in items]
+
+    async def refresh_balances(self, user_id: int) -> Dict[str, Any]:
+        """
+        Fetch the balances of all of a user's items from Plaid at once, and
+        update the balances of their accounts. Results are cached for a short
+        while, and concurrent calls for a user share one refresh, so loading
+        the dashboard again doesn't fetch from Plaid again.
+
+        Args:
+            user_id (int): The user whose balances to refresh.
+
+        Returns:
+            Dict[str, Any]: The number of items refreshed, the number of accounts
+                whose balance changed, and the items that failed to refresh.
+        """
+        cached = self.balances.get(user_id)
+        if cached is not None:
+            return cached
+
+        task = self._refreshing.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_balances(user_id))
+            self._refreshing[user_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(user_id, None))
+        # A caller that disconnects must not cancel the refresh of the others
+        return await asyncio.shield(task)
+
+    async def _refresh_balances(self, user_id: int) -> Dict[str, Any]:
+        items = await asyncio.to_thread(
+            self.db.fetch_all,
+            """
+            SELECT t.key, a.id AS account_id, a.type, a.balance
+            FROM tokens t
+            JOIN accounts a ON a.name = t.name AND a.user_id = t.user_id AND a.deleted_at IS NULL
+            WHERE t.user_id = ?
+            """,
+            (user_id,),
+        )
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.plaid.get_balance, item["key"]) for item in items),
+            return_exceptions=True,
+        )
+
+        updates, errors = [], []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                errors.append({"account_id": item["account_id"], "error": plaid_error_code(result)})
+                continue
+            balance = item_balance([account.to_dict() for account in result], item["type"])
+            if balance != item["balance"]:
+                updates.append((balance, item["account_id"], user_id))
+
+        # Only accounts whose balance changed are written, so unchanged data
+        # keeps its ETag
+        updated = 0
+        if updates:
+            updated = await asyncio.to_thread(
+                self.db.execute_many,
+                "UPDATE accounts SET balance = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ? AND user_id = ?",
+                updates,
+            )
+            await asyncio.to_thread(DataVersionService().bump, user_id)
+
+        refresh = {
+            "refreshed": len(items) - len(errors),
+            "updated": updated,
+            "errors": errors,
+        }
+        # A failed item is asked again on the next refresh rather than cached
+        if not errors:
+            self.balances.set(user_id, {**refresh, "updated": 0})
+        return refresh
+
+    def find_items(self, item_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the tokens of a Plaid item, which webhooks refer to by item id.
+
+        Args:
+            item_id (str): The id of the item.
+
+        Returns:
+            List[Dict[str, Any]]: The id and user id of every token of the item.
+        """
+        return self.db.fetch_all(
+            "SELECT id, user_id FROM tokens WHERE item_id = ?", (item_id,)
+        )
+
+    def verify_webhook(self, body: bytes, verification: Optional[str]) -> bool:
+        """
+        Check that a webhook was sent by Plaid. Plaid signs the SHA-256 of the
+        body in a JWT in the Plaid-Verification header.
+
+        Args:
+            body (bytes): The raw body of the webhook.
+            verification (Optional[str]): The Plaid-Verification header.
+
+        Returns:
+            bool: Whether the signature is valid and recent.
+        """
+        if not verification:
+            return False
+        try:
+            header = jwt.get_unverified_header(verification)
+            if header.get("alg") != "ES256" or "kid" not in header:
+                return False
+
+            # Plaid rotates keys rarely, so they are fetched once per key id
+            key = self._webhook_key(header["kid"])
+            if key is None or key.get("expired_at"):
+                return False
+
+            claims = jwt.decode(
+                verification, jwt.PyJWK(key, "ES256").key, algorithms=["ES256"]
+            )
+        except jwt.PyJWTError:
+            return False
+
+        if time.time() - claims.get("iat", 0) > WEBHOOK_MAX_AGE:
+            return False
+        return hmac.compare_digest(
+            hashlib.sha256(body).hexdigest(), claims.get("request_body_sha256", "")
+        )
+
+    def _webhook_key(self, key_id: str) -> Optional[Dict[str, Any]]:
+        """Get a webhook verification key, or None if Plaid doesn't know it."""
+        key = self.webhook_keys.get(key_id)
+        if key is not None:
+            return key
+        # Keys are fetched one at a time, so webhooks arriving together with a
+        # new key id fetch it once
+        with self._key_fetches_lock:
+            key = self.webhook_keys.get(key_id)
+            if key is not None:
+                return key
+            if self.unknown_webhook_keys.get(key_id):
+                return None
+
+            now = time.monotonic()
+            while self._key_fetches and now - self._key_fetches[0] > 60:
+                self._key_fetches.popleft()
+            if len(self._key_fetches) >= WEBHOOK_KEY_FETCHES_PER_MINUTE:
+                return None
+            self._key_fetches.append(now)
+
+            try:
+                key = self.plaid.get_webhook_verification_key(key_id)
+            except plaid.OpenApiException:
+                self.unknown_webhook_keys.set(key_id, True)
+                return None
+            self.webhook_keys.set(key_id, key)
+            return key
+
+    def _store_transactions(
+        self, key: str, account_id: int, progress, start_date: str = "2000-01-01"
+    ) -> None:
+        transactions = [
+            transaction.to_dict()
+            for transaction in self.plaid.get_transactions(
+                key,
+                PlaidTransactionRequest(
+                    start_date=start_date,
+                    end_date=datetime.now().strftime("%Y-%m-%d"),
+                ),
+            )
+        ]
+        progress.add(fetched=len(transactions))
+
+        income, expenses = transaction_rows(transactions, account_id)
+        inserted = 0
+        for table, rows in (("income", income), ("expenses", expenses)):
+            if rows:
+                self.db.execute_many(CLAIM_IMPORTED.format(table=table), rows)
+                inserted += self.db.execute_many(INSERT_MISSING.format(table=table), rows)
+        progress.add(inserted=inserted)
@@ -0,0 +1,82 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from server.src.models import UserInDB
+from server.src.databridge.base_databridge import BaseDatabridge
+
+# Search terms are runs of letters and digits, as the index tokenizer splits them
+TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(query: str, user_id: int) -> Optional[str]:
+    """
+    Build the FTS5 query for a search: titles containing every term of the
+    query, each as a word prefix, among the rows of a user.
+
+    Args:
+        query (str): What the user typed.
+        user_id (int): The user whose rows are searched.
+
+    Returns:
+        Optional[str]: The MATCH expression, or None if the query has no terms.
+    """
+    terms = TERM.findall(query)
+    if not terms:
+        return None
+    # Quoting keeps words such as AND, OR and NOT from being read as operators
+    prefixes = " ".join(f'"{term}"*' for term in terms)
+    return f'owner : "u{user_id}" AND title : ({prefixes})'
+
+
+class SearchService:
+    """Searches the titles of a user's expenses and income."""
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+
+    def search(
+        self, user: UserInDB, query: str, limit: int, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the transactions of a user whose title matches a query.
+
+        Matches are ranked by relevance, so titles made up of the searched
+        words come first, then by date, newest first. The work grows with the
+        number of matches rather than the size of the user's history.
+
+        Args:
+            user (UserInDB): The user to search.
+            query (str): Words to search for, the last one can be incomplete.
+            limit (int): Maximum number of matches to return.
+            offset (int): Number of matches to skip, for the following pages.
+
+        Returns:
+            List[Dict[str, Any]]: The matching expenses and income, with their type.
+        """
+        match = match_expression(query, user.id)
+        if match is None:
+            return []
+        # The owner column only scopes the search, so it doesn't count for ranking.
+        # Rows of deleted accounts stay indexed until they are purged.
+        return self.db.fetch_all(
+            """
+            WITH hits AS MATERIALIZED (
+                SELECT rowid, bm25(transactions_fts, 1.0, 0.0) AS score
+                FROM transactions_fts WHERE transactions_fts MATCH ?
+            )
+            SELECT id, title, amount, date, category, type FROM (
+                SELECT e.id, e.title, e.amount, e.date, e.category, 'expense' AS type, hits.score
+                FROM hits JOIN expenses e ON e.id = hits.rowid / 2
+                JOIN accounts a ON a.id = e.account_id AND a.deleted_at IS NULL
+                WHERE hits.rowid % 2 = 0
+                UNION ALL
+                SELECT i.id, i.title, i.amount, i.date, i.category, 'income' AS type, hits.score
+                FROM hits JOIN income i ON i.id = hits.rowid / 2
+                JOIN accounts a ON a.id = i.account_id AND a.deleted_at IS NULL
+                WHERE hits.rowid % 2 = 1
+            )
+            ORDER BY score, date DESC, type, id
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit, offset),
+        )
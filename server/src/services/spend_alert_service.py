@@ -0,0 +1,190 @@
+import json
+import asyncio
+import sqlite3
+import threading
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.services.data_version_service import DataVersionService
+from server.src.services.spend_service import SpendService, budget_allotment, week_of
+
+# Seconds an alert stream waits for new alerts before checking the database
+# anyway, for alerts raised by other server processes
+STREAM_POLL_INTERVAL = 15.0
+
+
+class SpendAlertService:
+    """
+    Raises an alert when a user's spend this week crosses their spend warning.
+
+    The spend of every week is kept in weekly_spend by triggers on expenses,
+    and the budget allotment is kept in spend_budgets until something it
+    depends on changes, so checking after a write reads a single row. The
+    warning is crossed once the spend leaves less than spend_warning percent
+    of the allotment, as the overview page shows it, and raises one alert
+    per week.
+    """
+
+    # Open alert streams per user, woken up when an alert is raised
+    _listeners: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+    _listeners_lock = threading.Lock()
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+
+    def _allotment(self, user_id: int, today: date) -> float:
+        # Worked out and stored in one transaction, so no write to the data it
+        # depends on can slip in between
+        with self.db.transaction() as transaction:
+            users = transaction.fetch_all(
+                "SELECT savings_percent FROM users WHERE id = ?", (user_id,)
+            )
+            paycheck = transaction.fetch_all(SpendService.PAYCHECK_QUERY, (user_id,))
+            allotment = budget_allotment(
+                paycheck[0]["amount"] if paycheck else None,
+                transaction.fetch_all(SpendService.FIXED_EXPENSES_QUERY, (user_id,)),
+                transaction.fetch_all("SELECT * FROM goals WHERE user_id = ?", (user_id,)),
+                users[0]["savings_percent"],
+                today,
+            )
+            transaction.execute(
+                "INSERT OR REPLACE INTO spend_budgets (user_id, allotment, day) VALUES (?, ?, ?)",
+                (user_id, allotment, today.isoformat()),
+            )
+        return allotment
+
+    def check(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Raise an alert if the user's spend this week has crossed their spend
+        warning and no alert was raised this week yet. Call after writes that
+        change the spend, the allotment or the warning.
+
+        Args:
+            user_id (int): The user whose data changed.
+
+        Returns:
+            Optional[Dict[str, Any]]: The alert raised, if any.
+        """
+        today = date.today()
+        week_start = week_of(today)[0].isoformat()
+        rows = self.db.fetch_all(
+            """
+            SELECT u.spend_warning, COALESCE(w.total, 0) AS spend, b.allotment, b.day
+            FROM users u
+            LEFT JOIN weekly_spend w ON w.user_id = u.id AND w.week_start = ?
+            LEFT JOIN spend_budgets b ON b.user_id = u.id
+            WHERE u.id = ?
+            """,
+            (week_start, user_id),
+        )
+        if not rows:
+            return None
+        state = rows[0]
+
+        # Goal contributions depend on the day, so the allotment is worked out
+        # again every day
+        allotment = state["allotment"]
+        if allotment is None or state["day"] != today.isoformat():
+            try:
+                allotment = self._allotment(user_id, today)
+            except sqlite3.Error as e:
+                print(f"Error working out the budget allotment: {e}")
+                return None
+        if allotment <= 0:
+            return None
+
+        threshold = allotment * (1 - (state["spend_warning"] or 0) / 100)
+        if state["spend"] < threshold:
+            return None
+
+        alerts = self.db.fetch_all(
+            """
+            INSERT INTO spend_alerts (user_id, week_start, spend, allotment, threshold)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, week_start) DO NOTHING
+            RETURNING *
+            """,
+            (user_id, week_start, state["spend"], allotment, threshold),
+        )
+        if not alerts:
+            return None
+
+        DataVersionService().bump(user_id)
+        # Checks also run on worker threads, away from the streams' event loop
+        with self._listeners_lock:
+            listeners = list(self._listeners.get(user_id, ()))
+        for loop, event in listeners:
+            loop.call_soon_threadsafe(event.set)
+        return alerts[0]
+
+    def get_alerts(self, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Get the latest alerts of a user, newest first."""
+        return self.db.fetch_all(
+            "SELECT * FROM spend_alerts WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, limit),
+        )
+
+    def mark_read(self, user_id: int, alert_id: int) -> bool:
+        """
+        Mark an alert of a user as read.
+
+        Returns:
+            bool: Whether the alert exists.
+        """
+        return bool(
+            self.db.fetch_all(
+                """
+                UPDATE spend_alerts SET read_at = COALESCE(read_at, CURRENT_TIMESTAMP)
+                WHERE id = ? AND user_id = ?
+                RETURNING id
+                """,
+                (alert_id, user_id),
+            )
+        )
+
+    async def stream(self, user_id: int, after_id: Optional[int]) -> AsyncIterator[str]:
+        """
+        Stream the alerts of a user as server-sent events, as they are raised.
+
+        Args:
+            user_id (int): The user.
+            after_id (Optional[int]): The id of the last alert the client has,
+                from Last-Event-ID. Only new alerts are sent if not given.
+
+        Yields:
+            str: One event per alert, and comments to keep the connection open.
+        """
+        if after_id is None:
+            latest = await asyncio.to_thread(
+                self.db.fetch_all,
+                "SELECT COALESCE(MAX(id), 0) AS id FROM spend_alerts WHERE user_id = ?",
+                (user_id,),
+            )
+            after_id = latest[0]["id"] if latest else 0
+
+        listener = (asyncio.get_running_loop(), asyncio.Event())
+        with self._listeners_lock:
+            self._listeners.setdefault(user_id, set()).add(listener)
+        try:
+            while True:
+                # Cleared before reading, so an alert raised meanwhile wakes
+                # the next wait
+                listener[1].clear()
+                alerts = await asyncio.to_thread(
+                    self.db.fetch_all,
+                    "SELECT * FROM spend_alerts WHERE user_id = ? AND id > ? ORDER BY id",
+                    (user_id, after_id),
+                )
+                for alert in alerts:
+                    after_id = alert["id"]
+                    yield f"id: {alert['id']}\nevent: spend_alert\ndata: {json.dumps(alert)}\n\n"
+                try:
+                    await asyncio.wait_for(listener[1].wait(), STREAM_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._listeners_lock:
+                self._listeners[user_id].discard(listener)
+                if not self._listeners[user_id]:
+                    del self._listeners[user_id]
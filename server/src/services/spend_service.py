@@ -1,101 +1,134 @@
-from datetime import date
-import calendar
+from datetime import date, timedelta
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from server.src.models import UserInDB
 from server.src.databridge.base_databridge import BaseDatabridge
 
+RECURRENCE_TO_DAYS = {
+    "daily": 1,
+    "weekly": 7,
+    "bi-weekly": 14,
+    "monthly": 30,
+    "quarterly": 91,
+    "annually": 365,
+}
+
+
+def week_of(day: date) -> Tuple[date, date]:
+    """Get the Sunday and Saturday of the week of a day."""
+    start = day - timedelta(days=(day.weekday() + 1) % 7)
+    return start, start + timedelta(days=6)
+
+
+def budget_allotment(
+    paycheck: Optional[float],
+    fixed_expenses: List[Dict[str, Any]],
+    goals: List[Dict[str, Any]],
+    savings_percent: float,
+    today: date,
+) -> float:
+    """
+    Work out what a user can spend per week, from their latest paycheck less
+    fixed expenses, savings and the contributions their goals need.
+
+    Args:
+        paycheck (Optional[float]): The latest Work income, None if there is none.
+        fixed_expenses (List[Dict[str, Any]]): The recurring expenses, with their
+            title, amount, category and recurrence.
+        goals (List[Dict[str, Any]]): The goals, with their amount, date,
+            progress and completed flag.
+        savings_percent (float): Percentage of the paycheck to save.
+        today (date): The day to count the days until goal deadlines from.
+
+    Returns:
+        float: The weekly allotment, 0 without a paycheck.
+    """
+    if paycheck is None:
+        return 0
+
+    # Expenses repeated with the same title, amount and category count once
+    fixed = {}
+    for expense in fixed_expenses:
+        fixed.setdefault(
+            (expense["title"], expense["amount"], expense["category"]),
+            (expense["amount"], expense["recurrence"]),
+        )
+    total_fixed = sum(
+        (amount * 14) / RECURRENCE_TO_DAYS[recurrence]
+        for amount, recurrence in set(fixed.values())
+        if recurrence in RECURRENCE_TO_DAYS
+    )
+
+    # Calculate required goal contributions
+    total_goal_contributions = 0
+    for goal in goals:
+        if goal["completed"]:
+            continue
+        remaining_amount = goal["amount"] - (goal["amount"] * goal["progress"])
+        goal_date = datetime.strptime(goal["date"], "%Y-%m-%d").date()
+        days_until_deadline = (goal_date - today).days
+        if days_until_deadline > 0:
+            # Convert to bi-weekly contribution since we're working with bi-weekly paycheck
+            daily_contribution = remaining_amount / days_until_deadline
+            total_goal_contributions += daily_contribution * 14
+
+    savings_amount = paycheck * (float(savings_percent) / 100)
+
+    remaining_income = (
+        paycheck
+        - total_fixed
+        - savings_amount
+        - max(0, total_goal_contributions)
+    )
+    return remaining_income / 2
+
 
 class SpendService:
+    # Queries shared with the dashboard summary
+    PAYCHECK_QUERY = """
+        SELECT i.amount
+        FROM income i
+        JOIN accounts a ON i.account_id = a.id
+        WHERE i.category = 'Work'
+        AND a.user_id = ? AND a.deleted_at IS NULL
+        ORDER BY i.date DESC
+        LIMIT 1
+    """
+    FIXED_EXPENSES_QUERY = """
+        SELECT e.title, e.amount, e.category, e.recurrence
+        FROM expenses e
+        JOIN accounts a ON e.account_id = a.id
+        WHERE e.recurrence IS NOT NULL
+        AND a.user_id = ? AND a.deleted_at IS NULL
+    """
+    SPEND_QUERY = """
+        SELECT SUM(e.amount) as total_spend
+        FROM expenses e
+        JOIN accounts a ON e.account_id = a.id
+        WHERE e.date BETWEEN ? AND ?
+        AND e.recurrence IS NULL
+        AND a.user_id = ? AND a.deleted_at IS NULL
+    """
+
     def __init__(self):
         self.db = BaseDatabridge.get_instance()
 
     def get_budget_allotment(self, user: UserInDB):
-        query = """
-            SELECT i.amount
-            FROM income i
-            JOIN accounts a ON i.account_id = a.id
-            WHERE i.category = 'Work'
-            AND a.user_id = ?
-            ORDER BY i.date DESC
-            LIMIT 1
-        """
-        paycheck = self.db.query(query, (user.id,))
-
-        if paycheck.empty:
+        paycheck = self.db.fetch_all(self.PAYCHECK_QUERY, (user.id,))
+        if not paycheck:
             return 0
 
-        fixed_expenses = self.db.query(
-            """
-            SELECT DISTINCT e.amount, e.recurrence
-            FROM expenses e
-            JOIN accounts a ON e.account_id = a.id
-            WHERE e.recurrence IS NOT NULL 
-            AND a.user_id = ?
-            GROUP BY e.title, e.amount, e.category
-        """,
-            (user.id,),
-        )
-
-        # Get active goals
-        goals = self.db.query(
-            """
-            SELECT amount, date, progress
-            FROM goals
-            WHERE user_id = ?
-            AND completed = 0
-            """,
-            (user.id,),
-        )
-
-        recurrence_to_days = {
-            "daily": 1,
-            "weekly": 7,
-            "bi-weekly": 14,
-            "monthly": 30,
-            "quarterly": 91,
-            "annually": 365,
-        }
-
-        prorated_expenses = fixed_expenses["amount"].apply(
-            lambda amount: (amount * 14) / recurrence_to_days[fixed_expenses.loc[amount.index, "recurrence"]],
-        )
-        total_fixed = prorated_expenses.sum()
-
-        # Calculate required goal contributions
-        total_goal_contributions = 0
-        if not goals.empty:
-            today = datetime.now().date()
-            for _, goal in goals.iterrows():
-                remaining_amount = goal["amount"] - (goal["amount"] * goal["progress"])
-                goal_date = datetime.strptime(goal["date"], "%Y-%m-%d").date()
-                days_until_deadline = (goal_date - today).days
-                if days_until_deadline > 0:
-                    # Convert to bi-weekly contribution since we're working with bi-weekly paycheck
-                    daily_contribution = remaining_amount / days_until_deadline
-                    total_goal_contributions += daily_contribution * 14
-
-        paycheck_amount = paycheck["amount"].iloc[0]
-        savings_amount = paycheck_amount * (float(user.savings_percent) / 100)
-
-        remaining_income = (
-            paycheck_amount
-            - total_fixed
-            - savings_amount
-            - max(0, total_goal_contributions)
+        return budget_allotment(
+            paycheck[0]["amount"],
+            self.db.fetch_all(self.FIXED_EXPENSES_QUERY, (user.id,)),
+            self.db.fetch_all("SELECT * FROM goals WHERE user_id = ? AND completed = 0", (user.id,)),
+            user.savings_percent,
+            datetime.now().date(),
         )
-        return remaining_income / 2
 
     def get_spend_over_time(self, user: UserInDB, start_date: date, end_date: date):
-        query = """
-            SELECT SUM(e.amount) as total_spend
-            FROM expenses e
-            JOIN accounts a ON e.account_id = a.id
-            WHERE e.date BETWEEN ? AND ?
-            AND e.recurrence IS NULL
-            AND a.user_id = ?
-        """
-        result = self.db.query(query, (start_date, end_date, user.id))
+        result = self.db.query(self.SPEND_QUERY, (start_date, end_date, user.id))
         return (
             result["total_spend"].iloc[0]
             if not result.empty and result["total_spend"].iloc[0]
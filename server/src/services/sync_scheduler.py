@@ -0,0 +1,208 @@
+import time
+import random
+import asyncio
+from typing import Optional
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.services.job_queue import JobQueue
+from server.src.settings import settings
+
+# Kind of the jobs syncing a single linked item
+SYNC_JOB = "plaid_sync_token"
+
+# Longest wait before retrying an item whose syncs keep failing
+MAX_BACKOFF = 24 * 60 * 60.0
+
+
+def retry_delay(failures: int, base: float) -> float:
+    """
+    Get how long to wait before syncing an item again after failed syncs.
+
+    Args:
+        failures (int): Failed syncs in a row, at least 1.
+        base (float): Seconds to wait after the first failure.
+
+    Returns:
+        float: Seconds to wait, doubling with every failure up to a day.
+    """
+    return min(base * 2 ** (failures - 1), MAX_BACKOFF)
+
+
+class SyncScheduler:
+    """
+    Syncs every linked item on an interval, so transactions are already fresh
+    when users open the app.
+
+    The due time of every item is kept in token_sync_state. New items get a
+    random due time within the first interval, and every sync moves it by the
+    interval with some jitter, so syncs are spread evenly over time instead of
+    all running at once. Due items are queued as jobs, no more than a few at a
+    time so the job workers stay free for user requests, and items whose syncs
+    fail are retried with exponential backoff.
+    """
+
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        """
+        Get singleton instance of SyncScheduler.
+
+        Returns:
+            SyncScheduler: Singleton instance of SyncScheduler
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the SyncScheduler class. Syncs are scheduled once start is called."""
+        if SyncScheduler._instance is not None:
+            raise Exception("This class is a singleton. Use get_instance() instead.")
+
+        self.db = BaseDatabridge.get_instance()
+        self.jobs = JobQueue.get_instance()
+        self.interval = settings.plaid_sync_interval
+        self.jitter = settings.plaid_sync_jitter
+        self.concurrency = settings.plaid_sync_concurrency
+        self.retry_delay = settings.plaid_sync_retry_delay
+        # Check for due items often enough that syncs start close to their time
+        self.check_interval = min(60.0, self.interval / 10) if self.interval else 60.0
+        self._task: Optional[asyncio.Task] = None
+
+    def next_sync_at(self, now: float) -> float:
+        """Get when an item synced now is due again, with jitter."""
+        if not self.interval:
+            return now
+        return now + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self) -> None:
+        """Start scheduling syncs. Must be called on the event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop scheduling syncs. Queued syncs stay in the job queue."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.schedule_due)
+            except Exception as e:
+                print(f"Error scheduling syncs: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def schedule_due(self) -> int:
+        """
+        Queue sync jobs for the items that are due, as far as the concurrency
+        limit allows.
+
+        Returns:
+            int: The number of jobs queued.
+        """
+        now = time.time()
+        # Spread newly linked items over the first interval
+        self.db.execute(
+            """
+            INSERT INTO token_sync_state (token_id, next_sync_at)
+            SELECT id, ? + (abs(random()) % 1000000) / 1000000.0 * ?
+            FROM tokens WHERE id NOT IN (SELECT token_id FROM token_sync_state)
+            """,
+            (now, self.interval),
+        )
+
+        capacity = self.concurrency - self.jobs.pending(SYNC_JOB)
+        if capacity <= 0:
+            return 0
+        due = self.db.fetch_all(
+            """
+            SELECT s.token_id, t.user_id
+            FROM token_sync_state s JOIN tokens t ON t.id = s.token_id
+            WHERE s.next_sync_at <= ?
+            ORDER BY s.next_sync_at LIMIT ?
+            """,
+            (now, capacity),
+        )
+        for item in due:
+            self.queue_sync(item["user_id"], item["token_id"])
+            self.db.execute(
+                "UPDATE token_sync_state SET next_sync_at = ? WHERE token_id = ?",
+                (self.next_sync_at(now), item["token_id"]),
+            )
+        return len(due)
+
+    def queue_sync(self, user_id: int, token_id: int) -> int:
+        """
+        Queue a sync of an item, unless one is already waiting to run.
+
+        Args:
+            user_id (int): The user the item belongs to.
+            token_id (int): The token of the item.
+
+        Returns:
+            int: The id of the sync job.
+        """
+        # Failures are retried by the scheduler's backoff, not the job queue
+        return self.jobs.enqueue(
+            user_id,
+            SYNC_JOB,
+            {"token_id": token_id},
+            dedupe_key=f"{SYNC_JOB}:{token_id}",
+            max_attempts=1,
+        )
+
+    def record_success(self, token_id: int) -> None:
+        """
+        Mark an item as synced, and schedule its next sync an interval from now.
+
+        Args:
+            token_id (int): The token of the item.
+        """
+        now = time.time()
+        self.db.execute(
+            """
+            INSERT INTO token_sync_state (token_id, next_sync_at, last_synced_at, failures, last_error)
+            VALUES (?, ?, ?, 0, NULL)
+            ON CONFLICT (token_id) DO UPDATE SET
+                next_sync_at = excluded.next_sync_at,
+                last_synced_at = excluded.last_synced_at,
+                failures = 0,
+                last_error = NULL
+            """,
+            (token_id, self.next_sync_at(now), now),
+        )
+
+    def record_failure(self, token_id: int, error: Exception) -> None:
+        """
+        Mark a sync of an item as failed, and back off before syncing it again.
+
+        Args:
+            token_id (int): The token of the item.
+            error (Exception): Why the sync failed.
+        """
+        rows = self.db.fetch_all(
+            "SELECT failures FROM token_sync_state WHERE token_id = ?", (token_id,)
+        )
+        failures = (rows[0]["failures"] if rows else 0) + 1
+        self.db.execute(
+            """
+            INSERT INTO token_sync_state (token_id, next_sync_at, failures, last_error)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (token_id) DO UPDATE SET
+                next_sync_at = excluded.next_sync_at,
+                failures = excluded.failures,
+                last_error = excluded.last_error
+            """,
+            (
+                token_id,
+                time.time() + retry_delay(failures, self.retry_delay),
+                failures,
+                str(error),
+            ),
+        )
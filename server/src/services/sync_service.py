@@ -0,0 +1,56 @@
+from typing import Any, Dict, List
+
+from server.src.models import UserInDB
+from server.src.databridge.base_databridge import BaseDatabridge
+
+
+class SyncService:
+    """Reads the changes log so clients can keep a local copy of their data."""
+
+    ENTITIES = ("accounts", "expenses", "income")
+
+    def __init__(self):
+        self.db = BaseDatabridge.get_instance()
+
+    def get_changes(self, user: UserInDB, since: int, limit: int) -> Dict[str, Any]:
+        """
+        Get the rows of a user that were inserted, updated or deleted after a version.
+
+        Args:
+            user (UserInDB): The user to sync.
+            since (int): The version returned by the previous sync, or 0 for everything.
+            limit (int): Maximum number of changed rows to return.
+
+        Returns:
+            Dict[str, Any]: The current rows and the ids of deleted rows per entity,
+                the version to pass as since on the next call, and whether more
+                changes are waiting.
+        """
+        changes = self.db.fetch_all(
+            "SELECT seq, entity, row_id, op FROM changes WHERE user_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (user.id, since, limit + 1),
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        version = changes[-1]["seq"] if changes else since
+
+        result: Dict[str, Any] = {"version": version, "has_more": has_more}
+        for entity in self.ENTITIES:
+            deleted: List[int] = [
+                change["row_id"]
+                for change in changes
+                if change["entity"] == entity and change["op"] == "delete"
+            ]
+            upserted = []
+            if any(c["entity"] == entity and c["op"] == "upsert" for c in changes):
+                upserted = self.db.fetch_all(
+                    f"""
+                    SELECT t.* FROM changes c JOIN {entity} t ON t.id = c.row_id
+                    WHERE c.user_id = ? AND c.seq > ? AND c.seq <= ?
+                    AND c.entity = ? AND c.op = 'upsert'
+                    ORDER BY c.seq
+                    """,
+                    (user.id, since, version, entity),
+                )
+            result[entity] = {"upserted": upserted, "deleted": deleted}
+        return result
@@ -0,0 +1,201 @@
+import json
+import base64
+import binascii
+from datetime import date
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
+
+from fastapi import HTTPException, Query
+
+from server.src.databridge.base_databridge import BaseDatabridge
+from server.src.responses import ORJSONResponse
+
+# Rows returned when a client asks for a page without saying how many
+DEFAULT_PAGE_SIZE = 100
+
+
+def encode_cursor(key: List[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor (str): The cursor passed by the client.
+        length (int): Number of values the sort key has.
+
+    Returns:
+        List[Any]: The sort key the next page starts after.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        key = None
+    if not isinstance(key, list) or len(key) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+class TransactionListQuery:
+    """
+    Query parameters of the expense and income lists: filters, sort order and
+    keyset pagination.
+
+    Pages are ordered by the sort column and then the row id, so the cursor
+    holds those values of the last row and the next page starts right after
+    it, which keeps every page as cheap as the first. Without limit or cursor
+    the whole filtered list is returned, as before pagination existed.
+    """
+
+    def __init__(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        category: Annotated[Optional[List[str]], Query()] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sort: Literal["date", "-date", "amount", "-amount", "title", "-title"] = "-date",
+        limit: Annotated[Optional[int], Query(ge=1, le=500)] = None,
+        cursor: Optional[str] = None,
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.category = category
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.column = sort.lstrip("-")
+        self.descending = sort.startswith("-")
+        self.limit = limit or (DEFAULT_PAGE_SIZE if cursor else None)
+        self.cursor = cursor
+
+    def _branch(
+        self, select: str, alias: str, scope: str, parameters: Tuple[Any, ...], kind: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        conditions = [scope]
+        values = list(parameters)
+        if self.start_date is not None:
+            conditions.append(f"{alias}.date >= ?")
+            values.append(self.start_date.isoformat())
+        if self.end_date is not None:
+            conditions.append(f"{alias}.date <= ?")
+            values.append(self.end_date.isoformat())
+        if self.category:
+            conditions.append(f"{alias}.category IN ({', '.join('?' * len(self.category))})")
+            values.extend(self.category)
+        if self.min_amount is not None:
+            conditions.append(f"{alias}.amount >= ?")
+            values.append(self.min_amount)
+        if self.max_amount is not None:
+            conditions.append(f"{alias}.amount <= ?")
+            values.append(self.max_amount)
+
+        if self.cursor is not None:
+            # Rows of several tables are told apart by their type between the
+            # sort column and the id
+            columns = [f"{alias}.{self.column}", f"{alias}.id"]
+            if kind is not None:
+                columns.insert(1, f"'{kind}'")
+            key = decode_cursor(self.cursor, len(columns))
+            operator = "<" if self.descending else ">"
+            conditions.append(
+                f"({', '.join(columns)}) {operator} ({', '.join('?' * len(columns))})"
+            )
+            values.extend(key)
+
+        sql = f"{select} WHERE {' AND '.join(conditions)}"
+        direction = "DESC" if self.descending else "ASC"
+        sql += f" ORDER BY {alias}.{self.column} {direction}, {alias}.id {direction}"
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            values.append(self.limit + 1)
+        return sql, values
+
+    def fetch(
+        self, db: BaseDatabridge, branches: List[Tuple[str, str, str, Tuple[Any, ...], Optional[str]]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Fetch a page of rows from one or more tables.
+
+        Args:
+            db (BaseDatabridge): The database.
+            branches (List[Tuple[str, str, str, Tuple[Any, ...], Optional[str]]]):
+                Per table, the SELECT ... FROM clause, the table's alias, the
+                condition scoping rows to the user or account, its parameters,
+                and the type of the rows when several tables are combined.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The rows of the page,
+                and the cursor of the next page if there is one.
+        """
+        direction = "DESC" if self.descending else "ASC"
+        queries = [self._branch(*branch) for branch in branches]
+        if len(queries) == 1:
+            sql, values = queries[0]
+        else:
+            # Every table gives its first rows in order, which are merged
+            sql = " UNION ALL ".join(f"SELECT * FROM ({query})" for query, _ in queries)
+            sql += f" ORDER BY {self.column} {direction}, type {direction}, id {direction}"
+            values = [value for _, query_values in queries for value in query_values]
+            if self.limit is not None:
+                sql += " LIMIT ?"
+                values.append(self.limit + 1)
+
+        rows = db.fetch_all(sql, tuple(values))
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, None
+        rows = rows[: self.limit]
+        last = rows[-1]
+        key = [last[self.column], last["id"]]
+        if len(branches) > 1:
+            key.insert(1, last["type"])
+        return rows, encode_cursor(key)
+
+    def response(
+        self, db: BaseDatabridge, branches: List[Tuple[str, str, str, Tuple[Any, ...], Optional[str]]]
+    ) -> ORJSONResponse:
+        """Fetch a page, with the cursor of the next one in the X-Next-Cursor header."""
+        rows, next_cursor = self.fetch(db, branches)
+        response = ORJSONResponse(rows)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
+
+
+def recent_transactions(db: BaseDatabridge, user_id: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    Get the latest income and expenses of a user, newest first.
+
+    Args:
+        db (BaseDatabridge): The database.
+        user_id (int): The user.
+        limit (int): Number of transactions, up to half of them income.
+
+    Returns:
+        List[Dict[str, Any]]: The transactions, with their type.
+    """
+    income = db.fetch_all(
+        """
+        SELECT i.id, i.title, i.amount, i.date, i.category, 'income' as type
+        FROM income i
+        JOIN accounts a ON i.account_id = a.id
+        WHERE a.user_id = ? AND a.deleted_at IS NULL
+        ORDER BY date DESC LIMIT ?
+    """,
+        (user_id, (limit // 2)),
+    )
+    expenses = db.fetch_all(
+        """
+        SELECT e.id, e.title, e.amount, e.date, e.category, 'expense' as type
+        FROM expenses e
+        JOIN accounts a ON e.account_id = a.id
+        WHERE a.user_id = ? AND a.deleted_at IS NULL
+        ORDER BY date DESC LIMIT ?
+    """,
+        (user_id, limit - len(income)),
+    )
+    return sorted(income + expenses, key=lambda row: row["date"], reverse=True)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -10,6 +11,55 @@ class Settings(BaseSettings):
     plaid_client_id: str
     plaid_client_secret: str
     plaid_environment: str
+    serper_url: str = "https://google.serper.dev/search"
+    web_request_timeout: float = 10.0
+    web_max_connections: int = 20
+    web_max_response_bytes: int = 1_000_000
+    web_max_tokens: int = 2000
+    web_cache_ttl: float = 900.0
+    web_cache_size: int = 256
+    conversation_history_limit: int = 50
+    groq_max_concurrency: int = 4
+    groq_requests_per_minute: int = 30
+    groq_tokens_per_minute: int = 12000
+    groq_max_retries: int = 3
+    compression_minimum_size: int = 1024
+    compression_level: int = 6
+    # Log statements slower than this, disabled when unset
+    slow_query_threshold_ms: Optional[float] = None
+    # File the slow query log is appended to, printed when unset
+    slow_query_log: Optional[str] = None
+    # Report the database statements run for each request in debug headers
+    query_stats_headers: bool = False
+    # Report synchronous calls that block the event loop longer than this,
+    # disabled when unset
+    loop_monitor_threshold_ms: Optional[float] = None
+    loop_monitor_interval_ms: float = 100
+    job_workers: int = 2
+    job_max_attempts: int = 3
+    job_poll_interval: float = 1.0
+    # Failed jobs are retried after this many seconds, doubling on every attempt
+    job_retry_delay: float = 5.0
+    # Finished jobs are deleted after this many seconds, disabled when 0
+    job_retention: float = 7 * 24 * 60 * 60
+    # Sync every linked item this often, in seconds, disabled when 0
+    plaid_sync_interval: float = 6 * 60 * 60
+    # Spread of the interval between syncs, as a fraction of the interval
+    plaid_sync_jitter: float = 0.1
+    # Scheduled syncs queued or running at once, below job_workers so user
+    # jobs don't wait behind them
+    plaid_sync_concurrency: int = 1
+    # Wait after a failed sync, doubling on every failure in a row
+    plaid_sync_retry_delay: float = 300.0
+    # Public URL of /api/plaid/webhook/, given to Plaid when items are linked
+    plaid_webhook_url: Optional[str] = None
+    # Reject webhooks without a valid Plaid signature, only turn off for local testing
+    plaid_webhook_verify: bool = True
+    # Seconds refreshed balances are reused before Plaid is asked again
+    plaid_balance_cache_ttl: float = 300.0
+    # Rows deleted per transaction when a deleted account is purged, so other
+    # writes only wait for one chunk
+    account_purge_chunk_size: int = 500
 
     class Config:
         env_file = ".env"